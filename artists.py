@@ -0,0 +1,278 @@
+import bisect
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+from keys import intern
+
+# Here are a the exceptions that I have compiled. 
+artist_exceptions = {
+    "tyler, the creator",
+    "Brooks & Dunn",
+    "Yahritza y Su Esencia",
+    "Dan + Shay",
+    "Florence + The Machine",
+    "Lil Nas X",
+    "Richy Mitch And The Coal Miners",
+    "HUNTR/X",
+}
+
+# find the last - in song_id, which delimits song title from song artist
+title_artist_split = re.compile(r"\s[—-]\s(?!.*\s[—-]\s)")
+
+# Find the common delimiters for songs with multiple artists
+delims = re.compile(
+    r"""
+    (?:                      
+        ,\s*                                  # comma (no leading space required)
+      | \s+(?:featuring|presents|with|and)\s+ # word delimiters with spaces
+      | \s+y\s+                               # ' y ' with spaces
+      | \s+x\s+                               # ' x ' with spaces
+      | \s*&\s*                               # & with spaces
+      | \s*/\s*                               # / with spaces
+      | \s*\+\s*                              # + with spaces
+    )
+    """,
+    re.IGNORECASE | re.VERBOSE
+)
+
+# find instances where the main artist is among the exceptions
+exceptions_as_main = re.compile(
+    r"^(?:%s)\b" % "|".join(re.escape(x) for x in artist_exceptions),
+    flags=re.IGNORECASE
+)
+
+
+def extract_artists(song_id: str) -> str:
+    """Extract the artist(s) portion from a song_id."""
+    
+    # use title_artist_split
+    parts = title_artist_split.split(song_id.strip())
+    if len(parts) >= 2:
+        return parts[-1].strip()
+    
+    return song_id.strip()
+
+
+def compute_main_artist_from_artists(artists_str: str) -> str:
+    """Given the artist(s) string, return the main artist."""
+    
+    s = (artists_str or "").strip()
+    if not s:
+        return ""
+    
+    # Let's check if main artist is an exception
+    m = exceptions_as_main.match(s)
+    if m:
+        return m.group(0).strip()
+
+    # Split on first delimiter found and return what's before
+    main_artist = delims.split(s, maxsplit=1)[0].strip()
+
+    return main_artist
+
+
+def compute_main_artist_from_song_id(song_id: str) -> str:
+    return compute_main_artist_from_artists(extract_artists(song_id))
+
+
+# Here are some instances of artists with two names that we need to normalize.
+# Keys are matched case-insensitively.
+ARTIST_ALIASES = {
+    "JIN": "Jin",
+    "4*TOWN (From Disney": "4*TOWN (From Disney And Pixar's Turning Red)",
+    "mgk": "Machine Gun Kelly",
+    "¥$: Kanye West": "Kanye West",
+    "$uicideBoy$": "$uicideboy$",
+    "Charli XCX": "Charli xcx",
+    "Yahritza y Su Esencia": "Yahritza Y Su Esencia",
+    "Tyler, the Creator": "Tyler, The Creator",
+    "twenty one pilots": "Twenty One Pilots",
+    "jessie murph": "Jessie Murph",
+    "BLEU": "Yung Bleu",
+    "HUNTRX": "HUNTR/X",
+    "HUNTR": "HUNTR/X",
+    "Twice": "TWICE",
+    "Pharrell": "Pharrell Williams",
+    "BossMan DLow": "BossMan Dlow",
+    "Richy Mitch": "Richy Mitch And The Coal Miners",
+    "Jennie": "JENNIE",
+    "Mariah The Scientist": "Mariah the Scientist",
+}
+
+_alias_index = {}
+for _name in ARTIST_ALIASES.values():
+    _alias_index[_name.casefold()] = _name
+for _alias, _name in ARTIST_ALIASES.items():
+    _alias_index[_alias.casefold()] = _name
+
+# casefolded canonical names, sorted for prefix lookups
+_canonical_names = sorted({name.casefold(): name for name in ARTIST_ALIASES.values()}.items())
+_canonical_keys = [k for k, _ in _canonical_names]
+
+
+def normalize_artist(name: str) -> str:
+    """
+    Return the canonical name of an artist.
+
+    Names are looked up case-insensitively in ARTIST_ALIASES. Names cut off inside
+    a parenthesis, like "4*TOWN (From Disney", are matched against the canonical
+    names they are a prefix of. Anything else is returned unchanged.
+    """
+    if not isinstance(name, str):
+        return name
+
+    key = name.strip().casefold()
+    if key in _alias_index:
+        return _alias_index[key]
+
+    if key.count("(") > key.count(")"):
+        i = bisect.bisect_left(_canonical_keys, key)
+        if i < len(_canonical_keys) and _canonical_keys[i].startswith(key):
+            return _canonical_names[i][1]
+
+    return name
+
+
+def normalize_artists(names) -> pd.Series:
+    """Vectorized normalize_artist, each distinct name is looked up once."""
+
+    names = pd.Series(names)
+    codes, uniques = pd.factorize(names)
+    normalized = np.array([normalize_artist(n) for n in uniques] + [None], dtype=object)
+
+    return pd.Series(normalized[codes], index=names.index, name=names.name).where(codes >= 0, names)
+
+
+# Bounded so that parsing the full hot_100 + billboard_200 history can't grow it without limit
+MAIN_ARTIST_CACHE_SIZE = 1 << 16
+
+
+@functools.lru_cache(maxsize=MAIN_ARTIST_CACHE_SIZE)
+def _cached_main_artist(artists_str: str) -> str:
+    return compute_main_artist_from_artists(artists_str)
+
+
+def extract_main_artists(song_ids) -> pd.Series:
+    """
+    Vectorized compute_main_artist_from_song_id.
+
+    Each distinct song_id is split once, each distinct performers string is parsed
+    once (through a bounded cache shared across calls), and the results are
+    broadcast back to every row. Missing song_ids give "".
+    """
+    song_ids = pd.Series(song_ids)
+    codes, uniques = pd.factorize(song_ids)
+
+    main_artists = np.array(
+        [_cached_main_artist(extract_artists(s)) for s in uniques] + [""], dtype=object
+    )
+
+    # code -1 (missing) picks the trailing ""
+    return pd.Series(main_artists[codes], index=song_ids.index, name="main_artist")
+
+
+# Same exceptions as above, but matched wherever an artist starts, not only at the start of the string
+exceptions_at = re.compile(
+    r"(?:%s)\b" % "|".join(re.escape(x) for x in artist_exceptions),
+    flags=re.IGNORECASE
+)
+
+# A group credited with its members, "HUNTR/X: EJAE, Audrey Nuna & REI AMI"
+group_members = re.compile(r"\s*:\s*")
+
+# Artists listed after one of these delimiters are featured rather than lead artists
+featured_delims = re.compile(r"\b(?:featuring|with)\b", re.IGNORECASE)
+
+
+def _next_delim(s, pos):
+    # skip delimiters inside parentheses, ie. "4*TOWN (From Disney And Pixar's Turning Red)"
+    for d in delims.finditer(s, pos):
+        if s.count("(", pos, d.start()) <= s.count(")", pos, d.start()):
+            return d
+    return None
+
+
+@functools.lru_cache(maxsize=MAIN_ARTIST_CACHE_SIZE)
+def split_artists(artists_str: str) -> tuple:
+    """
+    Split a performers string into every credited artist.
+
+    Returns a tuple of (artist, role) pairs in credit order, where role is "lead"
+    for the artists before a Featuring / With delimiter and "featured" after it.
+    Names in artist_exceptions are kept whole (a group followed by ": members" is
+    credited along with each member) and aliases are normalized.
+    """
+    s = (artists_str or "").strip()
+    credits = []
+    role = "lead"
+    pos = 0
+
+    while pos < len(s):
+        # an exception counts only if it runs up to a delimiter (or a ": members" list) or the end of the string
+        m = exceptions_at.match(s, pos)
+        d = (delims.match(s, m.end()) or group_members.match(s, m.end())) if m else None
+        if m and (d or m.end() == len(s)):
+            end = m.end()
+        else:
+            d = _next_delim(s, pos)
+            end = d.start() if d else len(s)
+
+        name = s[pos:end].strip()
+        if name:
+            credits.append((normalize_artist(name), role))
+
+        if d is None:
+            break
+        if featured_delims.search(d.group(0)):
+            role = "featured"
+        pos = d.end()
+
+    return tuple(credits)
+
+
+def build_artist_song_edges(df, song_col="song_id", performers_col="performers"):
+    """
+    Decompose every song into all of its credited artists.
+
+    Returns one row per (song, artist) credit with song_key, artist_key, song_id,
+    artist, role ("lead" / "featured") and position (0 = first credited artist).
+    """
+    songs = df[[song_col, performers_col]].drop_duplicates(song_col)
+
+    rows = [
+        (song_id, artist, role, position)
+        for song_id, performers in zip(songs[song_col], songs[performers_col])
+        for position, (artist, role) in enumerate(split_artists(performers))
+    ]
+    edges = pd.DataFrame(rows, columns=["song_id", "artist", "role", "position"])
+
+    edges.insert(0, "song_key", intern(edges["song_id"], "song"))
+    edges.insert(1, "artist_key", intern(edges["artist"], "artist"))
+    edges["role"] = edges["role"].astype(pd.CategoricalDtype(["lead", "featured"]))
+    edges["position"] = edges["position"].astype("int8")
+
+    return edges
+
+
+class ArtistSongIndex:
+    """
+    Two-way index over an artist-song edge table (see build_artist_song_edges).
+
+    Both lookups are a dict access plus a positional take on the edge table.
+    """
+
+    def __init__(self, edges):
+        self.edges = edges.reset_index(drop=True)
+        self._by_artist = self.edges.groupby("artist_key").indices
+        self._by_song = self.edges.groupby("song_key").indices
+
+    def songs_of(self, artist_key):
+        """All credits (lead and featured) of an artist."""
+        return self.edges.take(self._by_artist.get(artist_key, []))
+
+    def artists_on(self, song_key):
+        """All artists credited on a song, in credit order."""
+        return self.edges.take(self._by_song.get(song_key, [])).sort_values("position")
@@ -0,0 +1,399 @@
+#%%
+
+"""
+Timings for the data pipeline helpers against the code they replaced.
+
+Each cell builds its own synthetic inputs in a temp directory, so these can be
+run without touching anything under data/.
+"""
+
+#%%
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from chart_store import chart_files, ingest_charts, load_charts
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+
+#%%
+
+"""
+Chart ingest: the old per-file pd.concat loop vs. load_charts (parallel read into the
+partitioned parquet store), and the cost of ingesting one new week into an existing store.
+The cold load_charts pays for hashing every file and writing every week's partition, so
+it's the one to compare against the legacy loop: a first run shouldn't be slower than before.
+
+To get 50x the number of weeks we replay the real Hot 100 weeks over and over with
+a new chart_week, so every synthetic week is a distinct file.
+"""
+
+#%%
+
+def legacy_concat_loop(raw_dir, chart="hot_100"):
+    total = pd.DataFrame()
+    for year in sorted(os.listdir(f"{raw_dir}/{chart}")):
+        for file in os.listdir(f"{raw_dir}/{chart}/{year}"):
+            total = pd.concat([total, pd.read_csv(f"{raw_dir}/{chart}/{year}/{file}")])
+    return total
+
+
+def make_synthetic_chart_dir(scale, chart="hot_100"):
+    weeks = [pd.read_csv(f) for f in chart_files(chart)]
+    tmp = tempfile.mkdtemp(prefix="durf_bench_")
+
+    start = pd.Timestamp("1800-01-04")
+    for i in range(len(weeks) * scale):
+        week = start + pd.Timedelta(weeks=i)
+        df = weeks[i % len(weeks)].assign(chart_week=week.strftime("%Y-%m-%d"))
+
+        year_dir = f"{tmp}/{chart}/{week.year}"
+        os.makedirs(year_dir, exist_ok=True)
+        df.to_csv(f"{year_dir}/{week:%Y-%m-%d}.csv", index=False)
+
+    return tmp
+
+
+for scale in (1, 50):
+    raw_dir = make_synthetic_chart_dir(scale)
+    store_dir = f"{raw_dir}/store"
+
+    _, t_legacy = timed(legacy_concat_loop, raw_dir)
+    _, t_cold = timed(load_charts, "hot_100", raw_dir=raw_dir, store_dir=store_dir)
+    _, t_warm = timed(load_charts, "hot_100", raw_dir=raw_dir, store_dir=store_dir)
+
+    # drop in one more week and only ingest that
+    files = chart_files("hot_100", raw_dir=raw_dir)
+    last = pd.Timestamp(os.path.basename(files[-1])[:10]) + pd.Timedelta(weeks=1)
+    os.makedirs(f"{raw_dir}/hot_100/{last.year}", exist_ok=True)
+    pd.read_csv(files[-1]).assign(chart_week=f"{last:%Y-%m-%d}").to_csv(
+        f"{raw_dir}/hot_100/{last.year}/{last:%Y-%m-%d}.csv", index=False)
+    _, t_incr = timed(ingest_charts, "hot_100", raw_dir=raw_dir, store_dir=store_dir)
+
+    print(f"{scale}x ({len(files)} weeks): legacy loop {t_legacy:.2f}s | "
+          f"load_charts cold {t_cold:.2f}s | warm (store) {t_warm:.2f}s | "
+          f"ingest one new week {t_incr:.2f}s")
+    if t_cold > t_legacy:
+        print(f"  cold load_charts is {t_cold / t_legacy:.1f}x slower than the legacy loop")
+
+    shutil.rmtree(raw_dir)
+
+#%%
+
+"""
+song_id strings vs. int32 song_key on emerging_songs: memory, groupby and merge.
+"""
+
+#%%
+
+from keys import attach_keys
+
+emerging = pd.read_csv("data/processed_data/emerging_songs.csv")
+keys_dir = tempfile.mkdtemp(prefix="durf_keys_")
+emerging = attach_keys(emerging, keys_dir=keys_dir)
+
+mb = lambda s: s.memory_usage(deep=True) / 1e6
+print(f"song_id {mb(emerging['song_id']):.2f} MB | song_key {mb(emerging['song_key']):.2f} MB")
+
+for col in ("song_id", "song_key"):
+    peaks = emerging.groupby(col, as_index=False)["current_week"].min()
+    _, t_group = timed(lambda: emerging.groupby(col, as_index=False)["current_week"].min())
+    _, t_merge = timed(lambda: emerging.merge(peaks, on=col, how="left"))
+    print(f"{col}: groupby {t_group * 1e3:.1f} ms | merge {t_merge * 1e3:.1f} ms")
+
+shutil.rmtree(keys_dir)
+
+#%%
+
+"""
+Memory of the Hot 100 history: untyped pd.read_csv frames vs. the typed chart schema.
+"""
+
+#%%
+
+from chart_store import read_chart_files
+
+files = chart_files("hot_100")
+untyped = pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+typed = read_chart_files(files)
+
+print(f"untyped {untyped.memory_usage(deep=True).sum() / 1e6:.2f} MB | "
+      f"typed {typed.memory_usage(deep=True).sum() / 1e6:.2f} MB")
+
+#%%
+
+"""
+Release-window social data: reading a whole archive CSV and masking it (what
+feature_engineering.py used to do) vs. query_release_windows on the social store,
+for a synthetic YouTube archive of 1000 artists with daily rows over 3.5 years.
+"""
+
+#%%
+
+from social_store import build_social_store, query_release_windows
+
+
+def legacy_release_windows(path, releases, days_back=28):
+    social = pd.read_csv(path)
+    social["date"] = pd.to_datetime(social["date"])
+    social.drop(columns=["Unnamed: 0"], inplace=True)
+    social = social.merge(releases, left_on="artist_id", right_on="artist", how="left")
+    mask = (
+        (social["date"] >= social["release_date"] - pd.Timedelta(days=days_back)) &
+        (social["date"] <= social["release_date"])
+    )
+    return social[mask]
+
+
+rng = np.random.default_rng(0)
+archive_dir = tempfile.mkdtemp(prefix="durf_social_")
+dates = pd.date_range("2022-01-01", "2025-06-30").strftime("%Y-%m-%d")
+artists = [f"artist {i}" for i in range(1000)]
+
+archive = pd.DataFrame({
+    "date": np.tile(dates, len(artists)),
+    "subs": rng.integers(0, 10**7, len(dates) * len(artists)),
+    "views": rng.integers(0, 10**10, len(dates) * len(artists)),
+    "artist_id": np.repeat(artists, len(dates)),
+    "platform": "youtube",
+    "handle": np.repeat([a.replace(" ", "") for a in artists], len(dates)),
+    "snapshot_date": "2025-07-01",
+})
+archive.to_csv(f"{archive_dir}/youtube_archive.csv")
+
+releases = pd.DataFrame({
+    "artist": artists[::2],
+    "release_date": pd.to_datetime(rng.choice(dates[60:], len(artists[::2]))),
+})
+
+_, t_build = timed(build_social_store, ["youtube"], archive_dir=archive_dir, store_dir=f"{archive_dir}/store")
+legacy, t_legacy = timed(legacy_release_windows, f"{archive_dir}/youtube_archive.csv", releases)
+windows, t_store = timed(query_release_windows, "youtube", releases, columns=["subs", "views"],
+                         store_dir=f"{archive_dir}/store")
+
+assert len(legacy) == len(windows)
+print(f"{len(archive)} archive rows, {len(windows)} window rows: legacy read + mask {t_legacy:.2f}s | "
+      f"store query {t_store:.2f}s (one-off build {t_build:.2f}s)")
+
+shutil.rmtree(archive_dir)
+
+#%%
+
+"""
+expand_to_full_window: the old per-group date_range + merge loop vs. the one-merge
+grid version, on synthetic (artist, platform) release windows with ~20 of the 29
+days observed. The loop takes minutes from 10k pairs up, so it only runs at 1k.
+"""
+
+#%%
+
+from utils import expand_to_full_window
+
+
+def legacy_expand_to_full_window(df, key_cols=("artist", "platform"), date_col="date",
+                                 release_col="release_date", days_back=28):
+    filled = []
+    for keys, g in df.groupby(list(key_cols), dropna=False):
+        rd = g[release_col].iloc[0]
+        base = pd.DataFrame({date_col: pd.date_range(rd - pd.Timedelta(days=days_back), rd, freq="D")})
+        for k, v in zip(key_cols, keys):
+            base[k] = v
+        base[release_col] = rd
+        merged = base.merge(g, on=[*key_cols, date_col, release_col], how="left", indicator=True)
+        merged["was_inserted"] = merged["_merge"].eq("left_only")
+        filled.append(merged.drop(columns="_merge"))
+    return pd.concat(filled, ignore_index=True)
+
+
+def make_release_windows(n_pairs, days_observed=20, seed=0):
+    rng = np.random.default_rng(seed)
+    release = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 900, n_pairs), unit="D")
+    offsets = np.concatenate([rng.choice(29, days_observed, replace=False) for _ in range(n_pairs)])
+
+    df = pd.DataFrame({
+        "artist": np.repeat([f"artist {i}" for i in range(n_pairs)], days_observed),
+        "platform": "youtube",
+        "release_date": np.repeat(release, days_observed),
+    })
+    df["date"] = df["release_date"] - pd.to_timedelta(offsets, unit="D")
+    df["subs"] = rng.integers(0, 10**7, len(df)).astype(float)
+    return df
+
+
+for n_pairs in (1_000, 10_000, 100_000):
+    df = make_release_windows(n_pairs)
+    out, t_grid = timed(expand_to_full_window, df)
+
+    if n_pairs <= 1_000:
+        legacy, t_legacy = timed(legacy_expand_to_full_window, df)
+        pd.testing.assert_frame_equal(legacy, out)
+        legacy_str = f"{t_legacy:.2f}s"
+    else:
+        legacy_str = "skipped"
+
+    print(f"{n_pairs} pairs ({len(out)} rows): per-group loop {legacy_str} | grid {t_grid:.2f}s")
+
+#%%
+
+"""
+Growth features: one groupby(...).transform(lambda) sweep per metric and window
+vs. compound_growth for every metric and window at once, on 5000 artists with
+91 days each, 3 metrics and the 5 GROWTH_WINDOWS.
+"""
+
+#%%
+
+from social_features import GROWTH_WINDOWS, compound_growth
+
+rng = np.random.default_rng(0)
+n_artists, n_days = 5000, 91
+daily = pd.DataFrame({
+    "artist": np.repeat([f"artist {i}" for i in range(n_artists)], n_days),
+    "platform": "tiktok",
+    "date": np.tile(pd.date_range("2024-01-01", periods=n_days), n_artists),
+})
+metrics = ["followers", "uploads", "likes"]
+for m in metrics:
+    daily[m] = rng.integers(1, 10**7, len(daily)).astype(float)
+
+
+def lambda_sweeps(df):
+    df = df.sort_values(["artist", "date"])
+    for w in GROWTH_WINDOWS:
+        for m in metrics:
+            df[f"{m}_cgr_{w}"] = df.groupby("artist")[m].transform(lambda s: ((s / s.shift(w))**(1/w) - 1) * 100)
+    return df
+
+
+legacy, t_legacy = timed(lambda_sweeps, daily)
+engine, t_engine = timed(compound_growth, daily, metrics)
+assert np.allclose(legacy["likes_cgr_28"], engine["likes_cgr_4w"], equal_nan=True)
+print(f"{len(metrics) * len(GROWTH_WINDOWS)} growth columns on {len(daily)} rows: "
+      f"groupby lambdas {t_legacy:.2f}s | compound_growth {t_engine:.2f}s")
+
+#%%
+
+"""
+Release-date extraction: the exact date == release_date filter + merge per platform
+vs. one as_of lookup (3-day tolerance), for 100k (artist, release_date) queries over
+three platforms with 5% of the release-day rows missing. as_of does more work per
+row (it forward fills every column), but fills the gaps the exact merges leave as NaN.
+"""
+
+#%%
+
+from social_features import as_of
+
+rng = np.random.default_rng(0)
+n_artists, n_days = 100_000, 29
+artists = [f"artist {i}" for i in range(n_artists)]
+queries = pd.DataFrame({
+    "artist": artists,
+    "release_date": pd.Timestamp("2024-01-29") - pd.to_timedelta(rng.integers(0, 3, n_artists), unit="D"),
+})
+platforms = []
+for p in ("yt", "tt", "ig"):
+    obs = pd.DataFrame({
+        "artist": np.repeat(artists, n_days),
+        "date": np.tile(pd.date_range("2024-01-01", periods=n_days), n_artists),
+    })
+    obs[f"{p}_followers_release_date"] = rng.integers(0, 10**7, len(obs)).astype(float)
+    obs = obs.merge(queries, on="artist")
+    obs = obs[obs["date"] <= obs["release_date"]]
+    missing = (obs["date"] == obs["release_date"]) & (rng.random(len(obs)) < 0.05)
+    platforms.append(obs[~missing])
+cols = [f"{p}_followers_release_date" for p in ("yt", "tt", "ig")]
+
+
+def exact_merges(feature_df):
+    for obs, col in zip(platforms, cols):
+        rows = obs.loc[obs["date"] == obs["release_date"], ["artist", "release_date", col]]
+        feature_df = feature_df.merge(rows, on=["artist", "release_date"], how="left", validate="many_to_one")
+    return feature_df
+
+
+merged, t_merges = timed(exact_merges, queries)
+found, t_as_of = timed(as_of, queries, [o.drop(columns="release_date") for o in platforms], cols,
+                       tolerance=pd.Timedelta(days=3))
+
+exact = merged[cols].notna()
+assert (merged[cols][exact] == found[cols][exact]).sum().sum() == exact.sum().sum()
+print(f"{n_artists} queries x {len(cols)} platforms: filter + merges {t_merges:.2f}s, "
+      f"{merged[cols].isna().sum().sum()} NaN | as_of {t_as_of:.2f}s, {found[cols].isna().sum().sum()} NaN")
+
+#%%
+
+"""
+Imputation: a groupby(...).transform(lambda s: s.interpolate()) sweep per metric vs.
+interpolate_groups on every metric at once, 5000 artists x 29 days, 3 metrics, 20% NaN.
+"""
+
+#%%
+
+from social_cleaning import interpolate_groups
+
+rng = np.random.default_rng(0)
+n_artists, n_days = 5000, 29
+gappy = pd.DataFrame({
+    "artist": np.repeat([f"artist {i}" for i in range(n_artists)], n_days),
+    "platform": "tiktok",
+    "date": np.tile(pd.date_range("2024-01-01", periods=n_days), n_artists),
+})
+metrics = ["followers", "uploads", "likes"]
+for m in metrics:
+    gappy[m] = np.where(rng.random(len(gappy)) < 0.2, np.nan, rng.random(len(gappy)) * 10**6)
+
+
+def lambda_interpolate(df):
+    df = df.copy()
+    for m in metrics:
+        df[m] = df.groupby("artist")[m].transform(lambda s: s.interpolate())
+    return df
+
+
+legacy, t_legacy = timed(lambda_interpolate, gappy)
+(kernel, imputed), t_kernel = timed(interpolate_groups, gappy, metrics)
+pd.testing.assert_frame_equal(legacy, kernel)
+print(f"{len(gappy)} rows x {len(metrics)} metrics, {imputed.to_numpy().sum()} cells imputed: "
+      f"groupby lambdas {t_legacy:.2f}s | interpolate_groups {t_kernel:.3f}s")
+
+#%%
+
+"""
+Outage detection over 3000 artists x 120 days on two platforms: a 3-day YouTube
+outage hitting 40% of channels, plus a few single-artist drops to zero.
+"""
+
+#%%
+
+from social_cleaning import detect_outages
+
+rng = np.random.default_rng(0)
+n_artists, n_days = 3000, 120
+social = pd.DataFrame({
+    "artist": np.repeat([f"artist {i}" for i in range(n_artists)], n_days),
+    "platform": np.repeat(rng.choice(["youtube", "tiktok"], n_artists), n_days),
+    "date": np.tile(pd.date_range("2025-02-01", periods=n_days), n_artists),
+})
+social["views"] = np.where(social["platform"] == "youtube", rng.random(len(social)).cumsum(), np.nan)
+social["followers"] = rng.random(len(social)).cumsum() + 1
+
+down = (social["platform"] == "youtube") & social["date"].between("2025-04-10", "2025-04-12")
+social.loc[down & (rng.random(len(social)) < 0.4), "views"] = 0
+social.loc[rng.choice(len(social), 20, replace=False), "followers"] = 0
+
+(calendar, status), t_detect = timed(detect_outages, social, ["views", "followers"])
+print(f"{len(social)} rows: {len(calendar)} outage days found in {t_detect:.2f}s")
+print(status.apply(lambda s: s.value_counts()).T)
+
+# %%
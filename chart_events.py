@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from chart_store import STORE_DIR, load_manifest, read_week
+from keys import intern
+
+EVENTS_DIR = "data/processed_data/chart_events"
+
+# entry: first week ever on the chart, reentry: back after dropping off,
+# move / hold: on both weeks, exit: on last week's chart but not this one
+EVENT_TYPES = ["entry", "reentry", "move", "hold", "exit"]
+
+EVENT_COLUMNS = [
+    "chart_week", "song_key", "song_id", "event", "position", "prev_position", "delta", "wks_on_chart",
+]
+
+# Key space (see keys.py) of each chart's entries. The Billboard 200 ranks albums, which
+# get keys of their own, so an album doesn't take (or share) the key of a song.
+KEY_SPACES = {"hot_100": "song", "billboard_200": "album"}
+
+
+def _with_song_ids(week_df):
+    week_df = week_df.copy()
+    week_df["song_id"] = week_df["title"].astype(str).str.strip() + " — " + week_df["performer"].astype(str).str.strip()
+    return week_df
+
+
+def diff_weeks(prev, curr, key_space="song"):
+    """
+    Turn two consecutive chart weeks into events for the current week.
+
+    Songs on both weeks give a move (delta = places gained) or hold, songs only on
+    the current week an entry or reentry, and songs only on the previous week an exit.
+    prev may be empty (first week of a chart). song_key comes from key_space, so for
+    an album chart song_id / song_key are really the album's.
+    """
+    week = curr["chart_week"].iloc[0]
+    curr = _with_song_ids(curr)[["song_id", "current_week", "wks_on_chart", "is_new"]]
+    prev = _with_song_ids(prev)[["song_id", "current_week"]].rename(columns={"current_week": "prev_position"})
+
+    events = curr.rename(columns={"current_week": "position"}).merge(prev, on="song_id", how="outer")
+    events["chart_week"] = week
+
+    on_curr, on_prev = events["position"].notna(), events["prev_position"].notna()
+    events["delta"] = (events["prev_position"].astype("Int16") - events["position"].astype("Int16"))
+    events["event"] = np.select(
+        [
+            on_curr & on_prev & (events["delta"] != 0).fillna(False),
+            on_curr & on_prev,
+            on_curr & events["is_new"].fillna(False).astype(bool),
+            on_curr,
+        ],
+        ["move", "hold", "entry", "reentry"],
+        default="exit",
+    )
+    events["event"] = events["event"].astype(pd.CategoricalDtype(EVENT_TYPES))
+    events["song_key"] = intern(events["song_id"], key_space)
+
+    return events[EVENT_COLUMNS].sort_values(["position", "prev_position"], ignore_index=True)
+
+
+def _events_path(events_dir, chart, week):
+    return os.path.join(events_dir, f"chart={chart}", f"{week}.parquet")
+
+
+def record_chart_events(chart, changes, store_dir=STORE_DIR, events_dir=EVENTS_DIR):
+    """
+    Append the events of newly ingested weeks to the chart's event log.
+
+    changes is what chart_store.ingest_charts returned. Each week is diffed only
+    against the week before it, so the cost is a couple hundred rows per week. A
+    changed or removed week also re-diffs the week after it. If the chart has no
+    event log yet, every week in the store is diffed. Returns the new events.
+    """
+    weeks = set(changes["added"]) | set(changes["updated"])
+    if not os.path.isdir(os.path.join(events_dir, f"chart={chart}")):
+        weeks |= set(load_manifest(store_dir)["charts"].get(chart, {}))
+    for week in changes["updated"] + changes["removed"]:
+        weeks.add(str((pd.Timestamp(week) + pd.Timedelta(weeks=1)).date()))
+
+    for week in changes["removed"]:
+        path = _events_path(events_dir, chart, week)
+        if os.path.exists(path):
+            os.remove(path)
+
+    recorded = []
+    for week in sorted(weeks):
+        curr = read_week(chart, week, store_dir)
+        if curr.empty:
+            continue
+        prev = read_week(chart, pd.Timestamp(week) - pd.Timedelta(weeks=1), store_dir)
+
+        events = diff_weeks(prev, curr, KEY_SPACES.get(chart, chart))
+        path = _events_path(events_dir, chart, week)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        events.to_parquet(path, index=False)
+        recorded.append(events)
+
+    if not recorded:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    return pd.concat(recorded, ignore_index=True)
+
+
+def read_events(chart="hot_100", start=None, end=None, events_dir=EVENTS_DIR):
+    """Read the event log of a chart between two weeks (inclusive)."""
+
+    chart_dir = os.path.join(events_dir, f"chart={chart}")
+    if not os.path.isdir(chart_dir):
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    start = None if start is None else str(pd.Timestamp(start).date())
+    end = None if end is None else str(pd.Timestamp(end).date())
+    files = sorted(
+        os.path.join(chart_dir, f) for f in os.listdir(chart_dir)
+        if (start is None or f[:10] >= start) and (end is None or f[:10] <= end)
+    )
+    if not files:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    return pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+
+
+def emerging_song_keys(events):
+    """song_keys that debuted on the chart in the given events."""
+
+    return events.loc[events["event"] == "entry", "song_key"].unique()
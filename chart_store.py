@@ -0,0 +1,317 @@
+import functools
+import operator
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import manifest
+
+RAW_DIR = "data/raw_data"
+STORE_DIR = "data/processed_data/chart_store"
+
+# Charts under RAW_DIR that share the weekly Billboard schema below
+CHARTS = ("hot_100", "billboard_200")
+
+# Column types of the weekly Billboard CSVs as they are on disk. last_week is read
+# as a string because new entries and re-entries are marked with "-".
+RAW_CHART_SCHEMA = pa.schema([
+    ("chart_week", pa.string()),
+    ("current_week", pa.int16()),
+    ("title", pa.string()),
+    ("performer", pa.string()),
+    ("last_week", pa.string()),
+    ("peak_pos", pa.int16()),
+    ("wks_on_chart", pa.int16()),
+])
+
+# Schema of the chart store and of everything the loaders return. Positions are
+# unsigned since the Billboard 200 goes past 127; last_week is null when the song
+# wasn't on last week's chart, which is_new / is_reentry tell apart.
+CHART_SCHEMA = pa.schema([
+    ("chart_week", pa.date32()),
+    ("current_week", pa.uint8()),
+    ("title", pa.string()),
+    ("performer", pa.string()),
+    ("last_week", pa.uint8()),
+    ("peak_pos", pa.uint8()),
+    ("wks_on_chart", pa.int16()),
+    ("is_new", pa.bool_()),
+    ("is_reentry", pa.bool_()),
+])
+
+# Bump when CHART_SCHEMA changes, so the next ingest rewrites every partition
+SCHEMA_VERSION = 2
+
+# arrow -> pandas: nullable ints and datetime64 chart_week, categorical names
+_PANDAS_TYPES = {pa.uint8(): pd.UInt8Dtype(), pa.int16(): pd.Int16Dtype()}
+_CATEGORICAL_COLUMNS = ["title", "performer"]
+
+
+def chart_files(chart="hot_100", years=None, raw_dir=RAW_DIR):
+    """List the weekly CSV files of a chart, sorted by chart week."""
+
+    chart_dir = os.path.join(raw_dir, chart)
+    if years is None:
+        years = sorted(d for d in os.listdir(chart_dir) if d.isdigit())
+
+    files = []
+    for year in years:
+        year_dir = os.path.join(chart_dir, str(year))
+        files.extend(
+            os.path.join(year_dir, f) for f in os.listdir(year_dir) if f.endswith(".csv")
+        )
+
+    return sorted(files, key=os.path.basename)
+
+
+def _typed(table):
+    """Cast a raw weekly table to CHART_SCHEMA."""
+
+    last_week = table["last_week"]
+    last_week = pc.if_else(pc.equal(last_week, "-"), pa.scalar(None, pa.string()), last_week)
+    off_last_week = pc.is_null(last_week)
+    first_week = pc.equal(table["wks_on_chart"], 1)
+
+    return pa.table({
+        "chart_week": pc.cast(pc.strptime(table["chart_week"], format="%Y-%m-%d", unit="s"), pa.date32()),
+        "current_week": pc.cast(table["current_week"], pa.uint8()),
+        "title": table["title"],
+        "performer": table["performer"],
+        "last_week": pc.cast(last_week, pa.uint8()),
+        "peak_pos": pc.cast(table["peak_pos"], pa.uint8()),
+        "wks_on_chart": table["wks_on_chart"],
+        "is_new": pc.and_(off_last_week, first_week),
+        "is_reentry": pc.and_(off_last_week, pc.invert(first_week)),
+    }, schema=CHART_SCHEMA)
+
+
+def _to_pandas(table):
+    return table.to_pandas(
+        date_as_object=False,
+        types_mapper=_PANDAS_TYPES.get,
+        categories=_CATEGORICAL_COLUMNS,
+    )
+
+
+def read_chart_week(path):
+    # pyarrow's reader releases the GIL, so the thread pool below actually runs in parallel
+    raw = pacsv.read_csv(
+        path,
+        read_options=pacsv.ReadOptions(use_threads=False),
+        convert_options=pacsv.ConvertOptions(column_types=RAW_CHART_SCHEMA),
+    )
+    return _typed(raw)
+
+
+def read_chart_files(files, max_workers=None):
+    """Read weekly chart files in parallel and concatenate them once."""
+
+    if not files:
+        return _to_pandas(CHART_SCHEMA.empty_table())
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        weeks = list(pool.map(read_chart_week, files))
+
+    return _to_pandas(pa.concat_tables(weeks))
+
+
+def _week_of(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _partition_path(store_dir, chart, week):
+    return os.path.join(store_dir, f"chart={chart}", f"year={week[:4]}", f"{week}.parquet")
+
+
+def load_manifest(store_dir=STORE_DIR):
+    """
+    Return {"schema_version": ..., "charts": {chart: {chart_week: {size, mtime, sha1}}}}
+    for the weeks already in the store. A store written with an older schema comes
+    back empty, so everything gets re-ingested.
+    """
+    return manifest.load_manifest(store_dir, SCHEMA_VERSION, {"schema_version": SCHEMA_VERSION, "charts": {}})
+
+
+def ingest_charts(chart="hot_100", raw_dir=RAW_DIR, store_dir=STORE_DIR, max_workers=None):
+    """
+    Bring the chart store up to date with the raw weekly files.
+
+    Each chart_week is one partition file. Only weeks that are new, or whose file
+    hash changed since the last ingest, are parsed and written; unchanged files are
+    recognised from their size and mtime without being hashed. Weeks whose raw file
+    was deleted are dropped from the store.
+
+    Returns {"added": [...], "updated": [...], "removed": [...]} lists of chart weeks.
+    """
+    return _ingest(chart, raw_dir, store_dir, max_workers)[0]
+
+
+def _ingest(chart, raw_dir, store_dir, max_workers):
+    """ingest_charts, also handing back the {chart_week: table} it parsed on the way."""
+
+    store_manifest = load_manifest(store_dir)
+    known = store_manifest["charts"].get(chart, {})
+
+    files = {_week_of(f): f for f in chart_files(chart, raw_dir=raw_dir)}
+    changes = {"added": [], "updated": [], "removed": []}
+    to_write = {}
+
+    for week, path in files.items():
+        changed, entry = manifest.check_file(path, known.get(week))
+        if not changed:
+            # touched but not changed: keep the new mtime, so it isn't hashed again
+            known[week] = entry
+            continue
+
+        changes["updated" if week in known else "added"].append(week)
+        to_write[week] = entry
+
+    parsed = {}
+    year_dirs = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        tables = pool.map(read_chart_week, [files[w] for w in to_write])
+        for week, table in zip(to_write, tables):
+            out = _partition_path(store_dir, chart, week)
+            if week[:4] not in year_dirs:
+                os.makedirs(os.path.dirname(out), exist_ok=True)
+                year_dirs.add(week[:4])
+            pq.write_table(table, out)
+            known[week] = to_write[week]
+            parsed[week] = table
+
+    for week in sorted(set(known) - set(files)):
+        changes["removed"].append(week)
+        out = _partition_path(store_dir, chart, week)
+        if os.path.exists(out):
+            os.remove(out)
+        del known[week]
+
+    store_manifest["charts"][chart] = known
+    manifest.save_manifest(store_manifest, store_dir)
+
+    return changes, parsed
+
+
+def _store_files(store_dir, chart, years=None, start=None, end=None):
+    """Partition files of one chart, pruned by year directory and then by week file name."""
+
+    chart_dir = os.path.join(store_dir, f"chart={chart}")
+    if not os.path.isdir(chart_dir):
+        return []
+
+    years = None if years is None else {str(y) for y in years}
+    files = []
+    for d in sorted(os.listdir(chart_dir)):
+        year = d.split("=", 1)[1]
+        if years is not None and year not in years:
+            continue
+        if (start and year < start[:4]) or (end and year > end[:4]):
+            continue
+
+        for f in os.listdir(os.path.join(chart_dir, d)):
+            week = f[:-len(".parquet")]
+            if (start and week < start) or (end and week > end):
+                continue
+            files.append(os.path.join(chart_dir, d, f))
+
+    return sorted(files, key=os.path.basename)
+
+
+def _read_partitions(files, filter=None):
+    if not files:
+        return _to_pandas(CHART_SCHEMA.empty_table())
+
+    return _to_pandas(ds.dataset(files, schema=CHART_SCHEMA, format="parquet").to_table(filter=filter))
+
+
+def read_store(chart="hot_100", years=None, store_dir=STORE_DIR):
+    """Read a chart from the store, opening only the year partitions asked for."""
+
+    return _read_partitions(_store_files(store_dir, chart, years=years))
+
+
+def read_week(chart, week, store_dir=STORE_DIR):
+    """One week of a chart from the store, ~100-200 rows."""
+
+    week = str(pd.Timestamp(week).date())
+    return _read_partitions(_store_files(store_dir, chart, start=week, end=week))
+
+
+def query_charts(charts=None, start=None, end=None, performer=None, contains=False,
+                 store_dir=STORE_DIR):
+    """
+    Query one or more charts from the store, with a chart column added.
+
+    charts defaults to every chart in the store. start / end are inclusive
+    "YYYY-MM-DD" week bounds and only the matching week partitions are opened.
+    performer is a name or list of names matched exactly against the performer
+    column (or as a case-sensitive substring with contains=True), and is pushed
+    down into the parquet scan.
+    """
+    if charts is None:
+        charts = sorted(d.split("=", 1)[1] for d in os.listdir(store_dir) if d.startswith("chart="))
+    elif isinstance(charts, str):
+        charts = [charts]
+
+    start = None if start is None else str(pd.Timestamp(start).date())
+    end = None if end is None else str(pd.Timestamp(end).date())
+
+    filter = None
+    if performer is not None:
+        names = [performer] if isinstance(performer, str) else list(performer)
+        if contains:
+            filter = functools.reduce(
+                operator.or_, (pc.match_substring(ds.field("performer"), n) for n in names)
+            )
+        else:
+            filter = ds.field("performer").isin(names)
+
+    frames = []
+    for chart in charts:
+        df = _read_partitions(_store_files(store_dir, chart, start=start, end=end), filter=filter)
+        df.insert(0, "chart", chart)
+        frames.append(df)
+
+    # the charts' categories differ, so concat falls back to strings
+    charts_df = pd.concat(frames, ignore_index=True)
+    charts_df["chart"] = charts_df["chart"].astype("category")
+    for col in _CATEGORICAL_COLUMNS:
+        charts_df[col] = charts_df[col].astype("category")
+    return charts_df
+
+
+def ingest_all(charts=CHARTS, raw_dir=RAW_DIR, store_dir=STORE_DIR, max_workers=None):
+    """Run ingest_charts for every chart, returning {chart: changes}."""
+
+    return {
+        chart: ingest_charts(chart, raw_dir=raw_dir, store_dir=store_dir, max_workers=max_workers)
+        for chart in charts
+    }
+
+
+def load_charts(chart="hot_100", years=None, raw_dir=RAW_DIR, store_dir=STORE_DIR,
+                use_store=True, max_workers=None):
+    """
+    Load every weekly file of a chart into one DataFrame.
+
+    With use_store the raw files are first ingested incrementally into the
+    partitioned parquet store (see ingest_charts), and the result is read back
+    from there, so later runs only parse weeks that were added or changed.
+    Without it, the raw CSVs are read directly. years filters the result.
+    """
+    if use_store:
+        _, parsed = _ingest(chart, raw_dir, store_dir, max_workers)
+
+        # on a first build every week was just parsed, so don't read it all back from the store
+        files = _store_files(store_dir, chart, years=years)
+        if files and all(_week_of(f) in parsed for f in files):
+            return _to_pandas(pa.concat_tables([parsed[_week_of(f)] for f in files]))
+        return read_store(chart, years=years, store_dir=store_dir)
+
+    return read_chart_files(chart_files(chart, years=years, raw_dir=raw_dir), max_workers=max_workers)
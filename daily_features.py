@@ -0,0 +1,240 @@
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from manifest import load_manifest, save_manifest
+from social_features import GROWTH_WINDOWS, growth_columns, window_label
+from social_pipeline import PLATFORM_SPECS, clean_panel, outage_calendar
+from social_store import SOCIAL_STORE_DIR, date_span, query_social
+from utils import expand_to_full_window
+
+DAILY_DIR = "data/processed_data/daily_features"
+
+# Days before the last materialized date that are recomputed on an update, since
+# their imputed values can change once the days after them arrive
+REFRESH_DAYS = 7
+
+# Longer gaps in a series are left as NaN instead of being carried forward, so an
+# artist we stopped tracking doesn't keep a flat "current" value
+MAX_GAP = 14
+
+# Days computed per pass (each pass also reads max(windows) + MAX_GAP days before it)
+CHUNK_DAYS = 180
+
+# Bump when the layout or the features change, so the next run rebuilds everything
+SCHEMA_VERSION = 3
+
+_SERIES_COLS = ["artist", "platform", "metric"]
+
+
+def daily_feature_columns(specs=PLATFORM_SPECS, windows=GROWTH_WINDOWS):
+    """
+    Columns of a materialized day, after artist and date: {prefix}_{metric} levels,
+    {prefix}_{metric}_cgr_{label} growth and {prefix}_posts_per_day_{label} posting rates.
+    """
+    levels = [f"{spec['prefix']}_{m}" for spec in specs.values() for m in spec["metrics"]]
+    growth = [c for spec in specs.values() for c in growth_columns(spec["metrics"], windows, prefix=f"{spec['prefix']}_")]
+    posts = [f"{spec['prefix']}_posts_per_day_{window_label(w)}" for spec in specs.values() if "posts" in spec for w in windows]
+    return levels + growth + posts
+
+
+def _day_path(out_dir, date):
+    day = str(pd.Timestamp(date).date())
+    return os.path.join(out_dir, f"year={day[:4]}", f"{day}.parquet")
+
+
+def compute_daily_features(start, end, specs=PLATFORM_SPECS, windows=GROWTH_WINDOWS, store_dir=SOCIAL_STORE_DIR,
+                           outages=None):
+    """
+    Rolling features of every artist in the social store, for each day from start
+    to end (inclusive). One row per (artist, date) with any data.
+
+    Every series is put on a full daily grid, cleaned like the release features
+    (see social_pipeline.clean_panel) and all growth windows and posting rates are
+    computed in one pass over the long table. Outage days come from outages, the
+    store's outage_calendar (computed if not given).
+
+    Day D's features are as of D, like FeatureStore's: nothing after D is used (see
+    _as_of), so they're the same whichever range D is computed in.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    first = start - pd.Timedelta(days=max(windows) + MAX_GAP)
+    columns = daily_feature_columns(specs, windows)
+
+    frames = []
+    for platform, spec in specs.items():
+        rows = query_social(platform, start=first, end=end, columns=spec["metrics"], store_dir=store_dir)
+        rows = rows.rename(columns={"artist_id": "artist"})
+        rows["artist"] = rows["artist"].astype(str)
+        rows["platform"] = platform
+        frames.append(rows.melt(
+            id_vars=["artist", "platform", "date"], value_vars=spec["metrics"], var_name="metric", value_name="value",
+        ))
+
+    long = pd.concat(frames, ignore_index=True)
+    if long.empty:
+        return pd.DataFrame(columns=["artist", "date"] + columns)
+    long["value"] = long["value"].astype("float64")
+    long["date"] = pd.to_datetime(long["date"])
+
+    # every series on the same grid, from first to end
+    long["end"] = end
+    panel = expand_to_full_window(long, _SERIES_COLS, "date", "end", (end - first).days).drop(columns="end")
+    if outages is None:
+        outages = outage_calendar(specs, store_dir)
+    panel, _ = clean_panel(panel, specs, series_cols=_SERIES_COLS, max_gap=MAX_GAP, outages=outages)
+    panel = _as_of(panel, windows)
+
+    panel["prefix"] = panel["platform"].map({p: spec["prefix"] for p, spec in specs.items()})
+    panel["series"] = panel["prefix"] + "_" + panel["metric"]
+    panel = panel[panel["date"].between(start, end)]
+
+    growth = panel.assign(**{
+        f"value_cgr_{window_label(w)}": ((panel["value"] / panel[f"past_{w}"]) ** (1 / w) - 1) * 100 for w in windows
+    })
+    values = ["value"] + [f"value_cgr_{window_label(w)}" for w in windows]
+    wide = growth.pivot(index=["artist", "date"], columns="series", values=values)
+    wide.columns = [s if v == "value" else s + v[len("value"):] for v, s in wide.columns]
+
+    posts = pd.Series(False, index=panel.index)
+    for platform, spec in specs.items():
+        if "posts" in spec:
+            posts |= (panel["platform"] == platform) & (panel["metric"] == spec["posts"])
+    if posts.any():
+        rates = panel[posts]
+        rates = rates.assign(**{
+            f"value_per_day_{window_label(w)}": (rates["value"] - rates[f"past_{w}"]) / w for w in windows
+        })
+        values = [f"value_per_day_{window_label(w)}" for w in windows]
+        rates = rates.pivot(index=["artist", "date"], columns="prefix", values=values)
+        rates.columns = [p + "_posts" + v[len("value"):] for v, p in rates.columns]
+        wide = wide.join(rates)
+
+    wide = wide.reindex(columns=columns).dropna(how="all")
+    return wide.reset_index()
+
+
+def _as_of(panel, windows):
+    """
+    A cleaned panel (full daily grid per series) as it looked on each day: value
+    becomes the last observed value, carried forward up to MAX_GAP days, and
+    past_{w} the value w days earlier as known that day. That's the interpolated
+    value if its gap had closed by then, and the value carried forward if not.
+    That's what cleaning only the days up to D gives (as FeatureStore does), for
+    every D at once.
+    """
+    panel = panel.sort_values([*_SERIES_COLS, "date"], ignore_index=True)
+    observed = panel["value"].notna() & ~panel["imputed"]
+    series = [panel[c] for c in _SERIES_COLS]
+
+    carried = panel["value"].where(observed).groupby(series, sort=False).ffill(limit=MAX_GAP)
+    seen_next = panel["date"].where(observed).groupby(series, sort=False).bfill()
+    days_to_next = (seen_next - panel["date"]).dt.days
+
+    past = {}
+    for w in windows:
+        known = panel["value"].where(days_to_next <= w, carried)
+        past[f"past_{w}"] = known.groupby(series, sort=False).shift(w)
+    return panel.assign(value=carried, **past)
+
+
+def load_daily_manifest(out_dir=DAILY_DIR):
+    """Return {"schema_version", "config", "last_date"} of the materialized days, or {} if there are none."""
+
+    return load_manifest(out_dir, SCHEMA_VERSION, {})
+
+
+def materialize_daily_features(specs=PLATFORM_SPECS, windows=GROWTH_WINDOWS, store_dir=SOCIAL_STORE_DIR,
+                               out_dir=DAILY_DIR):
+    """
+    Bring the materialized daily features up to date with the social store.
+
+    Each day is one parquet file (year=YYYY/YYYY-MM-DD.parquet) with a row per
+    artist. Only days after the last materialized one are computed, plus the
+    REFRESH_DAYS before it; a first run, or a change of specs / windows, rebuilds
+    every day the store covers. Revisions of older archive days are not picked up
+    by an update, delete the manifest to rebuild.
+
+    The store's outage calendar is kept next to the days (outages.parquet), and an
+    update only recomputes it from its first day on, not over the whole store.
+
+    Returns the list of days written.
+    """
+    config = {"specs": specs, "windows": list(windows), "max_gap": MAX_GAP}
+    spans = [s for s in (date_span(p, store_dir) for p in specs) if s is not None]
+    if not spans:
+        return []
+    first, latest = min(s[0] for s in spans), max(s[1] for s in spans)
+
+    calendar_path = os.path.join(out_dir, "outages.parquet")
+    manifest = load_daily_manifest(out_dir)
+    if manifest.get("config") == config and os.path.exists(calendar_path):
+        last = pd.Timestamp(manifest["last_date"])
+        if latest <= last:
+            return []
+        start = max(first, last - pd.Timedelta(days=REFRESH_DAYS))
+    else:
+        for d in os.listdir(out_dir) if os.path.isdir(out_dir) else []:
+            if d.startswith("year="):
+                shutil.rmtree(os.path.join(out_dir, d))
+        start = first
+
+    # one calendar for every chunk, so chunk boundaries don't change what counts as an outage
+    if start > first:
+        outages = pd.read_parquet(calendar_path)
+        outages = pd.concat([outages[outages["date"] < start], outage_calendar(specs, store_dir, start=start)],
+                            ignore_index=True)
+    else:
+        outages = outage_calendar(specs, store_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    outages.to_parquet(calendar_path, index=False)
+
+    written = []
+    for chunk_start in pd.date_range(start, latest, freq=f"{CHUNK_DAYS}D"):
+        chunk_end = min(chunk_start + pd.Timedelta(days=CHUNK_DAYS - 1), latest)
+        days = compute_daily_features(chunk_start, chunk_end, specs, windows, store_dir, outages)
+        for date, rows in days.groupby("date", sort=True):
+            path = _day_path(out_dir, date)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(rows.drop(columns="date"), preserve_index=False), path)
+            written.append(str(date.date()))
+
+    save_manifest({"schema_version": SCHEMA_VERSION, "config": config, "last_date": str(latest.date())}, out_dir)
+    return written
+
+
+def read_daily_features(date, artists=None, out_dir=DAILY_DIR):
+    """Every artist's features on one day (or just artists'), from that day's file."""
+
+    path = _day_path(out_dir, date)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["artist", "date"])
+
+    filters = None if artists is None else [("artist", "in", [artists] if isinstance(artists, str) else list(artists))]
+    day = pq.read_table(path, filters=filters).to_pandas()
+    day.insert(1, "date", pd.Timestamp(date).normalize())
+    return day
+
+
+def lookup_daily_features(queries, artist_col="artist", date_col="date", out_dir=DAILY_DIR):
+    """
+    queries with the materialized features of each (artist, date) row added, in its
+    original order. Only the days in queries are opened, once each.
+    """
+    dates = pd.to_datetime(queries[date_col]).dt.normalize()
+    found = pd.concat(
+        [read_daily_features(d, queries.loc[dates == d, artist_col].dropna().unique(), out_dir)
+         for d in dates.dropna().unique()],
+        ignore_index=True,
+    ) if dates.notna().any() else pd.DataFrame(columns=["artist", "date"])
+
+    keys = pd.MultiIndex.from_arrays([queries[artist_col], dates])
+    found = found.set_index(["artist", "date"]).reindex(keys)
+
+    out = queries.copy()
+    for c in found.columns:
+        out[c] = found[c].to_numpy()
+    return out
@@ -62,27 +62,36 @@ using a feature representing the artists social media engagement prior to the so
 """
 
 #%%
-import pandas as pd
 import os
+import pandas as pd
+from chart_events import read_events, record_chart_events
+from chart_store import ingest_all, read_store
+from keys import intern
+from lifecycle import refresh_lifecycles
 
 #%%
 
 years = ["2022", "2023", "2024", "2025"]
 
-total_hot_100 = pd.DataFrame()
+# Only weeks that are new (or whose file changed) since the last run get parsed, see chart_store.py
+# The store holds the Billboard 200 too, use chart_store.query_charts for cross-chart queries.
+all_changes = ingest_all()
+for chart, changes in all_changes.items():
+    print(f"{chart} weeks added: {len(changes['added'])}, updated: {len(changes['updated'])}, removed: {len(changes['removed'])}")
+
+# Week-over-week diffs (entries, re-entries, moves, holds, exits), only for the weeks that changed
+for chart, chart_changes in all_changes.items():
+    record_chart_events(chart, chart_changes)
 
-for year in years:
+changes = all_changes["hot_100"]
 
-    file_count = 0
-    
-    for file in os.listdir(f"data/raw_data/hot_100/{year}"):
+total_hot_100 = read_store("hot_100", years=years)
 
-        total_hot_100 = pd.concat([total_hot_100, pd.read_csv(f"data/raw_data/hot_100/{year}/{file}")])
-        file_count += 1
-        
-    print(f"Added {file_count} files to hot_100 from {year}")
+for year, file_count in total_hot_100.groupby(total_hot_100["chart_week"].dt.year)["chart_week"].nunique().items():
+    print(f"{file_count} weeks in hot_100 from {year}")
 
-total_hot_100.to_csv("data/processed_data/total_hot_100.csv", index=False)
+if any(changes.values()) or not os.path.exists("data/processed_data/total_hot_100.csv"):
+    total_hot_100.to_csv("data/processed_data/total_hot_100.csv", index=False)
 total_hot_100
 
 #%%
@@ -97,12 +106,24 @@ Let's add a song_id field, which is (title) - (performers).
 
 total_hot_100 = total_hot_100.sort_values(by=["chart_week", "current_week"], ascending=[True, True])
 total_hot_100["song_id"] = total_hot_100["title"].str.strip() + " — " + total_hot_100["performer"].str.strip()
+# int32 surrogate for song_id, stable across runs (see keys.py), so groupbys / merges run on integers
+total_hot_100["song_key"] = intern(total_hot_100["song_id"], "song")
 total_hot_100.rename(columns={"performer": "performers"}, inplace=True)
 print(f"Unique songs: {total_hot_100['song_id'].nunique()}")
 print(f"Unique performers: {total_hot_100['performers'].nunique()}")
 
 #%%
 
+# One lifecycle row per song (debut, peak, lifespan, re-entries, positions...), see lifecycle.py.
+# Only new chart weeks get folded in, and everything downstream reads this instead of its own groupbys.
+lifecycles = refresh_lifecycles(total_hot_100, changes)
+
+# This week's movers, straight from the event log
+latest_events = read_events("hot_100", start=total_hot_100["chart_week"].max())
+latest_events["event"].value_counts()
+
+#%%
+
 """
 Here we have all the Billboard Hot 100 weekly charts from 2022 to 2025.
 Within this, we have 2479 unique songs. 
@@ -141,12 +162,13 @@ So, let's keep the songs_ids whose lifecycle started within 2022 - 2025.
 
 #%%
 
-emerging_song_ids = total_hot_100.loc[total_hot_100["wks_on_chart"] == 1, "song_id"].unique()
-print(f"Unique emerging songs: {len(emerging_song_ids)}")
+# emerging = the song has a week with wks_on_chart == 1 in our period
+emerging_song_keys = lifecycles.loc[lifecycles["emerging"], "song_key"]
+print(f"Unique emerging songs: {len(emerging_song_keys)}")
 
 #%%
 
-emerging_songs_df = total_hot_100[total_hot_100["song_id"].isin(emerging_song_ids)].copy()
+emerging_songs_df = total_hot_100[total_hot_100["song_key"].isin(emerging_song_keys)].copy()
 print(f"Unique emerging songs: {len(emerging_songs_df['song_id'].unique())}")
 
 #%%
@@ -199,107 +221,21 @@ We need to normalize these...
 
 #%%
 
-import re
-
-#%%
-
-# Here are a the exceptions that I have compiled. 
-artist_exceptions = {
-    "tyler, the creator",
-    "Brooks & Dunn",
-    "Yahritza y Su Esencia",
-    "Dan + Shay",
-    "Florence + The Machine",
-    "Lil Nas X",
-    "Richy Mitch And The Coal Miners"
-    "HUNTR/X",
-}
-
-# find the last - in song_id, which delimits song title from song artist
-title_artist_split = re.compile(r"\s[—-]\s(?!.*\s[—-]\s)")
-
-# Find the common delimiters for songs with multiple artists
-delims = re.compile(
-    r"""
-    (?:                      
-        ,\s*                                  # comma (no leading space required)
-      | \s+(?:featuring|presents|with|and)\s+ # word delimiters with spaces
-      | \s+y\s+                               # ' y ' with spaces
-      | \s+x\s+                               # ' x ' with spaces
-      | \s*&\s*                               # & with spaces
-      | \s*/\s*                               # / with spaces
-      | \s*\+\s*                              # + with spaces
-    )
-    """,
-    re.IGNORECASE | re.VERBOSE
-)
-
-# find instances where the main artist is among the exceptions
-exceptions_as_main = re.compile(
-    r"^(?:%s)\b" % "|".join(re.escape(x) for x in artist_exceptions),
-    flags=re.IGNORECASE
-)
-
-
-def extract_artists(song_id: str) -> str:
-    """Extract the artist(s) portion from a song_id."""
-    
-    # use title_artist_split
-    parts = title_artist_split.split(song_id.strip())
-    if len(parts) >= 2:
-        return parts[-1].strip()
-    
-    return song_id.strip()
-
-
-def compute_main_artist_from_artists(artists_str: str) -> str:
-    """Given the artist(s) string, return the main artist."""
-    
-    s = (artists_str or "").strip()
-    if not s:
-        return ""
-    
-    # Let's check if main artist is an exception
-    m = exceptions_as_main.match(s)
-    if m:
-        return m.group(0).strip()
-
-    # Split on first delimiter found and return what's before
-    main_artist = delims.split(s, maxsplit=1)[0].strip()
-
-    return main_artist
-
-
-def compute_main_artist_from_song_id(song_id: str) -> str:
-    return compute_main_artist_from_artists(extract_artists(song_id))
+# The exceptions I have compiled, the delimiters above and the parsing code live in artists.py
+from artists import extract_main_artists, normalize_artists
 
 # %%
 
 # Let's apply the code above to parse the main artists from each release, and calculate unique performers etc.
-emerging_songs_df["main_artist"] = emerging_songs_df["song_id"].apply(compute_main_artist_from_song_id)
-
-# Here are some instances of artists with two names that we need to normalize
-emerging_songs_df.replace({
-    "JIN": "Jin",
-    "4*TOWN (From Disney": "4*TOWN (From Disney And Pixar's Turning Red)",
-    "mgk": "Machine Gun Kelly",
-    "¥$: Kanye West": "Kanye West",
-    "$uicideBoy$": "$uicideboy$",
-    "Charli XCX": "Charli xcx",
-    "Yahritza y Su Esencia": "Yahritza Y Su Esencia",
-    "Tyler, the Creator": "Tyler, The Creator",
-    "twenty one pilots": "Twenty One Pilots",
-    "jessie murph": "Jessie Murph",
-    "BLEU": "Yung Bleu",
-    "HUNTRX": "HUNTR/X",
-    "HUNTR": "HUNTR/X",
-    "Twice": "TWICE",
-    "Pharrell": "Pharrell Williams",
-    "BossMan DLow": "BossMan Dlow",
-    "Richy Mitch": "Richy Mitch And The Coal Miners",
-    "Jennie": "JENNIE",
-    "Mariah The Scientist": "Mariah the Scientist"
-}, inplace=True)
+# Each distinct song_id / performers string is only parsed once
+emerging_songs_df["main_artist"] = extract_main_artists(emerging_songs_df["song_id"])
+
+# Artists with two names are normalized through the alias registry in artists.py.
+# Only the artist columns are touched, and each distinct name is looked up once.
+for col in ["main_artist", "performers"]:
+    emerging_songs_df[col] = normalize_artists(emerging_songs_df[col])
+
+emerging_songs_df["artist_key"] = intern(emerging_songs_df["main_artist"], "artist")
 
 collab_rows = emerging_songs_df[
     emerging_songs_df["main_artist"] != emerging_songs_df["performers"]
@@ -309,9 +245,9 @@ solo_rows = emerging_songs_df[
     emerging_songs_df["main_artist"] == emerging_songs_df["performers"]
 ]
 
-num_unique_collab_songs = collab_rows["song_id"].nunique()
-num_unique_solo_songs = solo_rows["song_id"].nunique()
-num_unique_solo_artists = solo_rows["main_artist"].nunique()
+num_unique_collab_songs = collab_rows["song_key"].nunique()
+num_unique_solo_songs = solo_rows["song_key"].nunique()
+num_unique_solo_artists = solo_rows["artist_key"].nunique()
 
 emerging_songs_df.to_csv("data/processed_data/emerging_songs.csv", index=False)
 
@@ -325,3 +261,22 @@ print(f"Unique performers: {emerging_songs_df['performers'].nunique()}")
 print(f"Unique main artists: {emerging_songs_df['main_artist'].nunique()}")
 
 # %%
+
+"""
+Beyond the main artist, every credited artist on a song goes into an artist-song edge table
+(with lead / featured role and credit position), so questions about featured artists don't
+need the regexes again. ArtistSongIndex gives "songs of an artist" / "artists on a song" lookups.
+"""
+
+#%%
+
+from artists import ArtistSongIndex, build_artist_song_edges
+
+artist_song_edges = build_artist_song_edges(emerging_songs_df)
+artist_song_edges.to_csv("data/processed_data/artist_song_edges.csv", index=False)
+artist_song_index = ArtistSongIndex(artist_song_edges)
+
+print(f"Unique credited artists: {artist_song_edges['artist_key'].nunique()}")
+print(f"Featured credits: {(artist_song_edges['role'] == 'featured').sum()}")
+
+# %%
@@ -20,11 +20,19 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 import pandas as pd
 import ast
+from keys import attach_keys
+from lifecycle import build_lifecycles, explode_lifecycles, load_lifecycles
 
 
 #%%
 
-emerging_songs_df = pd.read_csv("data/processed_data/emerging_songs.csv")
+emerging_songs_df = attach_keys(pd.read_csv("data/processed_data/emerging_songs.csv"))
+
+# Per-song lifespans / positions come from the lifecycle table built in data_processing.py
+lifecycles = load_lifecycles()
+if lifecycles is None:
+    lifecycles = build_lifecycles(emerging_songs_df)
+lifecycles = lifecycles[lifecycles["song_key"].isin(emerging_songs_df["song_key"])]
 
 collab_rows = emerging_songs_df[
     emerging_songs_df["main_artist"] != emerging_songs_df["performers"]
@@ -46,17 +54,9 @@ print(f"Unique main artists: {emerging_songs_df['main_artist'].nunique()}")
 
 #%%
 
-weeks_on_chart = emerging_songs_df.copy()
-weeks_on_chart.sort_values(by="wks_on_chart", ascending=False)
-weeks_on_chart = weeks_on_chart.groupby("song_id")["wks_on_chart"].max().reset_index()
-
-weeks_on_chart_no_collabs = solo_rows.copy()
-weeks_on_chart_no_collabs.sort_values(by="wks_on_chart", ascending=False)
-weeks_on_chart_no_collabs = weeks_on_chart_no_collabs.groupby("song_id")["wks_on_chart"].max().reset_index()
-
-weeks_on_chart_only_collabs = collab_rows.copy()
-weeks_on_chart_only_collabs.sort_values(by="wks_on_chart", ascending=False)
-weeks_on_chart_only_collabs = weeks_on_chart_only_collabs.groupby("song_id")["wks_on_chart"].max().reset_index()
+weeks_on_chart = lifecycles[["song_key", "song_id", "lifespan"]].rename(columns={"lifespan": "wks_on_chart"})
+weeks_on_chart_no_collabs = weeks_on_chart[weeks_on_chart["song_key"].isin(solo_rows["song_key"])]
+weeks_on_chart_only_collabs = weeks_on_chart[weeks_on_chart["song_key"].isin(collab_rows["song_key"])]
 
 #%%
 
@@ -95,21 +95,15 @@ for emerging songs between 2022 - 2025
 
 #%%
 
-df = emerging_songs_df.copy()
-df = df.sort_values(["song_id", "chart_week"])
-df["week_idx"] = df.groupby("song_id").cumcount()
-
-lifespan = (df.groupby("song_id")["wks_on_chart"]
-               .max()
-               .rename("lifespan"))
-
 bins = [0, 2, 8, 16, 32, 64, np.inf]
 labels = ["1–2", "3–8", "9–16", "17–32", "33–64", "65+"]
 
-lifespan_bins = pd.cut(lifespan, bins=bins, labels=labels, include_lowest=True, right=True)
-song_bins = lifespan.to_frame().assign(lifespan_bin=lifespan_bins)
+song_bins = lifecycles.assign(
+    lifespan_bin=pd.cut(lifecycles["lifespan"], bins=bins, labels=labels, include_lowest=True, right=True)
+)
 
-df = df.merge(song_bins, on="song_id", how="left")
+# one row per song-week, week_idx = weeks since debut
+df = explode_lifecycles(song_bins)
 
 bin_colors = {
     "1–2":   "#6b7280",  # gray
@@ -162,21 +156,12 @@ plt.show()
 
 #%%
 
-df = emerging_songs_df.copy()
-df = df.sort_values(["song_id", "chart_week"])
-df["week_idx"] = df.groupby("song_id").cumcount()
-
-lifespan = (df.groupby("song_id")["wks_on_chart"]
-               .max()
-               .rename("lifespan"))
-
 bins = [0, 2, 8, 16, 32, 64, np.inf]
 labels = ["1–2", "3–8", "9–16", "17–32", "33–64", "65+"]
 
-lifespan_bins = pd.cut(lifespan, bins=bins, labels=labels, include_lowest=True, right=True)
-song_bins = lifespan.to_frame().assign(lifespan_bin=lifespan_bins)
-
-df = df.merge(song_bins, on="song_id", how="left")
+song_bins = lifecycles.assign(
+    lifespan_bin=pd.cut(lifecycles["lifespan"], bins=bins, labels=labels, include_lowest=True, right=True)
+)
 
 bin_colors = {
     "1–2":   "#6b7280",  # gray
@@ -190,13 +175,13 @@ bin_colors = {
 plt.figure(figsize=(12,6))
 
 for label in labels:
-    sub = df[df["lifespan_bin"] == label]
-    for sid, g in sub.groupby("song_id"):
-        plt.plot(g["week_idx"], g["current_week"],
+    # each song's positions list is its lifecycle, aligned at debut week
+    for positions in song_bins.loc[song_bins["lifespan_bin"] == label, "positions"]:
+        plt.plot(range(len(positions)), positions,
                  linewidth=0.28, alpha=0.5, color=bin_colors[str(label)], rasterized=True)
 
 plt.gca().invert_yaxis()
-plt.xlim(0, df["week_idx"].max())
+plt.xlim(0, song_bins["weeks_charted"].max() - 1)
 plt.ylim(100.5, 0.5)
 plt.xlabel("Weeks since debut")
 plt.ylabel("Billboard Hot 100 Rank")
@@ -352,19 +337,16 @@ Log-followers at release (scale)
 #%%
 
 import pandas as pd
+from social_store import build_social_store, query_social
 
-#%%
-
-tiktok = pd.read_csv("data/raw_data/social_archives/tiktok_archive.csv")
-tiktok["date"] = pd.to_datetime(tiktok["date"])
-tiktok.drop(columns=["Unnamed: 0"], inplace=True)
-tiktok
+# Only the artist being plotted gets read from the store, see social_store.py
+build_social_store()
 
 #%%
 
 artist_name = "JENNIE"
 
-artist_tiktok = tiktok[tiktok["artist_id"] == artist_name].sort_values("date")
+artist_tiktok = query_social("tiktok", artists=[artist_name]).sort_values("date")
 
 normed = artist_tiktok[["followers","uploads","likes"]].apply(lambda x: (x - x.min()) / (x.max() - x.min()))
 normed["date"] = artist_tiktok["date"]
@@ -378,17 +360,10 @@ plt.title(f"{artist_name} TikTok Metrics (Normalized)")
 plt.ylabel("Normalized (0–1)")
 plt.show()
 
-# %%
-
-youtube = pd.read_csv("data/raw_data/social_archives/youtube_archive.csv")
-youtube["date"] = pd.to_datetime(youtube["date"])
-youtube.drop(columns=["Unnamed: 0"], inplace=True)
-youtube
-
 #%%
 artist_name = "Taylor Swift"
 
-artist_youtube = youtube[youtube["artist_id"] == artist_name].sort_values("date")
+artist_youtube = query_social("youtube", artists=[artist_name]).sort_values("date")
 
 normed = artist_youtube[["subs","views"]].apply(lambda x: (x - x.min()) / (x.max() - x.min()))
 normed["date"] = artist_youtube["date"]
@@ -45,46 +45,67 @@ import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
 import ast
-from utils import expand_to_full_window, plot_two_metrics
+from utils import plot_two_metrics
+from keys import attach_keys, intern
+from lifecycle import build_lifecycles, load_lifecycles
+from daily_features import load_daily_manifest, read_daily_features
+from feature_store import FeatureStore
+from social_pipeline import PLATFORM_SPECS, build_social_panel, platform_frame
+from social_store import build_social_store
 
 #%%
 
-emerging_songs = pd.read_csv("data/processed_data/emerging_songs.csv")
+# song_key / artist_key are int32 surrogates of song_id / main_artist (see keys.py)
+emerging_songs = attach_keys(pd.read_csv("data/processed_data/emerging_songs.csv"))
 solo_songs = emerging_songs[emerging_songs["main_artist"] == emerging_songs["performers"]].copy()
-solo_songs = solo_songs.drop_duplicates(subset="song_id")
-solo_songs.groupby("main_artist")["song_id"].nunique()
+solo_songs = solo_songs.drop_duplicates(subset="song_key")
+solo_songs.groupby("artist_key")["song_key"].nunique()
 
 sampled_solo_songs = (solo_songs
-           .groupby("main_artist", group_keys=False)
+           .groupby("artist_key", group_keys=False)
            .apply(lambda g: g.sample(1, random_state=42))
            .reset_index(drop=True))
 
-song_peaks = (emerging_songs
-           .groupby("song_id", as_index=False)["current_week"]
-           .min()
-           .rename(columns={"current_week": "peak_pos"}))
+#%%
+
+"""
+Since the social features come from the feature store now (features of any artist as of
+any date, see feature_store.py), we don't have to stop at one solo song per artist: every
+emerging song gets a row. For collabs the artist is the lead / main artist.
+
+solo marks the solo songs, sampled the one-song-per-artist sample above, for anything that
+still needs one song per artist.
+"""
+
+# one row per song, on its entry week (emerging_songs is in chart_week order)
+all_songs = emerging_songs.drop_duplicates(subset="song_key")
 
-lifespans = (emerging_songs
-           .groupby("song_id", as_index=False)["wks_on_chart"]
-           .max()
-           .rename(columns={"wks_on_chart": "lifespan"}))
+# peak_pos and lifespan come from the lifecycle table that data_processing.py keeps up to date
+lifecycles = load_lifecycles()
+if lifecycles is None:
+    lifecycles = build_lifecycles(emerging_songs)
 
 feature_df = pd.DataFrame({
-    "song_id": sampled_solo_songs["song_id"],
-    "title": sampled_solo_songs["title"],
-    "artist": sampled_solo_songs["main_artist"],
-    "entry_week_date": sampled_solo_songs["chart_week"],
-    "entry_week_pos": sampled_solo_songs["current_week"],
+    "song_key": all_songs["song_key"],
+    "artist_key": all_songs["artist_key"],
+    "song_id": all_songs["song_id"],
+    "title": all_songs["title"],
+    "artist": all_songs["main_artist"],
+    "solo": all_songs["main_artist"] == all_songs["performers"],
+    "sampled": all_songs["song_key"].isin(sampled_solo_songs["song_key"]),
+    "entry_week_date": all_songs["chart_week"],
+    "entry_week_pos": all_songs["current_week"],
 })
 
 metadata = pd.read_csv("data/processed_data/metadata.csv")
 metadata["genreNames"] = metadata["genreNames"].apply(lambda x: ast.literal_eval(x) if pd.notnull(x) else [])
 metadata.drop(columns=["Unnamed: 0"], inplace=True)
+metadata["song_key"] = intern(metadata["song_id"], "song")
 
 feature_df = feature_df.merge(
-    metadata[["song_id", "releaseDate", "genreNames", "durationInMillis"]]
+    metadata[["song_key", "releaseDate", "genreNames", "durationInMillis"]]
       .rename(columns={"releaseDate": "release_date", "genreNames": "genres", "durationInMillis": "song_length"}),
-    on="song_id",
+    on="song_key",
     how="left"
 )
 
@@ -95,12 +116,11 @@ feature_df["genres"] = feature_df["genres"].apply(
 
 feature_df["song_length"] = feature_df["song_length"] / 60000
 
-feature_df = feature_df.merge(song_peaks, on="song_id", how="left")
-feature_df = feature_df.merge(lifespans, on="song_id", how="left")
+feature_df = feature_df.merge(lifecycles[["song_key", "peak_pos", "lifespan"]], on="song_key", how="left")
 
 # Let's reorder the columns to what I described in the comment
 
-cols = ["song_id", "title", "artist", "genres",
+cols = ["song_key", "artist_key", "song_id", "title", "artist", "solo", "sampled", "genres",
         "song_length", "release_date", "entry_week_date", 
         "entry_week_pos", "peak_pos", "lifespan"] 
 feature_df = feature_df[cols]
@@ -124,17 +144,22 @@ Ok, now, we do / compute the following before the train test split:
 
 #%%
 
-instagram = pd.read_csv("data/raw_data/social_archives/instagram_archive.csv")
-instagram["date"] = pd.to_datetime(instagram["date"])
-instagram.drop(columns=["Unnamed: 0"], inplace=True)
+# The archives live in a parquet store partitioned by platform / artist (see social_store.py),
+# only rebuilt when an archive changed. Below we only read each release's 28-day window.
+build_social_store()
 
-tiktok = pd.read_csv("data/raw_data/social_archives/tiktok_archive.csv")
-tiktok["date"] = pd.to_datetime(tiktok["date"])
-tiktok.drop(columns=["Unnamed: 0"], inplace=True)
+releases = feature_df[["artist", "release_date"]].dropna()
+
+#%%
 
-youtube = pd.read_csv("data/raw_data/social_archives/youtube_archive.csv")
-youtube["date"] = pd.to_datetime(youtube["date"])
-youtube.drop(columns=["Unnamed: 0"], inplace=True)
+# Every tracked artist's rolling features for every day, stored by day (see daily_features.py).
+# They're materialized by scripts/materialize_daily_features.py, not here. Handy for a watchlist:
+last_date = load_daily_manifest().get("last_date")
+if last_date:
+    latest_day = read_daily_features(last_date)
+    print(latest_day.sort_values("tt_followers_cgr_1w", ascending=False).head(20))
+else:
+    print("No daily features yet, run python -m scripts.materialize_daily_features")
 
 #%%
 
@@ -147,51 +172,55 @@ for Youtube, it seems to be specifically when SocialBlade API changed their API.
 
 #%%
 
-youtube = youtube.merge(
-    feature_df[["artist", "release_date"]],
-    left_on="artist_id",
-    right_on="artist",
-    how="left"
-)
+"""
+Every platform and metric we use is listed in social_pipeline.PLATFORM_SPECS:
 
-youtube["date"] = pd.to_datetime(youtube["date"])
-youtube["release_date"] = pd.to_datetime(youtube["release_date"])
+YouTube: subs, views
+TikTok: followers, uploads, likes
+Instagram: followers, media
 
-mask = (
-    (youtube["date"] >= youtube["release_date"] - pd.Timedelta(days=28)) &
-    (youtube["date"] <= youtube["release_date"])
-)
+They're all stacked into one long (artist, platform, metric, date) table and cleaned together:
+full 28 day windows, outage detection, imputation. Adding a platform is adding a spec entry.
+"""
 
-yt_pre4_df = youtube.loc[mask, ["artist","platform","date","release_date","subs","views"]].copy()
-yt_pre4_df = yt_pre4_df.sort_values(["artist","date"]).reset_index(drop=True)
+#%%
 
-yt_pre4_clean = expand_to_full_window(yt_pre4_df, ("artist","platform"), "date", "release_date", 28)
+# Zeros after a series was positive are almost surely "missing". When many artists go missing
+# on the same dates, that's a SocialBlade outage rather than the artist, see social_cleaning.py.
+# Outage dates come from the whole store, so they don't depend on which releases we pass.
+# Outages and zero drops of cumulative metrics are blanked and linearly interpolated.
+panel, outages = build_social_panel(releases, days_back=28)
+outages
 
 #%%
-"""
-Let's plot ALL Artist youtube data prior to release.
-"""
-plot_two_metrics(yt_pre4_clean, metric1="subs", metric2="views",
-                 outdir="graphs/yt_original",
-                 filename_pattern="yt_{artist}_{platform}.png")
 
-#%%
+flagged = panel[panel["status"].isin(["zero_drop", "outage"])]
 
-grp = ["artist", "platform"]
+def flagged_artists(platform, metric):
+    """Artists with zero drops / outages in one platform's metric."""
+    rows = flagged[(flagged["platform"] == platform) & (flagged["metric"] == metric)]
+    return rows["artist"].unique()
 
-# 1) Mark zeros that are almost surely "missing" (group has some positive values)
-views_has_pos = yt_pre4_clean.groupby(grp)["views"].transform("max") > 0
-subs_has_pos  = yt_pre4_clean.groupby(grp)["subs"].transform("max")  > 0
+def plot_platform(platform, column="raw", artists=None, kind="original"):
+    """plot_two_metrics of a platform's first vs last metric, raw or cleaned ("value")."""
+    prefix, metrics = PLATFORM_SPECS[platform]["prefix"], PLATFORM_SPECS[platform]["metrics"]
+    plot_two_metrics(platform_frame(panel, platform, column), metric1=metrics[0], metric2=metrics[-1],
+                     artists=artists,
+                     outdir=f"graphs/{prefix}_{kind}",
+                     filename_pattern=f"{prefix}_{{artist}}_{{platform}}.png")
 
-zero_views_missing = (yt_pre4_clean["views"] == 0) & views_has_pos
-zero_subs_missing  = (yt_pre4_clean["subs"]  == 0) & subs_has_pos
+def imputed_artists(platform):
+    return panel.loc[(panel["platform"] == platform) & panel["imputed"], "artist"].unique()
 
-yt_pre4_clean["views_zero_proxy_missing"] = zero_views_missing
-yt_pre4_clean["subs_zero_proxy_missing"]  = zero_subs_missing
+#%%
+"""
+Let's plot ALL Artist youtube data prior to release.
+"""
+plot_platform("youtube")
 
 #%%
 
-yt_pre4_clean[yt_pre4_clean["views_zero_proxy_missing"] == True]
+flagged_artists("youtube", "views")
 
 #%%
 
@@ -214,41 +243,25 @@ Those above with (Impute) are because of this, YG Marley's page was at 0 views
 
 #%%
 
-yt_pre4_clean[yt_pre4_clean["subs_zero_proxy_missing"] == True]
+flagged_artists("youtube", "subs")
 # None!
 
 #%%
 """
 Ok, let's turn the 0.0 values to NaNs and then impute them with linear interpolation.
+
+build_social_panel already does this for every platform: outages and zero drops of
+cumulative metrics (subs, views, followers, likes) are blanked and interpolated. raw keeps
+the value before cleaning and status says why a cell was touched.
 """
 
 #%%
 
-target_artists = ["Chuckyy", "Eric Church", "Karol G", "Mariah the Scientist", "Sleep Token"]
-mask = (yt_pre4_clean["artist"].isin(target_artists) & (yt_pre4_clean["views"] == 0.0))
-yt_pre4_clean.loc[mask, "views"] = np.nan
-
-yt_pre4_clean["views"] = (
-    yt_pre4_clean
-    .groupby("artist")["views"]
-    .transform(lambda s: s.interpolate())
-)
-
-yt_pre4_clean["subs"] = (
-    yt_pre4_clean
-    .groupby("artist")["subs"]
-    .transform(lambda s: s.interpolate())
-)
-
-yt_pre4_clean[yt_pre4_clean["artist"] == "Sleep Token"]["views"]
+panel[(panel["artist"] == "Sleep Token") & (panel["metric"] == "views")][["date", "raw", "value", "status"]]
 
 #%%
 
-plot_two_metrics(yt_pre4_clean, metric1="subs", metric2="views",
-                artists=["Chuckyy", "Eric Church", "Karol G", 
-                "Mariah the Scientist", "Sleep Token"],
-                 outdir="graphs/yt_imputed",
-                 filename_pattern="yt_{artist}_{platform}.png")
+plot_platform("youtube", "value", artists=imputed_artists("youtube"), kind="imputed")
 
 #%%
 
@@ -257,47 +270,12 @@ Ok, Let's check for IG.
 """
 #%%
 
-instagram = instagram.merge(
-    feature_df[["artist", "release_date"]],
-    left_on="artist_id",
-    right_on="artist",
-    how="left"
-)
-
-instagram["date"] = pd.to_datetime(instagram["date"])
-instagram["release_date"] = pd.to_datetime(instagram["release_date"])
-
-mask = (
-    (instagram["date"] >= instagram["release_date"] - pd.Timedelta(days=28)) &
-    (instagram["date"] <= instagram["release_date"])
-)
-
-ig_pre4_df = instagram.loc[mask, ["artist","platform","date","release_date","followers","following", "media"]].copy()
-ig_pre4_df = ig_pre4_df.sort_values(["artist","date"]).reset_index(drop=True)
-
-ig_pre4_clean = expand_to_full_window(ig_pre4_df, ("artist","platform"), "date", "release_date", 28)
-
-#%%
-grp = ["artist", "platform"]
-
-# 1) Mark zeros that are almost surely "missing" (group has some positive values)
-followers_has_pos = ig_pre4_clean.groupby(grp)["followers"].transform("max") > 0
-media_has_pos  = ig_pre4_clean.groupby(grp)["media"].transform("max")  > 0
-
-zero_followers_missing = (ig_pre4_clean["followers"] == 0) & followers_has_pos
-zero_media_missing  = (ig_pre4_clean["media"]  == 0) & media_has_pos
-
-ig_pre4_clean["followers_zero_proxy_missing"] = zero_followers_missing
-ig_pre4_clean["media_zero_proxy_missing"]  = zero_media_missing
-
-#%%
-
-ig_pre4_clean[ig_pre4_clean["followers_zero_proxy_missing"] == True]
+flagged_artists("instagram", "followers")
 # None!
 
 #%%
 
-ig_pre4_clean[ig_pre4_clean["media_zero_proxy_missing"] == True]
+flagged_artists("instagram", "media")
 
 #%%
 """
@@ -323,9 +301,7 @@ Also, none occured during the SocialBlade API Outage...
 
 #%%
 
-plot_two_metrics(ig_pre4_clean, metric1="followers", metric2="media",
-                 outdir="graphs/ig_original",
-                 filename_pattern="ig_{artist}_{platform}.png")
+plot_platform("instagram")
 
 #%%
 """
@@ -333,25 +309,14 @@ There are instances after using expand to full window where we need to beware of
 and impute those, rather than just 0s
 
 Let's impute, but skip the protocol of making 0s NaNs
-"""
-
-ig_pre4_clean["followers"] = (
-    ig_pre4_clean
-    .groupby("artist")["followers"]
-    .transform(lambda s: s.interpolate())
-)
 
-ig_pre4_clean["media"] = (
-    ig_pre4_clean
-    .groupby("artist")["media"]
-    .transform(lambda s: s.interpolate())
-)
+Media isn't cumulative, so build_social_panel leaves its zero drops alone (only outages
+would be blanked) and only fills the NaNs.
+"""
 
 #%%
 
-plot_two_metrics(ig_pre4_clean, metric1="followers", metric2="media",
-                 outdir="graphs/ig_imputed",
-                 filename_pattern="ig_{artist}_{platform}.png")
+plot_platform("instagram", "value", artists=imputed_artists("instagram"), kind="imputed")
 
 #%%
 """
@@ -359,46 +324,7 @@ Same for Instagram. Let's check for TikTok.
 """
 #%%
 
-tiktok = tiktok.merge(
-    feature_df[["artist", "release_date"]],
-    left_on="artist_id",
-    right_on="artist",
-    how="left"
-)
-
-tiktok["date"] = pd.to_datetime(tiktok["date"])
-tiktok["release_date"] = pd.to_datetime(tiktok["release_date"])
-
-mask = (
-    (tiktok["date"] >= tiktok["release_date"] - pd.Timedelta(days=28)) &
-    (tiktok["date"] <= tiktok["release_date"])
-)
-
-tt_pre4_df = tiktok.loc[mask, ["artist","platform","date","release_date","followers","following", "uploads", "likes"]].copy()
-tt_pre4_df = tt_pre4_df.sort_values(["artist","date"]).reset_index(drop=True)
-
-tt_pre4_clean = expand_to_full_window(tt_pre4_df, ("artist","platform"), "date", "release_date", 28)
-
-#%%
-
-grp = ["artist", "platform"]
-
-# 1) Mark zeros that are almost surely "missing" (group has some positive values)
-followers_has_pos = tt_pre4_clean.groupby(grp)["followers"].transform("max") > 0
-uploads_has_pos  = tt_pre4_clean.groupby(grp)["uploads"].transform("max")  > 0
-likes_has_pos  = tt_pre4_clean.groupby(grp)["likes"].transform("max")  > 0
-
-zero_followers_missing = (tt_pre4_clean["followers"] == 0) & followers_has_pos
-zero_media_missing  = (tt_pre4_clean["uploads"]  == 0) & uploads_has_pos
-zero_likes_missing  = (tt_pre4_clean["likes"]  == 0) & likes_has_pos
-
-tt_pre4_clean["followers_zero_proxy_missing"] = zero_followers_missing
-tt_pre4_clean["uploads_zero_proxy_missing"]  = zero_media_missing
-tt_pre4_clean["likes_zero_proxy_missing"]  = zero_likes_missing
-
-#%%
-
-tt_pre4_clean[tt_pre4_clean["followers_zero_proxy_missing"] == True]
+flagged_artists("tiktok", "followers")
 
 """
 Jack Harlow (Impute)
@@ -411,7 +337,7 @@ You can tell visually from their graphs, that these are all errors.
 """
 #%%
 
-tt_pre4_clean[tt_pre4_clean["uploads_zero_proxy_missing"] == True]
+flagged_artists("tiktok", "uploads")
 
 """
 Doja Cat (No Need to Impute)
@@ -428,47 +354,21 @@ No need to impute or be concerned.
 
 #%%
 
-tt_pre4_clean[tt_pre4_clean["likes_zero_proxy_missing"] == True]
+flagged_artists("tiktok", "likes")
 # None!
 
 #%%
 
-plot_two_metrics(tt_pre4_clean, metric1="followers", metric2="likes",
-                 outdir="graphs/tt_original",
-                 filename_pattern="tt_{artist}_{platform}.png")
+plot_platform("tiktok")
 
 #%%
-# Impute Tiktok Followers for these artists
+# Impute Tiktok Followers for these artists (followers are cumulative, so build_social_panel did)
 
-target_artists = ["Jack Harlow", "Jonas Brothers", "Labrinth", "Teddy Swims", "Tim McGraw"]
-mask = (tt_pre4_clean["artist"].isin(target_artists) & (tt_pre4_clean["followers"] == 0.0))
-tt_pre4_clean.loc[mask, "followers"] = np.nan
-
-tt_pre4_clean["followers"] = (
-    tt_pre4_clean
-    .groupby("artist")["followers"]
-    .transform(lambda s: s.interpolate())
-)
-
-tt_pre4_clean["uploads"] = (
-    tt_pre4_clean
-    .groupby("artist")["uploads"]
-    .transform(lambda s: s.interpolate())
-)
-
-tt_pre4_clean["likes"] = (
-    tt_pre4_clean
-    .groupby("artist")["likes"]
-    .transform(lambda s: s.interpolate())
-)
-
-tt_pre4_clean[tt_pre4_clean["artist"] == "Jack Harlow"]["followers"]
+panel[(panel["artist"] == "Jack Harlow") & (panel["metric"] == "followers")][["date", "raw", "value", "status"]]
 
 #%%
 
-plot_two_metrics(tt_pre4_clean, metric1="followers", metric2="likes",
-                 outdir="graphs/tt_imputed",
-                 filename_pattern="tt_{artist}_{platform}.png")
+plot_platform("tiktok", "value", artists=imputed_artists("tiktok"), kind="imputed")
 
 # %%
 """
@@ -490,140 +390,25 @@ Growth Rate features:
 
 #%%
 # We can start by making a new column in each of our pre4_df's for release date values
-
-release_rows = yt_pre4_clean[yt_pre4_clean["date"] == yt_pre4_clean["release_date"]][
-    ["artist", "release_date", "subs", "views"]
-].rename(columns={"subs": "yt_subs_release_date", "views": "yt_views_release_date"})
-
-feature_df["release_date"] = pd.to_datetime(feature_df["release_date"])
-release_rows["release_date"] = pd.to_datetime(release_rows["release_date"])
-
-feature_df = feature_df.merge(
-    release_rows,
-    on=["artist", "release_date"],
-    how="left"
-)
-
-yt_pre4_clean.drop(columns=["views_zero_proxy_missing", "subs_zero_proxy_missing"], inplace=True)
-
-# TT: followers, uploads, likes
-release_rows = tt_pre4_clean[tt_pre4_clean["date"] == tt_pre4_clean["release_date"]][
-    ["artist", "release_date", "followers", "uploads", "likes"]
-].rename(columns={"followers": "tt_followers_release_date", "uploads": "tt_uploads_release_date", "likes": "tt_likes_release_date"})
-
-feature_df = feature_df.merge(
-    release_rows,
-    on=["artist", "release_date"],
-    how="left"
-)
-
-tt_pre4_clean.drop(columns=["followers_zero_proxy_missing", "uploads_zero_proxy_missing", "likes_zero_proxy_missing"], inplace=True)
-
-# IG: followers, media
-release_rows = ig_pre4_clean[ig_pre4_clean["date"] == ig_pre4_clean["release_date"]][
-    ["artist", "release_date", "followers", "media"]
-].rename(columns={"followers": "ig_followers_release_date", "media": "ig_media_release_date"})
-
-feature_df = feature_df.merge(
-    release_rows,
-    on=["artist", "release_date"],
-    how="left"
-)
-
-ig_pre4_clean.drop(columns=["followers_zero_proxy_missing", "media_zero_proxy_missing"], inplace=True)
-feature_df
-
-#%%
-
-ig_pre4_clean = ig_pre4_clean.copy()
-ig_pre4_clean['date'] = pd.to_datetime(ig_pre4_clean['date'], errors='coerce')
-ig_pre4_clean = ig_pre4_clean.sort_values(['artist','date'])
-
 # For growth rate, let's calculate geometric mean - 1 (CAGR style)
-ig_pre4_clean['ig_media_cgr_4w'] = (
-    ig_pre4_clean
-      .groupby('artist')['media']
-      .transform(lambda s: ((s / s.shift(28))**(1/28) - 1) * 100)
-)
 
-ig_pre4_clean['ig_followers_cgr_4w'] = (
-    ig_pre4_clean
-      .groupby('artist')['followers']
-      .transform(lambda s: ((s / s.shift(28))**(1/28) - 1) * 100)
-)
+# Compound growth rate of every series over 1, 2 and 4 weeks, and the release date values:
+# the latest observation on or before the release date, at most 3 days old, so a missing
+# release-day row doesn't turn into a NaN. See social_pipeline.py. The windows only go
+# back 28 days, so longer ones would be all NaN here.
+#
+# They come from the feature store (feature_store.py): features of an artist as of any date,
+# using only data up to that date, cached by (artist, date) so reruns don't recompute them.
+# Every emerging song is featurized, collabs by their lead artist.
+windows = [7, 14, 28]
+store = FeatureStore(windows=windows, tolerance=pd.Timedelta(days=3))
 
-tt_pre4_clean = tt_pre4_clean.copy()
-tt_pre4_clean['date'] = pd.to_datetime(tt_pre4_clean['date'], errors='coerce')
-tt_pre4_clean = tt_pre4_clean.sort_values(['artist','date'])
-
-
-tt_pre4_clean['tt_followers_cgr_4w'] = (
-    tt_pre4_clean
-      .groupby('artist')['followers']
-      .transform(lambda s: ((s / s.shift(28))**(1/28) - 1) * 100)
-)
-
-tt_pre4_clean['tt_uploads_cgr_4w'] = (
-    tt_pre4_clean
-      .groupby('artist')['uploads']
-      .transform(lambda s: ((s / s.shift(28))**(1/28) - 1) * 100)
-)
-
-tt_pre4_clean['tt_likes_cgr_4w'] = (
-    tt_pre4_clean
-      .groupby('artist')['likes']
-      .transform(lambda s: ((s / s.shift(28))**(1/28) - 1) * 100)
-)
-
-yt_pre4_clean = yt_pre4_clean.copy()
-yt_pre4_clean['date'] = pd.to_datetime(yt_pre4_clean['date'], errors='coerce')
-yt_pre4_clean = yt_pre4_clean.sort_values(['artist','date'])
-
-yt_pre4_clean['yt_subs_cgr_4w'] = (
-    yt_pre4_clean
-      .groupby('artist')['subs']
-      .transform(lambda s: ((s / s.shift(28))**(1/28) - 1) * 100)
-)
-
-yt_pre4_clean['yt_views_cgr_4w'] = (
-    yt_pre4_clean
-      .groupby('artist')['views']
-      .transform(lambda s: ((s / s.shift(28))**(1/28) - 1) * 100)
-)
+feature_df["release_date"] = pd.to_datetime(feature_df["release_date"])
+feature_df = store.features(feature_df, date_col="release_date")
+store.stats()
 
 #%%
 
-# Instagram
-ig_feat = (
-    ig_pre4_clean
-      .loc[ig_pre4_clean['date'] == ig_pre4_clean['release_date'],
-           ['artist','release_date','ig_media_cgr_4w','ig_followers_cgr_4w']]
-      .drop_duplicates(['artist','release_date'])
-)
-
-# TikTok
-tt_feat = (
-    tt_pre4_clean
-      .loc[tt_pre4_clean['date'] == tt_pre4_clean['release_date'],
-           ['artist','release_date','tt_followers_cgr_4w','tt_uploads_cgr_4w','tt_likes_cgr_4w']]
-      .drop_duplicates(['artist','release_date'])
-)
-
-# YouTube
-yt_feat = (
-    yt_pre4_clean
-      .loc[yt_pre4_clean['date'] == yt_pre4_clean['release_date'],
-           ['artist','release_date','yt_subs_cgr_4w','yt_views_cgr_4w']]
-      .drop_duplicates(['artist','release_date'])
-)
-
-# Now merge on BOTH keys
-feature_df = (
-    feature_df
-      .merge(ig_feat, on=['artist','release_date'], how='left', validate='many_to_one')
-      .merge(tt_feat, on=['artist','release_date'], how='left', validate='many_to_one')
-      .merge(yt_feat, on=['artist','release_date'], how='left', validate='many_to_one')
-)
 feature_df
 
 #%%
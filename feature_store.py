@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from social_pipeline import (
+    PLATFORM_SPECS, build_social_panel, outage_calendar, release_features, social_feature_columns,
+)
+from social_store import SOCIAL_STORE_DIR, load_manifest
+
+FEATURE_STORE_DIR = "data/processed_data/feature_store"
+
+# Bump when the features change, so cached rows computed the old way are dropped
+SCHEMA_VERSION = 2
+
+
+class FeatureStore:
+    """
+    Point-in-time social features: the features of artist A as of date D, for any
+    number of (A, D) queries.
+
+    Features as of D only use the days_back days up to D (see social_pipeline.py),
+    so any release, past or future, can be featurized without leakage. Computed
+    rows are kept in memory and in a parquet cache under cache_dir, so a repeated
+    (artist, date) is never recomputed. The cache is tied to the specs, the
+    window settings and the archives in the social store, and is dropped when any
+    of them changes, checked on every features() call, so rebuilding the social
+    store under a live FeatureStore doesn't serve stale rows. Outage days come
+    from the whole store (see social_pipeline.outage_calendar), so an artist's
+    features don't depend on which other artists were queried with it; the
+    calendar is cached next to the features.
+    """
+
+    def __init__(self, specs=PLATFORM_SPECS, days_back=28, windows=(7, 14, 28), tolerance=None,
+                 store_dir=SOCIAL_STORE_DIR, cache_dir=FEATURE_STORE_DIR):
+        self.specs = specs
+        self.days_back = days_back
+        self.windows = list(windows)
+        self.tolerance = tolerance
+        self.store_dir = store_dir
+        self.cache_dir = cache_dir
+        self.columns = social_feature_columns(specs, self.windows)
+
+        self.hits = 0
+        self.misses = 0
+        self._fingerprint = None
+        self._outages = None
+        self._cache = None
+        self._sync()
+
+    def fingerprint(self):
+        archives = load_manifest(self.store_dir)["platforms"]
+        config = {
+            "schema_version": SCHEMA_VERSION,
+            "specs": self.specs,
+            "days_back": self.days_back,
+            "windows": self.windows,
+            "tolerance": None if self.tolerance is None else str(pd.Timedelta(self.tolerance)),
+            "archives": {p: archives.get(p, {}).get("sha1") for p in self.specs},
+        }
+        return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+    def _sync(self):
+        """Reload the cache if the social store or the settings changed since it was loaded."""
+
+        fingerprint = self.fingerprint()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._outages = None
+            self._cache = self._load()
+
+    def outages(self):
+        """The store's outage calendar, computed once per fingerprint and cached next to the features."""
+
+        self._sync()
+        if self._outages is None:
+            path = self._cache_path("outages")
+            if os.path.exists(path):
+                self._outages = pd.read_parquet(path)
+            else:
+                self._outages = outage_calendar(self.specs, self.store_dir)
+                self._write(self._outages, path)
+        return self._outages
+
+    def _cache_path(self, kind="features"):
+        return os.path.join(self.cache_dir, f"{kind}_{self._fingerprint}.parquet")
+
+    def _write(self, df, path):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # only the current fingerprint is kept
+        for f in os.listdir(self.cache_dir):
+            if f.startswith(("features_", "outages_")) and self._fingerprint not in f:
+                os.remove(os.path.join(self.cache_dir, f))
+
+        tmp = path + ".tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    def _load(self):
+        path = self._cache_path()
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=["artist", "release_date"] + self.columns).set_index(["artist", "release_date"])
+
+        return pd.read_parquet(path).set_index(["artist", "release_date"])
+
+    def _save(self):
+        self._write(self._cache.reset_index(), self._cache_path())
+
+    def features(self, queries, artist_col="artist", date_col="date"):
+        """
+        queries with the feature columns added, in its original order. Rows with a
+        missing artist or date get NaNs.
+
+        Only the (artist, date) pairs not in the cache are computed, all together
+        in one pass of the social pipeline.
+        """
+        self._sync()
+        keys = pd.MultiIndex.from_arrays(
+            [queries[artist_col], pd.to_datetime(queries[date_col]).dt.normalize()],
+            names=["artist", "release_date"],
+        )
+        wanted = keys[keys.get_level_values(0).notna() & keys.get_level_values(1).notna()].unique()
+        missing = wanted.difference(self._cache.index)
+        self.hits += len(wanted) - len(missing)
+        self.misses += len(missing)
+
+        if len(missing):
+            releases = missing.to_frame(index=False)
+            panel, _ = build_social_panel(releases, self.specs, days_back=self.days_back, store_dir=self.store_dir,
+                                          outages=self.outages())
+            new = release_features(panel, releases, self.specs, windows=self.windows, tolerance=self.tolerance)
+            new = new.set_index(["artist", "release_date"])
+            self._cache = new if self._cache.empty else pd.concat([self._cache, new])
+            self._save()
+
+        out = queries.copy()
+        found = self._cache.reindex(keys)
+        for c in self.columns:
+            out[c] = found[c].to_numpy(dtype="float64")
+        return out
+
+    def stats(self):
+        return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
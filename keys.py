@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+KEYS_DIR = "data/processed_data/keys"
+
+# Key given to missing values (NaN / None)
+MISSING_KEY = -1
+
+# Value column of the key spaces whose values aren't named after them
+VALUE_COLUMNS = {"song": "song_id", "album": "album_id"}
+
+
+def _lookup_path(name, keys_dir):
+    return os.path.join(keys_dir, f"{name}_keys.csv")
+
+
+def load_lookup(name, keys_dir=KEYS_DIR):
+    """
+    Return the lookup table for a key space, ie. load_lookup("song") has columns
+    song_key, song_id and load_lookup("artist") has artist_key, artist.
+    """
+    value_col = VALUE_COLUMNS.get(name, name)
+    path = _lookup_path(name, keys_dir)
+
+    if not os.path.exists(path):
+        return pd.DataFrame({
+            f"{name}_key": pd.Series(dtype="int32"),
+            value_col: pd.Series(dtype="str"),
+        })
+
+    return pd.read_csv(path, dtype={f"{name}_key": "int32", value_col: "str"}, keep_default_na=False)
+
+
+def intern(values, name, keys_dir=KEYS_DIR):
+    """
+    Map string values to stable int32 surrogate keys.
+
+    Each distinct value is looked up once in the persisted lookup table of the key
+    space (data/processed_data/keys/<name>_keys.csv). Values never seen before get
+    the next free keys and are appended to the table, so keys handed out on earlier
+    runs never change.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+
+    lookup = load_lookup(name, keys_dir)
+    key_col, value_col = lookup.columns
+    known = pd.Index(lookup[value_col])
+
+    positions = known.get_indexer(uniques)
+    unique_keys = np.empty(len(uniques), dtype="int32")
+    unique_keys[positions >= 0] = lookup[key_col].to_numpy()[positions[positions >= 0]]
+
+    new = positions < 0
+    if new.any():
+        start = int(lookup[key_col].max()) + 1 if len(lookup) else 0
+        unique_keys[new] = np.arange(start, start + new.sum(), dtype="int32")
+
+        added = pd.DataFrame({key_col: unique_keys[new], value_col: np.asarray(uniques)[new]})
+        path = _lookup_path(name, keys_dir)
+        os.makedirs(keys_dir, exist_ok=True)
+        added.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+
+    keys = np.where(codes >= 0, unique_keys[codes], MISSING_KEY).astype("int32")
+    return pd.Series(keys, index=values.index, name=key_col)
+
+
+def attach_keys(df, song_col="song_id", artist_col="main_artist", keys_dir=KEYS_DIR):
+    """Add song_key / artist_key columns for whichever of song_col / artist_col df has."""
+
+    df = df.copy()
+    if song_col in df.columns:
+        df["song_key"] = intern(df[song_col], "song", keys_dir)
+    if artist_col in df.columns:
+        df["artist_key"] = intern(df[artist_col], "artist", keys_dir)
+    return df
@@ -0,0 +1,183 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+LIFECYCLES_PATH = "data/processed_data/lifecycles.parquet"
+
+LIFECYCLE_COLUMNS = [
+    "song_key", "song_id", "debut_week", "final_week", "peak_pos", "lifespan",
+    "weeks_charted", "reentries", "gaps", "positions", "emerging",
+]
+
+
+def _day_number(chart_week):
+    return pd.to_datetime(chart_week).to_numpy().astype("datetime64[D]").astype("int64")
+
+
+def build_lifecycles(charts):
+    """
+    Build one lifecycle row per song (Chon 2006) in a single sorted pass over chart rows.
+
+    - debut_week / final_week: first and last chart_week the song was on the chart
+    - peak_pos: best (lowest) current_week
+    - lifespan: max wks_on_chart, as Billboard counts it
+    - weeks_charted: number of weeks actually seen in charts
+    - reentries / gaps: number and lengths (in weeks) of the breaks between chart runs
+    - positions: the weekly positions in order, ie. the lifecycle itself
+    - emerging: whether the song debuted (wks_on_chart == 1) inside the charts we have
+    """
+    if charts.empty:
+        return pd.DataFrame(columns=LIFECYCLE_COLUMNS)
+
+    days = _day_number(charts["chart_week"])
+    keys = charts["song_key"].to_numpy()
+
+    order = np.lexsort((days, keys))
+    keys, days = keys[order], days[order]
+    positions = charts["current_week"].to_numpy()[order]
+    wks_on_chart = charts["wks_on_chart"].to_numpy()[order]
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+
+    # a gap is any step of more than one week between consecutive rows of the same song
+    steps = np.diff(days, prepend=days[:1]) // 7 - 1
+    steps[starts] = 0
+
+    return pd.DataFrame({
+        "song_key": keys[starts],
+        "song_id": charts["song_id"].to_numpy()[order][starts],
+        "debut_week": pd.to_datetime(days[starts], unit="D"),
+        "final_week": pd.to_datetime(days[ends - 1], unit="D"),
+        "peak_pos": np.minimum.reduceat(positions, starts),
+        "lifespan": np.maximum.reduceat(wks_on_chart, starts),
+        "weeks_charted": ends - starts,
+        "reentries": np.add.reduceat((steps > 0).astype("int64"), starts),
+        "gaps": [s[s > 0].tolist() for s in np.split(steps, starts[1:])],
+        "positions": [p.tolist() for p in np.split(positions, starts[1:])],
+        "emerging": np.minimum.reduceat(wks_on_chart, starts) == 1,
+    })
+
+
+def update_lifecycles(lifecycles, week_rows):
+    """
+    Fold one new chart week into an existing lifecycle table.
+
+    Only the ~100 songs on the new week are touched. Songs whose final_week is
+    already at or past the new week are skipped, so applying a week twice is a
+    no-op. Raises ValueError if the week is older than the newest week in the table,
+    in which case the table has to be rebuilt with build_lifecycles.
+    """
+    week = pd.Timestamp(week_rows["chart_week"].iloc[0])
+    if len(lifecycles) and week < lifecycles["final_week"].max():
+        raise ValueError(f"{week.date()} is older than the lifecycles table, rebuild it instead")
+
+    lifecycles = lifecycles.set_index("song_key")
+    new = build_lifecycles(week_rows).set_index("song_key")
+
+    seen = new.index.intersection(lifecycles.index)
+    seen = seen[lifecycles.loc[seen, "final_week"] < week]
+    if len(seen):
+        old, cur = lifecycles.loc[seen], new.loc[seen]
+        gap = ((week - old["final_week"]).dt.days // 7 - 1).astype("int64")
+
+        lifecycles.loc[seen, "final_week"] = week
+        lifecycles.loc[seen, "peak_pos"] = np.minimum(old["peak_pos"], cur["peak_pos"])
+        lifecycles.loc[seen, "lifespan"] = np.maximum(old["lifespan"], cur["lifespan"])
+        lifecycles.loc[seen, "weeks_charted"] = old["weeks_charted"] + 1
+        lifecycles.loc[seen, "reentries"] = old["reentries"] + (gap > 0)
+        # plain ints in the lists, like build_lifecycles' tolist()
+        lifecycles.loc[seen, "gaps"] = pd.Series(
+            [g + [int(n)] if n > 0 else g for g, n in zip(old["gaps"], gap)], index=seen, dtype=object)
+        lifecycles.loc[seen, "positions"] = pd.Series(
+            [p + [int(x) for x in c] for p, c in zip(old["positions"], cur["positions"])], index=seen, dtype=object)
+
+    debuts = new.loc[new.index.difference(lifecycles.index)]
+    lifecycles = pd.concat([lifecycles, debuts])
+
+    # the index union above widens song_key to int64, keep the charts' key dtype
+    lifecycles = lifecycles.reset_index()[LIFECYCLE_COLUMNS]
+    return lifecycles.astype({"song_key": week_rows["song_key"].dtype})
+
+
+def apply_events(lifecycles, events):
+    """
+    Fold chart events (see chart_events.py) into a lifecycle table, one week at a time.
+
+    Every event except an exit means the song was on that week's chart, so a week
+    of events is just that week's chart rows.
+    """
+    on_chart = events[events["event"] != "exit"]
+    for _, week in on_chart.groupby("chart_week", sort=True):
+        rows = pd.DataFrame({
+            "song_key": week["song_key"].to_numpy(),
+            "song_id": week["song_id"].to_numpy(),
+            "chart_week": week["chart_week"].to_numpy(),
+            "current_week": week["position"].to_numpy(),
+            "wks_on_chart": week["wks_on_chart"].to_numpy(),
+        })
+        lifecycles = update_lifecycles(lifecycles, rows)
+
+    return lifecycles
+
+
+def refresh_lifecycles(charts, changes, path=LIFECYCLES_PATH):
+    """
+    Bring the persisted lifecycle table in line with the chart store.
+
+    changes is what chart_store.ingest_charts returned. If weeks were only added
+    after the newest week we have, they're folded in one at a time; anything else
+    (first run, updated / removed weeks, backfilled weeks) rebuilds the table.
+    """
+    lifecycles = load_lifecycles(path)
+    added = sorted(changes["added"])
+
+    rebuild = (
+        lifecycles is None
+        or changes["updated"]
+        or changes["removed"]
+        or (added and pd.Timestamp(added[0]) < lifecycles["final_week"].max())
+    )
+
+    if rebuild:
+        lifecycles = build_lifecycles(charts)
+    else:
+        chart_weeks = charts["chart_week"].astype(str)
+        for week in added:
+            if (chart_weeks == week).any():
+                lifecycles = update_lifecycles(lifecycles, charts[chart_weeks == week])
+
+    save_lifecycles(lifecycles, path)
+    return lifecycles
+
+
+def load_lifecycles(path=LIFECYCLES_PATH):
+    """Return the persisted lifecycle table, or None if it hasn't been built yet."""
+
+    if not os.path.exists(path):
+        return None
+
+    lifecycles = pd.read_parquet(path)
+    # parquet gives numpy arrays back, turn them into lists of plain ints again
+    for col in ("gaps", "positions"):
+        lifecycles[col] = lifecycles[col].map(lambda a: a.tolist())
+    return lifecycles
+
+
+def save_lifecycles(lifecycles, path=LIFECYCLES_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lifecycles.to_parquet(path, index=False)
+
+
+def explode_lifecycles(lifecycles):
+    """One row per song-week of chart history, with week_idx = weeks since debut (as charted)."""
+
+    lengths = lifecycles["positions"].map(len).to_numpy()
+    long = lifecycles.drop(columns=["gaps"]).explode("positions", ignore_index=True)
+    long = long.rename(columns={"positions": "current_week"})
+    long["current_week"] = long["current_week"].astype("int64")
+
+    # position of each row within its song's list
+    long["week_idx"] = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return long
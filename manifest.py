@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+
+# Every store keeps its manifest in <store_dir>/manifest.json
+MANIFEST_NAME = "manifest.json"
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def check_file(path, entry):
+    """
+    (changed, entry) of a source file against its manifest entry ({size, mtime, sha1},
+    or None if it's new). A file with the same size and mtime is taken as unchanged
+    without being hashed, and one that was only touched keeps its sha1. The returned
+    entry is the file's current one, to store back in the manifest.
+    """
+    stat = os.stat(path)
+    if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+        return False, entry
+
+    sha1 = file_sha1(path)
+    current = {"size": stat.st_size, "mtime": stat.st_mtime, "sha1": sha1}
+    return not (entry and entry["sha1"] == sha1), current
+
+
+def load_manifest(store_dir, schema_version, empty):
+    """
+    A store's manifest, or empty if there's none yet. A manifest written with another
+    schema_version also comes back as empty, so the store gets rebuilt.
+    """
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return empty
+
+    with open(path) as f:
+        manifest = json.load(f)
+
+    return manifest if manifest.get("schema_version") == schema_version else empty
+
+
+def save_manifest(manifest, store_dir):
+    """Write a store's manifest atomically, so a crash never leaves half of one."""
+
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
@@ -0,0 +1,88 @@
+from rapidfuzz import fuzz
+
+from scripts.http_cache import cache
+
+# Most ids / ISRCs the catalog songs endpoint takes in one request
+IDS_PER_REQUEST = 300
+ISRCS_PER_REQUEST = 25
+
+# Song attributes we keep in metadata.csv
+FIELDS = [
+    "albumName", "artistName", "artistUrl", "artwork", "audioVariants",
+    "composerName", "contentRating", "discNumber", "durationInMillis",
+    "editorialNotes", "genreNames", "hasLyrics", "isAppleDigitalMaster",
+    "isrc", "name", "playParams", "previews", "releaseDate",
+    "trackNumber", "url"
+]
+
+
+def empty_metadata():
+    return {field: None for field in FIELDS}
+
+
+def parse_song(song):
+    """FIELDS of one catalog song resource (None where it doesn't have them)."""
+
+    attrs = song.get("attributes", {})
+    return {field: attrs.get(field, None) for field in FIELDS}
+
+
+def catalog_id(song_id):
+    """Catalog ids as strings; ids read back from a CSV can come as floats (1440833098.0)."""
+
+    if isinstance(song_id, float) and song_id.is_integer():
+        return str(int(song_id))
+    return str(song_id)
+
+
+def search_term(durf_id):
+    """What we search the catalog for, from a chart song_id ("<title> — <performers>")."""
+
+    return durf_id.split(" — ")[1]
+
+
+def pick_song_id(songs, song_name, artist_name, aliases=()):
+    """
+    Id of the first search result whose title and artist fuzzily match (or any
+    result, for artists in aliases), or None.
+    """
+    for song in songs:
+        title = song["attributes"]["name"].lower()
+        artist = song["attributes"]["artistName"].lower()
+        if ((fuzz.ratio(song_name.lower(), title) >= 65 or
+             song_name.lower() in title.lower()) and
+             (fuzz.ratio(artist_name.lower(), artist) >= 65 or
+             artist_name.lower() in artist.lower())
+             or artist_name in aliases):
+            return song["id"]
+    return None
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def fetch_by_isrc(am, isrcs, storefront="us"):
+    """
+    {isrc: {"apple_song_id", **FIELDS}} for songs with a known ISRC, ISRCS_PER_REQUEST
+    per request through the catalog ISRC filter. ISRCs with no match are left out,
+    so the caller can fall back to searching for them.
+    """
+    by_isrc = cache.wrap("apple_music/songs_by_isrc", am.songs_by_isrc)
+
+    isrcs = list(dict.fromkeys(str(i).upper() for i in isrcs if i))
+    found = {}
+    for chunk in _chunks(isrcs, ISRCS_PER_REQUEST):
+        try:
+            response = by_isrc(chunk, storefront=storefront)
+        except Exception as e:
+            print(f"Error fetching a batch of {len(chunk)} ISRCs: {e}")
+            continue
+
+        # an ISRC can match several catalog songs (single, album version...), keep the first
+        for item in (response or {}).get("data", []):
+            isrc = item.get("attributes", {}).get("isrc", "").upper()
+            if isrc in chunk and isrc not in found:
+                found[isrc] = {"apple_song_id": item["id"], **parse_song(item)}
+
+    return found
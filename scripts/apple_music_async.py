@@ -0,0 +1,286 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import jwt
+
+from scripts.apple_music import (
+    IDS_PER_REQUEST, _chunks, catalog_id, empty_metadata, parse_song, pick_song_id, search_term,
+)
+from scripts.http_cache import cache
+from scripts.social_collector import TokenBucket
+
+API_ROOT = os.getenv("APPLE_MUSIC_API_ROOT", "https://api.music.apple.com/v1")
+
+# Apple Music quota: requests per second on average, and how many can go out at once
+RATE = float(os.getenv("APPLE_MUSIC_RATE", "20"))
+BURST = 10
+
+# Searches in flight at once, and the shared connection pool size
+SEARCH_WORKERS = 8
+MAX_CONNECTIONS = 16
+
+# Songs waiting between stages. When the metadata stage falls behind, searches
+# block on a full queue instead of piling up resolved ids in memory.
+QUEUE_SIZE = IDS_PER_REQUEST
+
+# Seconds the metadata stage waits for more ids before sending a partial batch
+BATCH_WAIT = 0.5
+
+# Retries of 401 / 429 / 5xx responses and connection errors, with exponential backoff
+RETRIES = 3
+BACKOFF = 2.0
+
+# Developer tokens last TOKEN_HOURS and are regenerated TOKEN_MARGIN seconds before they expire
+TOKEN_HOURS = 12
+TOKEN_MARGIN = 10 * 60
+
+
+class DeveloperToken:
+    """
+    Apple Music developer token (an ES256 JWT signed with the .p8 key), generated
+    once and reused for every request until TOKEN_MARGIN seconds before it expires.
+    Keep one around between runs in a notebook and it's only signed every TOKEN_HOURS.
+    """
+
+    def __init__(self, secret_key, key_id, team_id, hours=TOKEN_HOURS, margin=TOKEN_MARGIN):
+        self.secret_key = secret_key
+        self.key_id = key_id
+        self.team_id = team_id
+        self.hours = hours
+        self.margin = margin
+        self.expires_at = 0
+        self.generated = 0
+        self._token = None
+
+    def get(self, refresh=False):
+        """The current token, regenerated if it's about to expire (or refresh, eg. after a 401)."""
+
+        now = time.time()
+        if refresh or self._token is None or now >= self.expires_at - self.margin:
+            self.expires_at = now + self.hours * 3600
+            self._token = jwt.encode(
+                {"iss": self.team_id, "iat": int(now), "exp": int(self.expires_at)},
+                self.secret_key, algorithm="ES256", headers={"kid": self.key_id},
+            )
+            self.generated += 1
+        return self._token
+
+    def headers(self):
+        return {"Authorization": f"Bearer {self.get()}"}
+
+
+def _params(*args, **kwargs):
+    # same cache keys as cache.wrap("apple_music/...", am.<method>) in scripts/metadata.py,
+    # so responses cached by either side are reused by the other
+    return {"args": list(args), "kwargs": kwargs}
+
+
+async def _get(session, bucket, token, endpoint, cache_params, path, params, api_root=API_ROOT):
+    """
+    JSON response of GET api_root/path, or None if the request failed. Goes through
+    the HTTP cache like the applemusicpy calls: a fresh cached response doesn't take
+    a token, and a stale one is used if every attempt fails.
+    """
+    body = cache.get(endpoint, cache_params)
+    if body is not None:
+        cache.stats["hits"] += 1
+        return body
+    cache.stats["misses"] += 1
+
+    for attempt in range(RETRIES + 1):
+        await bucket.acquire()
+        try:
+            async with session.get(f"{api_root}/{path}", params=params, headers=token.headers()) as response:
+                if response.status == 401:
+                    # rejected token (revoked key, clock skew...), sign a new one
+                    token.get(refresh=True)
+                    status = response.status
+                elif response.status == 429 or response.status >= 500:
+                    status = response.status
+                else:
+                    if response.status != 200:
+                        print(f"Skipping {path} due to status code: {response.status}")
+                        return None
+                    body = await response.json()
+                    cache.put(endpoint, cache_params, body)
+                    return body
+        except aiohttp.ClientError as e:
+            status = e
+
+        if attempt < RETRIES:
+            await asyncio.sleep(BACKOFF ** attempt)
+
+    print(f"Giving up on {path} after {status}")
+    body = cache.get(endpoint, cache_params, stale_ok=True)
+    if body is not None:
+        cache.stats["stale"] += 1
+    return body
+
+
+async def search_song_id(session, bucket, token, title, artist, durf_id, storefront="us", aliases=(), limit=25,
+                         api_root=API_ROOT):
+    """Async get_song_id: catalog id of a chart song, found by searching, or None."""
+
+    term = search_term(durf_id)
+    results = await _get(
+        session, bucket, token, "apple_music/search",
+        _params(term, types=["songs"], limit=limit, storefront=storefront),
+        f"catalog/{storefront}/search", {"term": term, "types": "songs", "limit": limit}, api_root,
+    )
+    songs = (results or {}).get("results", {}).get("songs", {}).get("data", [])
+    return pick_song_id(songs, title, artist, aliases=aliases)
+
+
+async def fetch_metadata_async(session, bucket, token, song_ids, storefront="us", api_root=API_ROOT):
+    """
+    {catalog_id: FIELDS} of many songs, IDS_PER_REQUEST per request through the
+    catalog multi-id endpoint instead of one request each. Songs missing from
+    their batch are looked up one at a time; songs that still fail get None fields.
+    """
+
+    found = {}
+    for chunk in _chunks(list(dict.fromkeys(song_ids)), IDS_PER_REQUEST):
+        response = await _get(
+            session, bucket, token, "apple_music/songs", _params(chunk, storefront=storefront),
+            f"catalog/{storefront}/songs", {"ids": ",".join(chunk)}, api_root,
+        )
+        for item in (response or {}).get("data", []):
+            found[item["id"]] = parse_song(item)
+
+    # songs missing from their batch, one at a time
+    for song_id in song_ids:
+        if song_id not in found:
+            response = await _get(
+                session, bucket, token, "apple_music/song", _params(song_id, storefront=storefront),
+                f"catalog/{storefront}/songs/{song_id}", None, api_root,
+            )
+            data = (response or {}).get("data", [])
+            found[song_id] = parse_song(data[0]) if data else empty_metadata()
+    return found
+
+
+async def resolve_songs_async(rows, token, on_result, storefront="us", aliases=(), rate=RATE, burst=BURST,
+                              search_workers=SEARCH_WORKERS, max_connections=MAX_CONNECTIONS,
+                              queue_size=QUEUE_SIZE, batch_wait=BATCH_WAIT, api_root=API_ROOT):
+    """
+    Resolve chart songs to Apple Music metadata as a two-stage pipeline.
+
+    rows are (key, title, artist, durf_id, apple_song_id) tuples; rows without an
+    apple_song_id are searched for first, search_workers at a time. Resolved ids
+    stream through a bounded queue into the metadata stage, which sends them
+    IDS_PER_REQUEST per request (or whatever arrived within batch_wait), so
+    searches and metadata requests overlap. Every request shares one connection
+    pool and one token bucket, so the whole run goes as fast as the rate allows.
+
+    Calls on_result(key, {"apple_song_id", **FIELDS}) as each row finishes;
+    apple_song_id is None (and the fields too) for songs the search didn't find.
+    A row that raises (a malformed response, say) is printed and reported the same
+    way, rather than stopping the run; a failed metadata batch keeps its ids
+    with None fields.
+    """
+    bucket = TokenBucket(rate, burst)
+    connector = aiohttp.TCPConnector(limit=max_connections)
+    searches = asyncio.Queue(maxsize=queue_size)
+    resolved = asyncio.Queue(maxsize=queue_size)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def feed():
+            for row in rows:
+                await searches.put(row)
+            for _ in range(search_workers):
+                await searches.put(None)
+
+        async def search():
+            while (row := await searches.get()) is not None:
+                key = row[0]
+                try:
+                    _, title, artist, durf_id, song_id = row
+                    if not song_id:
+                        song_id = await search_song_id(session, bucket, token, title, artist, durf_id,
+                                                       storefront, aliases, api_root=api_root)
+                    song_id = catalog_id(song_id) if song_id else None
+                except Exception as e:
+                    print(f"Error for {key}: {e!r}")
+                    song_id = None
+
+                if song_id:
+                    await resolved.put((key, song_id))
+                else:
+                    on_result(key, {"apple_song_id": None, **empty_metadata()})
+
+        async def lookup(batch):
+            ids = [i for _, i in batch]
+            try:
+                metadata = await fetch_metadata_async(session, bucket, token, ids, storefront, api_root)
+            except Exception as e:
+                print(f"Error fetching a batch of {len(ids)} songs: {e!r}")
+                metadata = {i: empty_metadata() for i in ids}
+            for key, song_id in batch:
+                on_result(key, {"apple_song_id": song_id, **metadata[song_id]})
+
+        async def batch_metadata():
+            lookups = []
+            done = False
+            try:
+                while not done:
+                    batch = []
+                    item = await resolved.get()
+                    while item is not None:
+                        batch.append(item)
+                        if len(batch) == IDS_PER_REQUEST:
+                            break
+                        try:
+                            item = await asyncio.wait_for(resolved.get(), batch_wait)
+                        except asyncio.TimeoutError:
+                            break
+                    done = item is None
+                    if batch:
+                        # the next batch fills while this one is in flight, but no further: with two
+                        # batches out, a slow metadata stage backs up into the searches
+                        lookups.append(asyncio.create_task(lookup(batch)))
+                        if len(lookups) > 1:
+                            await lookups.pop(0)
+                await asyncio.gather(*lookups)
+            finally:
+                for task in lookups:
+                    task.cancel()
+
+        metadata_stage = asyncio.create_task(batch_metadata())
+        finished = False
+        try:
+            await asyncio.gather(feed(), *(search() for _ in range(search_workers)))
+            finished = True
+        finally:
+            if finished:
+                # every row is queued, let the metadata stage drain the rest
+                await resolved.put(None)
+                await metadata_stage
+            else:
+                metadata_stage.cancel()
+                await asyncio.gather(metadata_stage, return_exceptions=True)
+
+
+def resolve_songs(rows, token, on_result=None, **kwargs):
+    """
+    resolve_songs_async from sync code (on a worker thread inside a running event
+    loop, eg. a notebook). Returns {key: {"apple_song_id", **FIELDS}}.
+    """
+    results = {}
+
+    def collect(key, result):
+        results[key] = result
+        if on_result is not None:
+            on_result(key, result)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(resolve_songs_async(rows, token, collect, **kwargs))
+        return results
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(asyncio.run, resolve_songs_async(rows, token, collect, **kwargs)).result()
+    return results
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import time
+
+CACHE_DIR = "data/http_cache"
+
+# Seconds a cached response stays fresh, by endpoint prefix (longest prefix wins).
+# SocialBlade adds a day of data once a day; Apple Music catalog entries barely change.
+TTLS = {
+    "socialblade": 12 * 3600,
+    "apple_music/search": 7 * 24 * 3600,
+    "apple_music/song": 30 * 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+# HTTP_CACHE_BYPASS=1 skips cache reads (responses are still written, so it refreshes the cache)
+BYPASS = os.getenv("HTTP_CACHE_BYPASS", "") not in ("", "0")
+
+
+def request_key(endpoint, params):
+    """sha1 of an endpoint and its parameters, independent of parameter order."""
+
+    return hashlib.sha1(json.dumps([endpoint, params], sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of API responses.
+
+    A response body is stored once under the sha1 of its content (objects/), and
+    each request (endpoint + params) points at the body it last got, with the time
+    it was stored (requests/). Identical responses to different requests share a
+    file. Entries older than their endpoint's TTL are refetched; if the fetch fails
+    (eg. offline) the stale entry is used instead.
+
+    Only JSON-able responses are cached, and None (a failed request) never is.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttls=TTLS, bypass=BYPASS):
+        self.cache_dir = cache_dir
+        self.ttls = ttls
+        self.bypass = bypass
+        self.stats = {"hits": 0, "misses": 0, "stale": 0}
+
+    def ttl(self, endpoint):
+        prefixes = [p for p in self.ttls if endpoint.startswith(p)]
+        return self.ttls[max(prefixes, key=len)] if prefixes else DEFAULT_TTL
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, key[:2], f"{key}.json")
+
+    def _write(self, path, obj):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(obj, f)
+        os.replace(tmp, path)
+
+    def _entry(self, endpoint, params):
+        path = self._path("requests", request_key(endpoint, params))
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _body(self, entry):
+        with open(self._path("objects", entry["sha1"])) as f:
+            return json.load(f)
+
+    def get(self, endpoint, params, stale_ok=False):
+        """The cached response of a request, or None if there's none (or it expired, unless stale_ok)."""
+
+        entry = None if self.bypass else self._entry(endpoint, params)
+        if entry is None or not (stale_ok or time.time() - entry["stored_at"] < self.ttl(endpoint)):
+            return None
+        return self._body(entry)
+
+    def put(self, endpoint, params, body):
+        content = json.dumps(body, sort_keys=True, default=str)
+        sha1 = hashlib.sha1(content.encode()).hexdigest()
+
+        obj_path = self._path("objects", sha1)
+        if not os.path.exists(obj_path):
+            self._write(obj_path, body)
+        self._write(self._path("requests", request_key(endpoint, params)),
+                    {"endpoint": endpoint, "params": params, "sha1": sha1, "stored_at": time.time()})
+
+    def fetch(self, endpoint, params, fetch):
+        """
+        The response of a request, from the cache if it's fresh, otherwise from
+        fetch() (which is then cached). Falls back to a stale entry if fetch raises
+        or returns None.
+        """
+        body = self.get(endpoint, params)
+        if body is not None:
+            self.stats["hits"] += 1
+            return body
+
+        self.stats["misses"] += 1
+        try:
+            body = fetch()
+        except Exception:
+            body = None
+            stale = self.get(endpoint, params, stale_ok=True)
+            if stale is None:
+                raise
+        if body is None:
+            stale = self.get(endpoint, params, stale_ok=True)
+            if stale is not None:
+                self.stats["stale"] += 1
+            return stale
+
+        self.put(endpoint, params, body)
+        return body
+
+    def wrap(self, endpoint, func):
+        """func(*args, **kwargs) with its results cached under endpoint, eg. cache.wrap("apple_music/song", am.song)."""
+
+        def cached(*args, **kwargs):
+            return self.fetch(endpoint, {"args": list(args), "kwargs": kwargs}, lambda: func(*args, **kwargs))
+
+        return cached
+
+
+# Shared by scripts/social_blade.py, scripts/social_collector.py and scripts/metadata.py
+cache = ResponseCache()
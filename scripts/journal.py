@@ -0,0 +1,89 @@
+import json
+import os
+import time
+
+JOURNAL_DIR = "data/journals"
+
+
+def _key(key):
+    return key if isinstance(key, str) else json.dumps(key, default=str)
+
+
+class Journal:
+    """
+    Append-only JSONL journal of the items a long-running job has finished.
+
+    Each finished item is one line, {"key", "result", "at"}, appended and flushed
+    to disk as soon as it's recorded, so checkpointing costs one small write per
+    item. Reopening the journal after a crash gives back every recorded item;
+    a half-written last line is dropped, so that item simply runs again. Keys are
+    strings or anything JSON-able (eg. (platform, artist) tuples), results must
+    be JSON-able.
+
+        journal = Journal("metadata_retry")
+        for key in journal.pending(keys):
+            journal.record(key, work(key))
+        results = journal.results()
+    """
+
+    def __init__(self, name, journal_dir=JOURNAL_DIR, fsync=False):
+        self.path = os.path.join(journal_dir, f"{name}.jsonl")
+        self.fsync = fsync
+        self._results = {}
+
+        if os.path.exists(self.path):
+            with open(self.path, "rb+") as f:
+                data = f.read()
+                # cut a half-written last line, so the next record starts on a line of its own
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    f.truncate(end)
+
+            for line in data[:end].decode().splitlines():
+                entry = json.loads(line)
+                self._results.setdefault(entry["key"], entry["result"])
+
+        os.makedirs(journal_dir, exist_ok=True)
+        self._file = open(self.path, "a")
+
+    def __contains__(self, key):
+        return _key(key) in self._results
+
+    def __len__(self):
+        return len(self._results)
+
+    def pending(self, keys):
+        """keys that aren't recorded yet, in order."""
+        return [k for k in keys if _key(k) not in self._results]
+
+    def record(self, key, result):
+        """Record a finished item. Recording a key twice is a no-op, the first result stays."""
+
+        key = _key(key)
+        if key in self._results:
+            return
+
+        # one write per line, so a crash leaves at most a partial last line
+        self._file.write(json.dumps({"key": key, "result": result, "at": time.time()}, default=str) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._results[key] = result
+
+    def result(self, key, default=None):
+        return self._results.get(_key(key), default)
+
+    def results(self):
+        """{key: result} of every recorded item, in the order they were recorded."""
+        return dict(self._results)
+
+    def close(self):
+        self._file.close()
+
+    def reset(self):
+        """Forget every recorded item, to run the job from scratch."""
+
+        self._file.close()
+        os.remove(self.path)
+        self._results = {}
+        self._file = open(self.path, "a")
@@ -0,0 +1,23 @@
+#%%
+
+"""
+Bring the materialized daily features (see daily_features.py) up to date with the
+social archives. Run it after scripts/social_blade.py refreshes the archives, from
+the repo root:
+
+    python -m scripts.materialize_daily_features
+
+The first run computes every day the archives cover, later runs only the days that
+arrived since (plus a few before, see daily_features.REFRESH_DAYS).
+"""
+
+from daily_features import load_daily_manifest, materialize_daily_features
+from social_store import build_social_store
+
+#%%
+
+rebuilt = build_social_store()
+print("Rebuilt platforms:", rebuilt)
+
+written = materialize_daily_features()
+print(f"Materialized {len(written)} days, up to", load_daily_manifest().get("last_date"))
@@ -5,6 +5,11 @@ import applemusicpy
 import pandas as pd
 from tqdm import tqdm
 
+from scripts.apple_music import FIELDS, empty_metadata, parse_song, pick_song_id, search_term
+from scripts.apple_music_async import DeveloperToken, resolve_songs
+from scripts.http_cache import cache
+from scripts.journal import Journal
+
 # %%
 
 p8_path = os.getenv("P8_PATH")
@@ -20,89 +25,46 @@ team_id = os.getenv("TEAM_ID")
 #%%
 
 am = applemusicpy.AppleMusic(secret_key=secret_key, key_id=key_id, team_id=team_id)
+
+# Cached versions of am.search / am.song (see scripts/http_cache.py): reruns read from disk,
+# and work offline. cache.bypass = True refetches.
+search = cache.wrap("apple_music/search", am.search)
+song = cache.wrap("apple_music/song", am.song)
+
 results = am.search('travis scott', types=['songs'], limit=10)
 for item in results['results']['songs']['data']:
     print(item['attributes']['name'])
 
 #%%
 
-mappings = [
-    "JIN", "Jin",
-    "4*TOWN (From Disney", "4*TOWN (From Disney And Pixar's Turning Red)",
-    "mgk", "Machine Gun Kelly",
-    "¥$: Kanye West", "Kanye West",
-    "$uicideBoy$", "$uicideboy$",
-    "Charli XCX", "Charli xcx",
-    "Yahritza y Su Esencia", "Yahritza Y Su Esencia",
-    "Tyler, the Creator", "Tyler, The Creator",
-    "twenty one pilots", "Twenty One Pilots",
-    "jessie murph", "Jessie Murph",
-    "BLEU", "Yung Bleu",
-    "HUNTRX", "HUNTR/X",
-    "HUNTR", "HUNTR/X",
-    "Twice", "TWICE",
-    "Pharrell", "Pharrell Williams",
-    "BossMan DLow", "BossMan Dlow",
-    "Richy Mitch", "Richy Mitch And The Coal Miners",
-    "Jennie", "JENNIE",
-    "Mariah The Scientist", "Mariah the Scientist"
-]
+from artists import ARTIST_ALIASES
+
+# Artists that release under more than one name, shared with data_processing.py
+mappings = set(ARTIST_ALIASES) | set(ARTIST_ALIASES.values())
 
 # %%
 from rapidfuzz import fuzz
 
 def get_song_id(song_name, artist_name, durf_id, limit=25, storefront="us"):
     try:
-        durf_id = durf_id.split(" — ")[1]
-        term = f"{durf_id}"
-        results = am.search(term, types=["songs"], limit=limit, storefront=storefront)
-
-        for song in results.get("results", {}).get("songs", {}).get("data", []):
-            title = song["attributes"]["name"].lower()
-            artist = song["attributes"]["artistName"].lower()
-            if ((fuzz.ratio(song_name.lower(), title) >= 65 or
-                 song_name.lower() in title.lower()) and 
-                 (fuzz.ratio(artist_name.lower(), artist) >= 65 or
-                 artist_name.lower() in artist.lower())
-                 or artist_name in mappings):
-                return song["id"]
-        return None
+        results = search(search_term(durf_id), types=["songs"], limit=limit, storefront=storefront)
+        songs = results.get("results", {}).get("songs", {}).get("data", [])
+        return pick_song_id(songs, song_name, artist_name, aliases=mappings)
     except Exception as e:
         print(f"Error for {song_name} - {artist_name}: {e}")
         return None
 
 def get_song_metadata(song_id, storefront="us"):
+    """
+    One song's FIELDS. Many songs go through resolve_songs below, which asks for up to
+    300 per request (see scripts/apple_music_async.py).
+    """
     try:
-        song = am.song(song_id, storefront=storefront)
-        attrs = song["data"][0]["attributes"]
-
-        # define all the fields you care about
-        fields = [
-            "albumName", "artistName", "artistUrl", "artwork", "audioVariants",
-            "composerName", "contentRating", "discNumber", "durationInMillis",
-            "editorialNotes", "genreNames", "hasLyrics", "isAppleDigitalMaster",
-            "isrc", "name", "playParams", "previews", "releaseDate",
-            "trackNumber", "url"
-        ]
-
-        # build dict safely (use None if not present)
-        metadata = {field: attrs.get(field, None) for field in fields}
-
-        return metadata
+        return parse_song(song(song_id, storefront=storefront)["data"][0])
 
     except Exception as e:
         print(f"Error fetching metadata for {song_id}: {e}")
-        return {field: None for field in fields}
-
-# %%
-import time
-
-FIELDS = [
-    "albumName","artistName","artistUrl","artwork","audioVariants",
-    "composerName","contentRating","discNumber","durationInMillis",
-    "editorialNotes","genreNames","hasLyrics","isAppleDigitalMaster",
-    "isrc","name","playParams","previews","releaseDate","trackNumber","url"
-]
+        return empty_metadata()
 
 #%%
 import numpy as np
@@ -125,36 +87,33 @@ retry_mask = mask_no_id | mask_all_null_meta
 null_rows = df.loc[retry_mask].copy()
 print("Rows with missing ID or metadata:", len(null_rows))
 
-# 3) Retry only those rows; keep original index to merge back
-records_retry = []
-save_every = 50
-out_partial = "data/processed_data/unique_emerging_songs_apple_music_retry_partial.csv"
-
-for k, (idx, row) in enumerate(tqdm(null_rows.iterrows(), total=len(null_rows)), start=1):
-    title = row["title"]
-    artist = row["main_artist"]
-    durf_id = row["song_id"]
-
-    # 3a) Resolve/refresh song_id if missing
-    song_id = row.get("apple_song_id")
-    if pd.isna(song_id) or not song_id:
-        song_id = get_song_id(title, artist, durf_id)
-
-    # 3b) Fetch metadata (fill all fields with None if still missing)
-    meta = get_song_metadata(song_id) if song_id else {f: None for f in FIELDS}
-
-    # 3c) Store result with original index for precise updating
-    record = {"_idx": idx, "apple_song_id": song_id, **meta}
-    records_retry.append(record)
-
-    # Gentle pacing (optional)
-    time.sleep(0.15)
+# 3) Retry only those rows. Every resolved row goes to a journal (see scripts/journal.py)
+#    right away, so an interrupted run picks up where it stopped.
+journal = Journal("metadata_resolve")
+rows_by_id = null_rows.drop_duplicates("song_id").set_index("song_id", drop=False)
+todo = journal.pending(rows_by_id.index)
+print("Already done:", len(rows_by_id) - len(todo))
+
+# Concurrent searches feeding batched metadata requests (300 ids each),
+# see scripts/apple_music_async.py. Paced by APPLE_MUSIC_RATE, not by one round trip per song.
+token = DeveloperToken(secret_key, key_id, team_id)
+rows = [
+    (durf_id, row["title"], row["main_artist"], durf_id,
+     None if pd.isna(row["apple_song_id"]) else row["apple_song_id"])
+    for durf_id, row in rows_by_id.loc[todo].iterrows()
+]
+with tqdm(total=len(rows)) as progress:
+    def on_result(durf_id, result):
+        journal.record(durf_id, result)
+        progress.update()
 
-    # Periodic checkpoint
-    if k % save_every == 0:
-        pd.DataFrame(records_retry).to_csv(out_partial, index=False)
+    resolve_songs(rows, token, on_result=on_result, aliases=mappings)
 
-df_retry = pd.DataFrame(records_retry).set_index("_idx")
+results = journal.results()
+df_retry = pd.DataFrame([
+    {"_idx": idx, **results[durf_id]}
+    for idx, durf_id in null_rows["song_id"].items() if durf_id in results
+]).set_index("_idx")
 
 # 4) Update the original df in place using index alignment
 cols_to_update = ["apple_song_id"] + FIELDS
@@ -165,6 +124,10 @@ df.loc[df_retry.index, cols_to_update] = df_retry[cols_to_update]
 # 5) Save final
 df.to_csv("data/processed_data/metadata_updated.csv", index=False)
 print("Updated rows:", len(df_retry))
+print("Cache:", cache.stats)
+
+# the job is finished, next retry run starts over
+journal.reset()
 
 # %%
 am.search("Bad BDos Mil 16", types=["songs"], limit=10)
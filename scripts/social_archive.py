@@ -0,0 +1,241 @@
+import copy
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from scripts.journal import Journal
+from social_store import ARCHIVE_DIR, archive_path, read_archive
+
+STATE_PATH = os.path.join(ARCHIVE_DIR, "refresh_state.json")
+REVISIONS_PATH = os.path.join(ARCHIVE_DIR, "revisions.csv")
+
+# Days of history each SocialBlade history level returns. A series last refreshed
+# within those days only needs that much; anything older (or new) asks for the vault.
+HISTORY_DAYS = {"default": 30, "extended": 365}
+
+# Days of stored values kept per series in the state, to compare overlapping days
+# against without reading the archive back
+TAIL_DAYS = 35
+
+REVISION_COLUMNS = ["platform", "artist_id", "handle", "date", "metric", "old", "new", "snapshot_date"]
+
+
+def state_journal(path=STATE_PATH):
+    """
+    Journal of the series stored since the state was last saved (refresh_state.jsonl
+    next to it). store_daily records a series' state entry right after appending its
+    rows, so a refresh that dies half way still knows what it already appended.
+    """
+    return Journal(os.path.splitext(os.path.basename(path))[0], journal_dir=os.path.dirname(path) or ".")
+
+
+def load_state(path=STATE_PATH):
+    """
+    Return {platform: {artist_id: {"handle", "last_date", "tail": {date: {metric: value}}}}},
+    the last stored day and recent values of every series in the archives, including
+    the ones journaled by a refresh that never got to save the state.
+    """
+    state = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+
+    if os.path.exists(os.path.splitext(path)[0] + ".jsonl"):
+        journal = state_journal(path)
+        for key, entry in journal.results().items():
+            platform, artist = json.loads(key)
+            state.setdefault(platform, {})[artist] = entry
+        journal.close()
+    return state
+
+
+def save_state(state, path=STATE_PATH, journal=None):
+    """Write the state atomically, then empty journal, which is all part of it now."""
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, sort_keys=True)
+    os.replace(tmp, path)
+
+    if journal is not None:
+        journal.reset()
+
+
+def history_for(state, platform, artist, handle, today=None):
+    """The smallest SocialBlade history level that covers the days since the series was last stored."""
+
+    entry = state.get(platform, {}).get(artist)
+    if entry is None or entry["handle"] != handle:
+        return "vault"
+
+    today = pd.Timestamp(today or datetime.now().date())
+    elapsed = (today - pd.Timestamp(entry["last_date"])).days
+    for history, days in HISTORY_DAYS.items():
+        if elapsed < days:
+            return history
+    return "vault"
+
+
+def _value(x):
+    return None if pd.isna(x) else float(x)
+
+
+def merge_daily(state, platform, artist, handle, daily, snapshot_date=None):
+    """
+    Fold one fetched daily history into the state.
+
+    Returns (rows, revisions): the rows to append to the archive, ie. days after
+    the last stored one plus overlapping days whose values changed, and one
+    revision row per changed (day, metric). Overlapping days that match what's
+    stored are dropped.
+    """
+    snapshot_date = snapshot_date or datetime.now().strftime("%Y-%m-%d")
+
+    daily = daily.copy()
+    daily["date"] = pd.to_datetime(daily["date"]).dt.strftime("%Y-%m-%d")
+    daily = daily.drop_duplicates("date", keep="last").sort_values("date", ignore_index=True)
+    metrics = [c for c in daily.columns if c != "date"]
+
+    entry = state.setdefault(platform, {}).get(artist)
+    if entry is None or entry["handle"] != handle:
+        entry = {"handle": handle, "last_date": None, "tail": {}}
+    last_date = entry["last_date"]
+
+    new = daily["date"] > last_date if last_date else pd.Series(True, index=daily.index)
+    revised = pd.Series(False, index=daily.index)
+    revisions = []
+    for i in daily.index[~new]:
+        day = daily.at[i, "date"]
+        stored = entry["tail"].get(day)
+        if stored is None:
+            # older than the tail, nothing to compare against
+            continue
+        for m in metrics:
+            old, value = stored.get(m), _value(daily.at[i, m])
+            if old != value:
+                revised[i] = True
+                revisions.append((platform, artist, handle, day, m, old, value, snapshot_date))
+
+    rows = daily[new | revised].copy()
+    rows["artist_id"] = artist
+    rows["platform"] = platform
+    rows["handle"] = handle
+    rows["snapshot_date"] = snapshot_date
+
+    for day, values in zip(rows["date"], rows[metrics].itertuples(index=False)):
+        entry["tail"][day] = {m: _value(v) for m, v in zip(metrics, values)}
+    if len(daily):
+        entry["last_date"] = max(last_date or "", daily["date"].iloc[-1])
+        cutoff = (pd.Timestamp(entry["last_date"]) - pd.Timedelta(days=TAIL_DAYS)).strftime("%Y-%m-%d")
+        entry["tail"] = {d: v for d, v in entry["tail"].items() if d > cutoff}
+    state[platform][artist] = entry
+
+    return rows, pd.DataFrame(revisions, columns=REVISION_COLUMNS)
+
+
+def _append_csv(rows, path, columns=None):
+    """Append rows to a CSV, in the column order of its existing header."""
+
+    if os.path.exists(path) and os.path.getsize(path):
+        header = pd.read_csv(path, nrows=0).columns
+        pd.DataFrame(rows).reindex(columns=header).to_csv(path, mode="a", header=False, index=False)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pd.DataFrame(rows).reindex(columns=columns).to_csv(path, index=False)
+
+
+def seed_state(state, platform, archive_dir=ARCHIVE_DIR):
+    """Fill the state of a platform from its existing archive. Only needed once, before the first refresh."""
+
+    path = archive_path(platform, archive_dir)
+    if platform in state or not os.path.exists(path):
+        return state
+
+    archive = read_archive(path)
+    metrics = [c for c in archive.columns if c not in ("artist_id", "platform", "handle", "date", "snapshot_date")]
+    for artist, rows in archive.groupby("artist_id", sort=False):
+        merge_daily(state, platform, artist, rows["handle"].iloc[-1], rows[["date", *metrics]])
+    return state
+
+
+def store_daily(state, platform, artist, handle, daily, archive_dir=ARCHIVE_DIR, revisions_path=REVISIONS_PATH,
+                journal=None):
+    """
+    merge_daily one fetched history and append its rows / revisions, then record the
+    series' new state in journal (see state_journal). Returns (rows, revisions) counts.
+    """
+    entry = copy.deepcopy(state.get(platform, {}).get(artist))
+    try:
+        rows, revisions = merge_daily(state, platform, artist, handle, daily)
+        if len(rows):
+            _append_csv(rows, archive_path(platform, archive_dir),
+                        columns=["artist_id", "platform", "handle", *daily.columns, "snapshot_date"])
+    except Exception:
+        # nothing was appended, so the series' state mustn't move either
+        if entry is None:
+            state.get(platform, {}).pop(artist, None)
+        else:
+            state[platform][artist] = entry
+        raise
+    if len(revisions):
+        _append_csv(revisions, revisions_path, columns=REVISION_COLUMNS)
+    if journal is not None:
+        journal.record((platform, artist), state[platform][artist])
+    return len(rows), len(revisions)
+
+
+def open_state(platforms, archive_dir=ARCHIVE_DIR, state_path=STATE_PATH):
+    """
+    (state, journal) to start a refresh with: the saved state plus anything an
+    interrupted refresh journaled, seeded for new platforms and saved straight
+    away so the journal starts empty. Pass journal on to store_daily and save_state.
+    """
+    state = load_state(state_path)
+    for platform in platforms:
+        seed_state(state, platform, archive_dir)
+
+    journal = state_journal(state_path)
+    save_state(state, state_path, journal)
+    return state, journal
+
+
+def refresh_platform(handles, platform, fetch, archive_dir=ARCHIVE_DIR, state_path=STATE_PATH,
+                     revisions_path=REVISIONS_PATH):
+    """
+    Incrementally refresh one platform's archive.
+
+    fetch(platform, handle, history) returns the daily history of a handle as a
+    DataFrame (or None if the request failed). Each handle is asked only for as
+    much history as it's missing, and only new or revised days are appended to
+    <platform>_archive.csv. The archive is never read back, so a refresh costs the
+    days elapsed rather than the archive size. read_archive keeps the latest
+    snapshot of a revised day. Revisions are appended to revisions_path. The first
+    refresh of a platform reads its existing archive once, to seed the state.
+
+    Every stored series is journaled straight away (see state_journal), so
+    rerunning after a crash picks up where it stopped instead of appending the
+    same rows again.
+
+    Returns {"rows": appended rows, "revisions": revised cells, "failed": [artists]}.
+    """
+    state, journal = open_state([platform], archive_dir, state_path)
+    stats = {"rows": 0, "revisions": 0, "failed": []}
+
+    try:
+        for artist, handle in handles.items():
+            daily = fetch(platform, handle, history_for(state, platform, artist, handle))
+            if daily is None:
+                stats["failed"].append(artist)
+                continue
+
+            rows, revisions = store_daily(state, platform, artist, handle, daily, archive_dir, revisions_path,
+                                          journal)
+            stats["rows"] += rows
+            stats["revisions"] += revisions
+    finally:
+        save_state(state, state_path, journal)
+        journal.close()
+    return stats
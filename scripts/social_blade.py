@@ -10,6 +10,8 @@ import time, random
 from data.raw_data.social_handles.social_handles_ig import ig
 from data.raw_data.social_handles.social_handles_tt import tt
 from data.raw_data.social_handles.social_handles_yt import yt
+from scripts.http_cache import cache
+from scripts.social_collector import refresh_archives
 
 #%%
 
@@ -20,62 +22,23 @@ print(len(ig.keys()))
 
 #%%
 
-def get_social_data(handles_dict, platform):
-
-    count = 0
-
-    base_url = "https://matrix.sbapis.com/b"
-
-    dfs = []
-
-    for artist, handle in handles_dict.items():
-        
-        endpoint = f"/{platform}/statistics?query={handle}&history=vault&allow-stale=false"
-
-        headers = {
-            "clientid": os.getenv("SOCIAL_BLADE_CLIENT_ID"),
-            "token": os.getenv("SOCIAL_BLADE_API_TOKEN")
-        }
-
-        response = requests.get(base_url + endpoint, headers=headers)
-        print(artist, handle)
-        print("--------------------------------")
-        print(response.status_code)
-        print("--------------------------------")
-        print(count, " of ", len(handles_dict))
-        count += 1
-        time.sleep(1)
-
-        if response.status_code != 200:
-            print("Skipping artist: ", artist, " due to status code: ", response.status_code)
-            continue
-
-
-        data = response.json()
-        df = pd.DataFrame(data["data"]["daily"])
-        df["artist_id"] = artist
-        df["platform"] = platform
-        df["handle"] = handle
-        df["snapshot_date"] = datetime.now().strftime("%Y-%m-%d")
-        dfs.append(df)
-
-    
-    return pd.concat(dfs, ignore_index=True)
-
-#%%
-
-batch = get_social_data(ig, "instagram")
-batch.to_csv(f"data/processed_data/instagram_archive.csv")
-
-#%%
+"""
+Incremental refresh (see scripts/social_archive.py): each handle is only asked for the days
+since it was last stored, and only new days (or days SocialBlade revised) are appended to
+the archive. Revised values are logged in social_archives/revisions.csv.
 
-batch = get_social_data(tt, "tiktok")
-batch.to_csv(f"data/processed_data/tiktok_archive.csv")
+A handle with no stored days yet gets its full ("vault") history, so this is also how an
+archive is started from scratch. A refresh that gets interrupted just picks up where it
+stopped when rerun (see social_archive.state_journal).
+"""
 
-#%%
+# All handles of all platforms are fetched concurrently, within the API quota (see
+# scripts/social_collector.py), and written to the archives as they come in.
+refresh_archives({"instagram": ig, "tiktok": tt, "youtube": yt})
 
-batch = get_social_data(yt, "youtube")
-batch.to_csv(f"data/processed_data/youtube_archive.csv")
+# Responses are cached for 12 hours, so a rerun today hardly hits the API.
+# HTTP_CACHE_BYPASS=1 (or cache.bypass = True) refetches everything.
+cache.stats
 
 # %%
 
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import pandas as pd
+
+from scripts.http_cache import cache
+from scripts.social_archive import (
+    ARCHIVE_DIR, REVISIONS_PATH, STATE_PATH, history_for, open_state, save_state, store_daily,
+)
+
+BASE_URL = os.getenv("SOCIAL_BLADE_BASE_URL", "https://matrix.sbapis.com/b")
+
+# SocialBlade quota: requests per second on average, and how many can go out at once
+RATE = float(os.getenv("SOCIAL_BLADE_RATE", "2"))
+BURST = 5
+
+# Shared connection pool size
+MAX_CONNECTIONS = 10
+
+# Retries of 429 / 5xx responses and connection errors, with exponential backoff
+RETRIES = 3
+BACKOFF = 2.0
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: rate tokens per second, up to capacity stored.
+
+    Every request takes a token, so bursts of up to capacity go out at once and
+    the long-run rate never exceeds rate, whatever the concurrency.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _headers():
+    return {
+        "clientid": os.getenv("SOCIAL_BLADE_CLIENT_ID") or "",
+        "token": os.getenv("SOCIAL_BLADE_API_TOKEN") or "",
+    }
+
+
+def _daily(data, handle):
+    try:
+        return pd.DataFrame(data["data"]["daily"])
+    except (KeyError, TypeError):
+        print("Skipping handle: ", handle, " due to a response without daily history")
+        return None
+
+
+async def fetch_daily_async(session, bucket, platform, handle, history="vault", base_url=BASE_URL):
+    """
+    Daily history of one handle, or None if the request failed. Responses are
+    cached (see scripts/http_cache.py): a fresh cached response doesn't take a
+    token, and a stale one is used if every attempt fails.
+    """
+    endpoint = f"socialblade/{platform}/statistics"
+    params = {"query": handle, "history": history, "allow-stale": "false"}
+
+    data = cache.get(endpoint, params)
+    if data is not None:
+        cache.stats["hits"] += 1
+        return _daily(data, handle)
+    cache.stats["misses"] += 1
+
+    for attempt in range(RETRIES + 1):
+        await bucket.acquire()
+        try:
+            async with session.get(f"{base_url}/{platform}/statistics", params=params) as response:
+                if response.status == 429 or response.status >= 500:
+                    status = response.status
+                else:
+                    if response.status != 200:
+                        print("Skipping handle: ", handle, " due to status code: ", response.status)
+                        return None
+                    data = await response.json()
+                    daily = _daily(data, handle)
+                    if daily is not None:
+                        cache.put(endpoint, params, data)
+                    return daily
+        except aiohttp.ClientError as e:
+            status = e
+
+        if attempt < RETRIES:
+            await asyncio.sleep(BACKOFF ** attempt)
+
+    print("Giving up on handle: ", handle, " after ", status)
+    data = cache.get(endpoint, params, stale_ok=True)
+    if data is None:
+        return None
+    cache.stats["stale"] += 1
+    return _daily(data, handle)
+
+
+async def collect(jobs, on_result, rate=RATE, burst=BURST, max_connections=MAX_CONNECTIONS, base_url=BASE_URL):
+    """
+    Fetch (platform, artist, handle, history) jobs concurrently, over one connection
+    pool and one token bucket, calling on_result(platform, artist, handle, daily) as
+    each one arrives (daily is None if it failed).
+
+    A job that raises (in the request or in on_result) is printed and skipped
+    rather than cancelling the rest. Returns the jobs that raised.
+    """
+    bucket = TokenBucket(rate, burst)
+    connector = aiohttp.TCPConnector(limit=max_connections)
+
+    async with aiohttp.ClientSession(connector=connector, headers=_headers()) as session:
+        async def run(job):
+            platform, artist, handle, history = job
+            try:
+                daily = await fetch_daily_async(session, bucket, platform, handle, history, base_url)
+                on_result(platform, artist, handle, daily)
+            except Exception as e:
+                print("Failed on handle: ", handle, " with ", repr(e))
+                return job
+
+        errors = await asyncio.gather(*(run(job) for job in jobs))
+    return [job for job in errors if job is not None]
+
+
+async def refresh_archives_async(handles, rate=RATE, burst=BURST, max_connections=MAX_CONNECTIONS, base_url=BASE_URL,
+                                 archive_dir=ARCHIVE_DIR, state_path=STATE_PATH, revisions_path=REVISIONS_PATH):
+    """
+    Incrementally refresh every platform's archive at once (see
+    social_archive.refresh_platform), fetching all handles of all platforms
+    concurrently. handles is {platform: {artist: handle}}. Each result is merged
+    and appended to its archive as soon as it arrives, and journaled with its
+    state right after, so an interrupted refresh doesn't append it again.
+
+    Returns {platform: {"rows", "revisions", "failed"}}.
+    """
+    state, journal = open_state(handles, archive_dir, state_path)
+
+    stats = {platform: {"rows": 0, "revisions": 0, "failed": []} for platform in handles}
+    jobs = [
+        (platform, artist, handle, history_for(state, platform, artist, handle))
+        for platform, platform_handles in handles.items()
+        for artist, handle in platform_handles.items()
+    ]
+
+    def on_result(platform, artist, handle, daily):
+        if daily is None:
+            stats[platform]["failed"].append(artist)
+            return
+        rows, revisions = store_daily(state, platform, artist, handle, daily, archive_dir, revisions_path, journal)
+        stats[platform]["rows"] += rows
+        stats[platform]["revisions"] += revisions
+
+    try:
+        errors = await collect(jobs, on_result, rate, burst, max_connections, base_url)
+        for platform, artist, _, _ in errors:
+            stats[platform]["failed"].append(artist)
+    finally:
+        save_state(state, state_path, journal)
+        journal.close()
+    return stats
+
+
+def refresh_archives(handles, **kwargs):
+    """refresh_archives_async from sync code. Inside a running event loop (a notebook) it runs on a worker thread."""
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(refresh_archives_async(handles, **kwargs))
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, refresh_archives_async(handles, **kwargs)).result()
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+
+def _sorted_groups(df, group_cols, date_col):
+    """Row order that sorts df by (group, date), and each sorted row's group start / end (exclusive)."""
+
+    groups = df.groupby(list(group_cols), sort=True, dropna=False).ngroup().to_numpy()
+    order = np.lexsort((pd.to_datetime(df[date_col]).to_numpy(), groups))
+    groups = groups[order]
+
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(df) else np.zeros(0, dtype="int64")
+    sizes = np.diff(np.r_[starts, len(df)])
+    return order, np.repeat(starts, sizes), np.repeat(starts + sizes, sizes)
+
+
+def interpolate_groups(df, metrics, group_cols=("artist", "platform"), date_col="date",
+                       method="linear", max_gap=None):
+    """
+    Fill NaNs in every metric column, within each (artist, platform) group.
+
+    method="linear" spaces rows evenly like Series.interpolate(), method="time"
+    weights by the dates. As with Series.interpolate(), leading NaNs stay NaN and
+    trailing NaNs take the last value. With max_gap, runs of more than max_gap
+    missing rows are left alone entirely.
+
+    All metrics and groups are filled in one pass over (group, date) sorted arrays.
+    Returns (filled df in the original row order, boolean frame of imputed cells).
+    """
+    metrics = list(metrics)
+    order, start, end = _sorted_groups(df, group_cols, date_col)
+
+    y = df[metrics].to_numpy(dtype="float64")[order]
+    if method == "linear":
+        x = np.arange(len(df), dtype="float64")
+    elif method == "time":
+        x = pd.to_datetime(df[date_col]).to_numpy()[order].astype("datetime64[s]").astype("float64")
+    else:
+        raise ValueError(f"method must be 'linear' or 'time', not {method!r}")
+
+    valid = ~np.isnan(y)
+    rows = np.arange(len(df))[:, None]
+
+    # nearest valid row before / after every row, per column
+    prev = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    nxt = np.minimum.accumulate(np.where(valid, rows, len(df))[::-1], axis=0)[::-1]
+    has_prev = prev >= start[:, None]
+    has_next = nxt < end[:, None]
+
+    prev_i, next_i = np.where(has_prev, prev, 0), np.where(has_next, nxt, 0)
+    y_prev, y_next = np.take_along_axis(y, prev_i, axis=0), np.take_along_axis(y, next_i, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = (x[:, None] - x[prev_i]) / (x[next_i] - x[prev_i])
+        filled = np.where(has_next, y_prev + (y_next - y_prev) * weight, y_prev)
+    imputed = ~valid & has_prev
+
+    if max_gap is not None:
+        gap = np.where(has_next, nxt, end[:, None]) - prev - 1
+        imputed &= gap <= max_gap
+
+    y = np.where(imputed, filled, y)
+
+    # back to the caller's row order
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+
+    out = df.copy()
+    out[metrics] = y[inverse]
+    return out, pd.DataFrame(imputed[inverse], index=df.index, columns=metrics)
+
+
+# Metrics that only ever grow, so a drop to zero is a collection error. Post counts
+# (media, uploads) can really drop to zero when an artist archives their posts.
+CUMULATIVE_METRICS = ("followers", "subs", "views", "likes")
+
+CELL_STATUSES = ["observed", "missing", "zero_drop", "outage"]
+
+
+def detect_outages(df, metrics, group_cols=("artist", "platform"), date_col="date",
+                   cross_cols=("platform",), min_share=0.25, min_series=3, calendar=None):
+    """
+    Classify every metric cell, and find the dates a platform's collection was down.
+
+    A cell is missing if it's NaN, or zero after the same series (artist, platform,
+    metric) was already positive. Leading zeros are taken at face value. When, on
+    some date, at least min_share of the series of a (platform, metric) that have
+    any data are missing, and at least min_series of them, that date is an outage.
+    For a long frame (one value column, metric in a column) pass
+    group_cols=("artist", "platform", "metric") and cross_cols=("platform", "metric").
+
+    The share depends on which series are in df. Pass calendar (an earlier result,
+    eg. of the whole social store) to take the outage dates from it instead, so a
+    series gets the same status whatever else is in df.
+
+    Returns (calendar, status):
+    - calendar: one row per outage (platform, metric, date), with n_missing,
+      n_series and share
+    - status: frame like df[metrics] of observed / missing / zero_drop / outage,
+      where zero_drop is a zero on a single series outside any outage
+
+    Every metric and series is handled at once on (group, date) sorted arrays.
+    """
+    metrics = list(metrics)
+    order, start, _ = _sorted_groups(df, group_cols, date_col)
+    sorted_df = df.iloc[order]
+
+    y = sorted_df[metrics].to_numpy(dtype="float64")
+    rows = np.arange(len(df))[:, None]
+
+    # a zero after the series' latest positive row (in the same group)
+    last_positive = np.maximum.accumulate(np.where(y > 0, rows, -1), axis=0)
+    zero_drop = (y == 0) & (last_positive >= start[:, None])
+    missing = np.isnan(y) | zero_drop
+
+    # series with no data at all (platform doesn't have the metric, artist has no account) don't count
+    first = np.flatnonzero(start == rows[:, 0])
+    has_data = np.logical_or.reduceat(~np.isnan(y), first, axis=0) if len(df) else np.zeros_like(y, dtype=bool)
+    in_series = has_data[np.cumsum(start == rows[:, 0]) - 1]
+
+    # cross section: missing share per (platform, date), for every metric
+    cross_cols = list(cross_cols)
+    cells = sorted_df.groupby([*cross_cols, date_col], sort=True).ngroup().to_numpy()
+    keys = sorted_df[[*cross_cols, date_col]].iloc[np.unique(cells, return_index=True)[1]]
+    n_series = np.column_stack([np.bincount(cells, in_series[:, j], len(keys)) for j in range(len(metrics))])
+    n_missing = np.column_stack([
+        np.bincount(cells, missing[:, j] & in_series[:, j], len(keys)) for j in range(len(metrics))
+    ])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = n_missing / n_series
+    if calendar is None:
+        outage_cell = (share >= min_share) & (n_missing >= min_series)
+    else:
+        # in a long frame the metric is one of the cross_cols, otherwise it's one of the metrics
+        cal_cols = [*cross_cols, date_col] if "metric" in cross_cols else ["metric", *cross_cols, date_col]
+        known = pd.MultiIndex.from_frame(calendar[cal_cols])
+        outage_cell = np.column_stack([
+            pd.MultiIndex.from_frame((keys if "metric" in cross_cols else keys.assign(metric=m))[cal_cols]).isin(known)
+            for m in metrics
+        ]) if len(keys) else np.zeros((0, len(metrics)), dtype=bool)
+
+    outage = missing & in_series & outage_cell[cells]
+    status = np.select(
+        [outage, zero_drop, np.isnan(y)],
+        ["outage", "zero_drop", "missing"],
+        default="observed",
+    )
+
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    status = pd.DataFrame(status[inverse], index=df.index, columns=metrics).astype(pd.CategoricalDtype(CELL_STATUSES))
+
+    k, j = np.nonzero(outage_cell)
+    calendar = {c: keys[c].to_numpy()[k] for c in cross_cols}
+    # in a long frame the metric is already one of the cross_cols
+    calendar.setdefault("metric", np.asarray(metrics)[j])
+    calendar.update({
+        date_col: keys[date_col].to_numpy()[k],
+        "n_missing": n_missing[k, j].astype("int64"),
+        "n_series": n_series[k, j].astype("int64"),
+        "share": share[k, j],
+    })
+    calendar = pd.DataFrame(calendar).sort_values(list(calendar)[:-3], ignore_index=True)
+
+    return calendar, status
+
+
+def imputable(status, cumulative_metrics=CUMULATIVE_METRICS, cumulative=None):
+    """
+    Cells to blank out and re-interpolate: everything caught in an outage, plus
+    zero drops of cumulative metrics. Zero drops of post counts are left alone.
+
+    For a long frame (one value column, metric in a column) pass cumulative, a
+    boolean per row saying whether the row's metric is cumulative, instead of
+    cumulative_metrics.
+    """
+    mask = status == "outage"
+    for col in status.columns:
+        if cumulative is not None:
+            mask[col] |= (status[col] == "zero_drop") & np.asarray(cumulative, dtype=bool)
+        elif col in cumulative_metrics:
+            mask[col] |= status[col] == "zero_drop"
+    return mask
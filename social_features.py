@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+# Growth windows in days. 28 is the 4 weeks before release the features started with.
+GROWTH_WINDOWS = (7, 14, 28, 56, 90)
+
+
+def window_label(days):
+    """28 -> "4w", 10 -> "10d"."""
+
+    return f"{days // 7}w" if days % 7 == 0 else f"{days}d"
+
+
+def growth_columns(metrics, windows=GROWTH_WINDOWS, prefix=""):
+    return [f"{prefix}{m}_cgr_{window_label(w)}" for w in windows for m in metrics]
+
+
+def _sorted_by_group(df, group_cols, date_col):
+    """df sorted by (group, date), and a sorted int key of (group, day) to find rows some days back."""
+
+    out = df.copy()
+    out[date_col] = pd.to_datetime(out[date_col])
+    out = out.sort_values([*group_cols, date_col], kind="stable")
+
+    # groups are numbered in order of appearance, which is sorted order here, so
+    # key is sorted too
+    group = out.groupby(group_cols, sort=False, dropna=False).ngroup().to_numpy().astype("int64")
+    days = out[date_col].to_numpy().astype("datetime64[D]").astype("int64")
+    key = group * (1 << 32) + (days - days.min() if len(days) else days)
+    return out, key
+
+
+def _days_back(key, values, w):
+    """values of the same group w days earlier, NaN if there's no row for that day."""
+
+    pos = np.minimum(np.searchsorted(key, key - w), max(len(key) - 1, 0))
+    found = key[pos] == key - w if len(key) else np.zeros(0, dtype=bool)
+    return np.where(found[:, None], values[pos], np.nan)
+
+
+def compound_growth(df, metrics, windows=GROWTH_WINDOWS, group_cols=("artist", "platform"),
+                    date_col="date", prefix=""):
+    """
+    Compound daily growth rate, in %, of every metric over every window:
+
+        ((x_t / x_{t-w}) ** (1/w) - 1) * 100
+
+    where x_{t-w} is the same group's value w days earlier (NaN if there's no row
+    for that day). Adds one {prefix}{metric}_cgr_{label} column per metric and
+    window, eg. ig_followers_cgr_4w, and returns df sorted by group and date.
+
+    All groups are handled at once: rows are sorted by (group, date), and the row
+    w days back is found with one searchsorted per window on a (group, day) key.
+    """
+    metrics = list(metrics)
+    out, key = _sorted_by_group(df, list(group_cols), date_col)
+
+    values = out[metrics].to_numpy(dtype="float64")
+    growth = {}
+    for w in windows:
+        past = _days_back(key, values, w)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = ((values / past) ** (1 / w) - 1) * 100
+
+        for j, m in enumerate(metrics):
+            growth[f"{prefix}{m}_cgr_{window_label(w)}"] = rates[:, j]
+
+    return out.assign(**growth)
+
+
+def daily_change(df, metrics, windows=GROWTH_WINDOWS, group_cols=("artist", "platform"),
+                 date_col="date", prefix=""):
+    """
+    Average change per day of every metric over every window, (x_t - x_{t-w}) / w,
+    eg. the posting rate from a post count. Adds {prefix}{metric}_per_day_{label}
+    columns and returns df sorted by group and date, like compound_growth.
+    """
+    metrics = list(metrics)
+    out, key = _sorted_by_group(df, list(group_cols), date_col)
+
+    values = out[metrics].to_numpy(dtype="float64")
+    change = {}
+    for w in windows:
+        per_day = (values - _days_back(key, values, w)) / w
+        for j, m in enumerate(metrics):
+            change[f"{prefix}{m}_per_day_{window_label(w)}"] = per_day[:, j]
+
+    return out.assign(**change)
+
+
+def as_of(queries, observations, columns, by="artist", on="date", as_of_col="release_date", tolerance=None):
+    """
+    Attach to every query row the latest observation of each column at or before
+    its as_of_col date, eg. follower counts on (or just before) the release date.
+
+    by is a column or a list of columns. observations is a frame or a list of
+    frames (say one per platform) with by, on and some of columns; column names
+    must not clash between frames. Each column
+    is looked up on its own, so a NaN on the latest day falls back to the day
+    before. With tolerance (a Timedelta), values observed longer than that before
+    the as-of date come back as NaN; tolerance=pd.Timedelta(0) means same day only.
+    Dates are compared by day.
+
+    Observations are sorted once on a (by, day) key, each column is forward filled
+    within its group on the sorted arrays, and the queries are located with one
+    searchsorted. Returns queries with the columns added, in its original order.
+    """
+    if isinstance(observations, pd.DataFrame):
+        observations = [observations]
+    columns = list(columns)
+    by = [by] if isinstance(by, str) else list(by)
+
+    obs = pd.concat(
+        [o[by + [on] + [c for c in columns if c in o.columns]] for o in observations],
+        ignore_index=True,
+    )
+    out = queries.copy()
+    if obs.empty:
+        for c in columns:
+            out[c] = np.nan
+        return out
+
+    # -1 for missing keys, which never match
+    keys = pd.concat([obs[by], queries[by]], ignore_index=True)
+    codes = keys.groupby(by, sort=False).ngroup().fillna(-1).to_numpy().astype("int64")
+    obs_codes, q_codes = codes[:len(obs)], codes[len(obs):]
+    obs_days = pd.to_datetime(obs[on]).to_numpy().astype("datetime64[D]").astype("int64")
+    q_dates = pd.to_datetime(queries[as_of_col])
+    q_days = q_dates.to_numpy().astype("datetime64[D]").astype("int64")
+
+    day0 = obs_days.min()
+    key = (obs_codes << 32) + (obs_days - day0)
+    order = np.argsort(key, kind="stable")
+    key, obs_codes, obs_days = key[order], obs_codes[order], obs_days[order]
+
+    # first row of each row's group, to stop the forward fill at group boundaries
+    rows = np.arange(len(obs))
+    group_start = np.maximum.accumulate(np.where(np.r_[True, obs_codes[1:] != obs_codes[:-1]], rows, 0))
+
+    pos = np.searchsorted(key, (q_codes << 32) + (q_days - day0), side="right") - 1
+    hit = (pos >= 0) & (q_codes >= 0) & q_dates.notna().to_numpy()
+    pos = np.where(hit, pos, 0)
+    hit &= obs_codes[pos] == q_codes
+
+    for c in columns:
+        col = obs[c].iloc[order].reset_index(drop=True)
+
+        # index of the latest non-null row so far, kept only if it's in the same group
+        last = np.maximum.accumulate(np.where(col.notna().to_numpy(), rows, -1))[pos]
+        ok = hit & (last >= group_start[pos])
+        if tolerance is not None:
+            ok &= q_days - obs_days[np.where(ok, last, 0)] <= tolerance / pd.Timedelta(days=1)
+
+        out[c] = col.take(np.where(ok, last, 0)).where(ok).to_numpy()
+
+    return out
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+from social_cleaning import CUMULATIVE_METRICS, detect_outages, imputable, interpolate_groups
+from social_features import as_of, compound_growth, growth_columns, window_label
+from social_store import PLATFORM_SPECS, SOCIAL_STORE_DIR, query_release_windows, query_social
+from utils import expand_to_full_window
+
+# One daily series of the long table. An artist can have several releases, each
+# with its own window.
+SERIES_COLS = ["artist", "release_date", "platform", "metric"]
+
+# Days read before an outage_calendar's start, so a zero there is still recognized
+# as a drop (a zero after the series was positive within that many days)
+OUTAGE_LOOKBACK = 90
+
+
+def _cumulative(spec):
+    return spec.get("cumulative", [m for m in spec["metrics"] if m in CUMULATIVE_METRICS])
+
+
+def social_feature_columns(specs=PLATFORM_SPECS, windows=(7, 14, 28)):
+    """Feature columns release_features makes, in order."""
+
+    release_cols = [f"{spec['prefix']}_{m}_release_date" for spec in specs.values() for m in spec["metrics"]]
+    return release_cols + [
+        c for spec in specs.values() for c in growth_columns(spec["metrics"], windows, prefix=f"{spec['prefix']}_")
+    ]
+
+
+def load_social_long(releases, specs=PLATFORM_SPECS, days_back=28, store_dir=SOCIAL_STORE_DIR):
+    """
+    Every platform's release windows (see social_store.query_release_windows), stacked
+    into one long table of artist, platform, release_date, date, metric, value.
+    """
+    frames = []
+    for platform, spec in specs.items():
+        windows = query_release_windows(
+            platform, releases[["artist", "release_date"]].drop_duplicates(), days_back=days_back,
+            columns=spec["metrics"], store_dir=store_dir,
+        )
+        windows["platform"] = platform
+        frames.append(windows.melt(
+            id_vars=["artist", "platform", "release_date", "date"], value_vars=spec["metrics"],
+            var_name="metric", value_name="value",
+        ))
+
+    long = pd.concat(frames, ignore_index=True)
+    long["value"] = long["value"].astype("float64")
+    return long
+
+
+def outage_calendar(specs=PLATFORM_SPECS, store_dir=SOCIAL_STORE_DIR, start=None):
+    """
+    Outage calendar of the whole social store (see social_cleaning.detect_outages):
+    the (platform, metric, date)s on which enough of every tracked artist's series
+    were missing. Each series counts from its first to its last archived day, so
+    artists we stopped tracking don't count as missing after that.
+
+    Cleaning with this calendar (clean_panel's outages) gives every series the same
+    statuses whichever other artists are in the panel.
+
+    With start, only the dates from start on, reading OUTAGE_LOOKBACK days before
+    it rather than the whole store; used to extend a saved calendar over new days.
+    """
+    series_cols = ["artist", "platform", "metric"]
+    first = None if start is None else pd.Timestamp(start) - pd.Timedelta(days=OUTAGE_LOOKBACK)
+    frames = []
+    for platform, spec in specs.items():
+        rows = query_social(platform, start=first, columns=spec["metrics"], store_dir=store_dir)
+        rows = rows.rename(columns={"artist_id": "artist"})
+        rows["artist"] = rows["artist"].astype(str)
+        rows["platform"] = platform
+        frames.append(rows.melt(
+            id_vars=["artist", "platform", "date"], value_vars=spec["metrics"], var_name="metric", value_name="value",
+        ))
+
+    long = pd.concat(frames, ignore_index=True)
+    if long.empty:
+        return pd.DataFrame(columns=["platform", "metric", "date", "n_missing", "n_series", "share"])
+    long["value"] = long["value"].astype("float64")
+    long["date"] = pd.to_datetime(long["date"])
+
+    # every day of each series' own span
+    spans = long.groupby(series_cols, sort=False)["date"].agg(["min", "max"]).reset_index()
+    n_days = ((spans["max"] - spans["min"]).dt.days + 1).to_numpy()
+    grid = spans.loc[spans.index.repeat(n_days), series_cols].reset_index(drop=True)
+    offsets = np.arange(n_days.sum()) - np.repeat(np.cumsum(n_days) - n_days, n_days)
+    grid["date"] = np.repeat(spans["min"].to_numpy(), n_days) + pd.to_timedelta(offsets, unit="D")
+    grid = grid.merge(long, on=[*series_cols, "date"], how="left")
+
+    outages, _ = detect_outages(grid, ["value"], group_cols=series_cols, cross_cols=("platform", "metric"))
+    if start is not None:
+        outages = outages[outages["date"] >= pd.Timestamp(start)].reset_index(drop=True)
+    return outages
+
+
+def build_social_panel(releases, specs=PLATFORM_SPECS, days_back=28, store_dir=SOCIAL_STORE_DIR, outages=None):
+    """
+    Clean daily series of every (artist, platform, metric) in specs before each release.
+
+    All series go through each step together, on one long table: a full days_back
+    window per series, outage / zero drop detection (see social_cleaning.py),
+    blanking of outages and of cumulative metrics' zero drops, then linear
+    interpolation. The panel keeps the raw value, each cell's status and an imputed flag.
+
+    Outage days come from outages, the store's outage_calendar (computed if not
+    given), so a release's panel doesn't depend on the other releases passed with it.
+
+    Returns (panel, outage calendar).
+    """
+    if outages is None:
+        outages = outage_calendar(specs, store_dir)
+
+    long = load_social_long(releases, specs, days_back=days_back, store_dir=store_dir)
+    panel = expand_to_full_window(long, SERIES_COLS, "date", "release_date", days_back)
+    return clean_panel(panel, specs, outages=outages)
+
+
+def clean_panel(panel, specs=PLATFORM_SPECS, series_cols=SERIES_COLS, max_gap=None, outages=None):
+    """
+    Outage / zero drop detection and imputation of a long panel with one row per
+    series and day. Adds raw, status and imputed columns; returns (panel, outage calendar).
+
+    With outages (eg. outage_calendar()) the outage days are taken from it, otherwise
+    they're detected across the series in the panel.
+    """
+    panel = panel.copy()
+    panel["raw"] = panel["value"]
+
+    outages, status = detect_outages(panel, ["value"], group_cols=series_cols, cross_cols=("platform", "metric"),
+                                     calendar=outages)
+    panel["status"] = status["value"]
+
+    cumulative = pd.Series(False, index=panel.index)
+    for platform, spec in specs.items():
+        cumulative |= (panel["platform"] == platform) & panel["metric"].isin(_cumulative(spec))
+    panel["value"] = panel["value"].mask(imputable(status, cumulative=cumulative)["value"])
+
+    panel, imputed = interpolate_groups(panel, ["value"], group_cols=series_cols, max_gap=max_gap)
+    panel["imputed"] = imputed["value"]
+    return panel, outages
+
+
+def platform_frame(panel, platform, column="value"):
+    """One platform's rows of the panel in wide form, one column per metric (eg. for plot_two_metrics)."""
+
+    rows = panel[panel["platform"] == platform]
+    wide = rows.pivot(index=["artist", "platform", "release_date", "date"], columns="metric", values=column)
+    return wide.rename_axis(columns=None).reset_index()
+
+
+def release_features(panel, releases, specs=PLATFORM_SPECS, windows=(7, 14, 28), tolerance=None):
+    """
+    One row per (artist, release_date) of releases with every series' value on the
+    release date and its compound growth over windows (see social_features.py), as
+    {prefix}_{metric}_release_date and {prefix}_{metric}_cgr_{label} columns.
+
+    Growth is computed for all series at once, and the release-date values come from
+    one as-of lookup keyed on (artist, release_date, platform, metric). Each
+    release only sees its own window, so nothing after its release date leaks in.
+    """
+    growth = compound_growth(panel, ["value"], windows, group_cols=SERIES_COLS)
+    values = ["value"] + [f"value_cgr_{window_label(w)}" for w in windows]
+
+    series = pd.DataFrame(
+        [(platform, spec["prefix"], m) for platform, spec in specs.items() for m in spec["metrics"]],
+        columns=["platform", "prefix", "metric"],
+    )
+    queries = releases[["artist", "release_date"]].drop_duplicates().merge(series, how="cross")
+    queries["release_date"] = pd.to_datetime(queries["release_date"])
+    found = as_of(queries, growth, values, by=SERIES_COLS, tolerance=tolerance)
+
+    # value -> yt_views_release_date, value_cgr_4w -> yt_views_cgr_4w
+    found = found.melt(id_vars=["artist", "release_date", "prefix", "metric"], value_vars=values,
+                       var_name="feature", value_name="x")
+    suffix = found["feature"].str.replace("value_", "", regex=False).replace("value", "release_date")
+    found["feature"] = found["prefix"] + "_" + found["metric"] + "_" + suffix
+
+    wide = found.pivot(index=["artist", "release_date"], columns="feature", values="x")
+    return wide.rename_axis(columns=None).reindex(columns=social_feature_columns(specs, windows)).reset_index()
+
@@ -0,0 +1,225 @@
+import functools
+import operator
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import manifest
+
+ARCHIVE_DIR = "data/raw_data/social_archives"
+SOCIAL_STORE_DIR = "data/processed_data/social_store"
+
+# Platforms in the social store (one <platform>_archive.csv each, pulled by
+# scripts/social_blade.py) and the metrics we build features from. prefix names
+# the feature columns, eg. yt_views_cgr_4w. cumulative lists the metrics whose zero
+# drops are collection errors (defaults to social_cleaning.CUMULATIVE_METRICS). posts names
+# the post count metric, for posting rates. Adding a platform is adding an entry here, eg.
+#     "spotify": {"prefix": "sp", "metrics": ["followers"]},
+PLATFORM_SPECS = {
+    "youtube": {"prefix": "yt", "metrics": ["subs", "views"]},
+    "tiktok": {"prefix": "tt", "metrics": ["followers", "uploads", "likes"], "posts": "uploads"},
+    "instagram": {"prefix": "ig", "metrics": ["followers", "media"], "posts": "media"},
+}
+
+# Each platform's artists are spread over this many files, by crc32 of artist_id
+N_BUCKETS = 16
+
+# Files are sorted by (artist_id, date), so row group statistics let a scan
+# skip the artists and dates a query doesn't ask for
+ROW_GROUP_SIZE = 8192
+
+# Bump when the store layout changes, so the next build rewrites everything
+SCHEMA_VERSION = 1
+
+# Low-cardinality strings repeated on every daily row
+_DICTIONARY_COLUMNS = ["artist_id", "platform", "handle"]
+_KEY_COLUMNS = ["artist_id", "platform", "handle", "date"]
+
+
+def archive_path(platform, archive_dir=ARCHIVE_DIR):
+    return os.path.join(archive_dir, f"{platform}_archive.csv")
+
+
+def artist_bucket(artist_id):
+    return zlib.crc32(str(artist_id).encode()) % N_BUCKETS
+
+
+def _bucket_path(store_dir, platform, bucket):
+    return os.path.join(store_dir, f"platform={platform}", f"bucket={bucket:02d}.parquet")
+
+
+def read_archive(path):
+    """
+    Read a SocialBlade archive CSV as written by scripts/social_blade.py.
+
+    Drops the saved pandas index, parses date, and keeps only the latest snapshot
+    of each (artist_id, date) in case the archive holds several pulls.
+    """
+    table = pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(
+        column_types={"date": pa.timestamp("s"), "artist_id": pa.string(), "handle": pa.string()}
+    ))
+    archive = table.to_pandas()
+    archive = archive.drop(columns=[c for c in archive.columns if c == "" or c.startswith("Unnamed")])
+    archive["date"] = archive["date"].dt.normalize()
+
+    if "snapshot_date" in archive.columns:
+        archive = archive.sort_values("snapshot_date", kind="stable")
+    archive = archive.drop_duplicates(["artist_id", "date"], keep="last")
+
+    return archive.sort_values(["artist_id", "date"], ignore_index=True)
+
+
+def _to_store_table(archive):
+    table = pa.Table.from_pandas(archive, preserve_index=False)
+    for col in _DICTIONARY_COLUMNS:
+        if col in table.column_names:
+            i = table.schema.get_field_index(col)
+            table = table.set_column(i, col, table[col].cast(pa.string()).dictionary_encode())
+    i = table.schema.get_field_index("date")
+    return table.set_column(i, "date", table["date"].cast(pa.date32()))
+
+
+def load_manifest(store_dir=SOCIAL_STORE_DIR):
+    """Return {"schema_version": ..., "platforms": {platform: {size, mtime, sha1}}} of the archives in the store."""
+
+    return manifest.load_manifest(store_dir, SCHEMA_VERSION, {"schema_version": SCHEMA_VERSION, "platforms": {}})
+
+
+def write_platform(archive, platform, store_dir=SOCIAL_STORE_DIR):
+    """Write one platform's archive (as read by read_archive) into its artist buckets."""
+
+    platform_dir = os.path.join(store_dir, f"platform={platform}")
+    os.makedirs(platform_dir, exist_ok=True)
+    for f in os.listdir(platform_dir):
+        os.remove(os.path.join(platform_dir, f))
+
+    table = _to_store_table(archive)
+    codes, artists = pd.factorize(archive["artist_id"])
+    buckets = np.array([artist_bucket(a) for a in artists])[codes]
+    for bucket in np.unique(buckets):
+        pq.write_table(
+            table.take(np.flatnonzero(buckets == bucket)),
+            _bucket_path(store_dir, platform, int(bucket)),
+            row_group_size=ROW_GROUP_SIZE,
+        )
+
+
+def build_social_store(platforms=PLATFORM_SPECS, archive_dir=ARCHIVE_DIR, store_dir=SOCIAL_STORE_DIR):
+    """
+    Bring the social store up to date with the archive CSVs of platforms (default
+    every platform in PLATFORM_SPECS).
+
+    A platform is only re-read and rewritten when its archive changed since the last
+    build (size / mtime, then sha1). Platforms without an archive are skipped.
+    Returns the list of platforms that were rebuilt.
+    """
+    store_manifest = load_manifest(store_dir)
+    rebuilt = []
+
+    for platform in platforms:
+        path = archive_path(platform, archive_dir)
+        if not os.path.exists(path):
+            continue
+
+        changed, entry = manifest.check_file(path, store_manifest["platforms"].get(platform))
+        if changed:
+            write_platform(read_archive(path), platform, store_dir)
+            rebuilt.append(platform)
+        store_manifest["platforms"][platform] = entry
+
+    manifest.save_manifest(store_manifest, store_dir)
+    return rebuilt
+
+
+def _platform_files(store_dir, platform, artists=None):
+    platform_dir = os.path.join(store_dir, f"platform={platform}")
+    if not os.path.isdir(platform_dir):
+        return []
+
+    if artists is None:
+        return sorted(os.path.join(platform_dir, f) for f in os.listdir(platform_dir) if f.endswith(".parquet"))
+
+    buckets = sorted({artist_bucket(a) for a in artists})
+    paths = [_bucket_path(store_dir, platform, b) for b in buckets]
+    return [p for p in paths if os.path.exists(p)]
+
+
+def date_span(platform, store_dir=SOCIAL_STORE_DIR):
+    """(first, last) date in a platform's store, read off the parquet footers, or None if it's empty."""
+
+    dates = []
+    for path in _platform_files(store_dir, platform):
+        meta = pq.ParquetFile(path).metadata
+        i = meta.schema.to_arrow_schema().get_field_index("date")
+        for rg in range(meta.num_row_groups):
+            stats = meta.row_group(rg).column(i).statistics
+            if stats is not None and stats.has_min_max:
+                dates += [stats.min, stats.max]
+
+    return (pd.Timestamp(min(dates)), pd.Timestamp(max(dates))) if dates else None
+
+
+def query_social(platform, artists=None, start=None, end=None, columns=None, store_dir=SOCIAL_STORE_DIR):
+    """
+    Daily rows of one platform, for some artists and an inclusive date range.
+
+    Only the buckets holding the requested artists are opened, and the artist /
+    date predicates are pushed into the parquet scan. columns picks the metric
+    columns to decode (default all); artist_id, platform, handle and date always come back.
+    """
+    if isinstance(artists, str):
+        artists = [artists]
+    files = _platform_files(store_dir, platform, artists)
+    if not files:
+        return pd.DataFrame(columns=_KEY_COLUMNS + list(columns or []))
+
+    dataset = ds.dataset(files, format="parquet")
+    if columns is not None:
+        columns = _KEY_COLUMNS + [c for c in columns if c not in _KEY_COLUMNS]
+
+    filters = []
+    if artists is not None:
+        filters.append(ds.field("artist_id").isin(list(artists)))
+    if start is not None:
+        filters.append(ds.field("date") >= pa.scalar(pd.Timestamp(start).date(), pa.date32()))
+    if end is not None:
+        filters.append(ds.field("date") <= pa.scalar(pd.Timestamp(end).date(), pa.date32()))
+
+    filter = functools.reduce(operator.and_, filters) if filters else None
+    return dataset.to_table(columns=columns, filter=filter).to_pandas(date_as_object=False)
+
+
+def query_release_windows(platform, releases, days_back=28, artist_col="artist", release_col="release_date",
+                          columns=None, store_dir=SOCIAL_STORE_DIR):
+    """
+    Rows of one platform from days_back days before each release up to the release date.
+
+    releases has one row per (artist, release); its columns are kept on the result,
+    which has one row per release and archived day. The store is scanned once, for
+    the artists in releases and their overall date span.
+    """
+    releases = releases.copy()
+    releases[release_col] = pd.to_datetime(releases[release_col])
+
+    social = query_social(
+        platform,
+        artists=releases[artist_col].dropna().unique(),
+        start=releases[release_col].min() - pd.Timedelta(days=days_back),
+        end=releases[release_col].max(),
+        columns=columns,
+        store_dir=store_dir,
+    )
+    social["artist_id"] = social["artist_id"].astype(str)
+
+    windows = releases.merge(social, left_on=artist_col, right_on="artist_id", how="inner")
+    mask = (
+        (windows["date"] >= windows[release_col] - pd.Timedelta(days=days_back)) &
+        (windows["date"] <= windows[release_col])
+    )
+    return windows[mask].reset_index(drop=True)
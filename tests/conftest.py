@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the modules live at the repo root, next to the notebooks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from social_pipeline import PLATFORM_SPECS  # noqa: E402
+from social_store import write_platform  # noqa: E402
+
+OUTAGE = pd.date_range("2024-04-10", "2024-04-12")
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    """40 artists on every platform from 2024-01-01 to 2024-06-30, all zero during OUTAGE."""
+
+    rng = np.random.default_rng(7)
+    dates = pd.date_range("2024-01-01", "2024-06-30")
+    for platform, spec in PLATFORM_SPECS.items():
+        frames = []
+        for a in range(40):
+            rows = pd.DataFrame({"artist_id": f"Artist {a}", "platform": platform, "handle": f"h{a}", "date": dates})
+            for m in spec["metrics"]:
+                values = 1000 * (a + 1) + np.cumsum(rng.integers(0, 100, len(dates))).astype("float64")
+                values[dates.isin(OUTAGE)] = 0
+                # a few lone gaps and drops of the artist's own
+                values[rng.random(len(dates)) < 0.02] = np.nan
+                values[rng.random(len(dates)) < 0.01] = 0
+                rows[m] = values
+            frames.append(rows)
+        write_platform(pd.concat(frames, ignore_index=True), platform, str(tmp_path))
+    return str(tmp_path)
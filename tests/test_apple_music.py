@@ -0,0 +1,217 @@
+import asyncio
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+import applemusicpy
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from scripts import apple_music, apple_music_async
+from scripts.apple_music import IDS_PER_REQUEST, ISRCS_PER_REQUEST, fetch_by_isrc
+from scripts.apple_music_async import DeveloperToken, fetch_metadata_async, resolve_songs_async
+from scripts.http_cache import ResponseCache
+from scripts.social_collector import TokenBucket
+
+# the stub catalog: songs 1000..1499, ISRC USXX0<id>, minus a couple the multi-id endpoint leaves out
+CATALOG = {str(i): f"USXX0{i}" for i in range(1000, 1500)}
+MISSING_FROM_BATCH = {"1007", "1311"}
+
+
+def _song(song_id):
+    return {"id": song_id, "type": "songs",
+            "attributes": {"name": f"song {song_id}", "artistName": "artist", "isrc": CATALOG[song_id]}}
+
+
+class Catalog(BaseHTTPRequestHandler):
+    requests = Counter()
+    # reject the first token seen (and only that one), like a revoked key
+    reject_first_token = False
+    rejected = set()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")  # v1 catalog us songs [id] / v1 catalog us search
+
+        token = self.headers.get("Authorization")
+        if self.reject_first_token and (not self.rejected or token in self.rejected):
+            self.rejected.add(token)
+            self.requests["rejected"] += 1
+            self.send_response(401)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if parts[-1] == "search":
+            self.requests["search"] += 1
+            term = query["term"][0]
+            if term == "garbage":
+                return self._send(b"{not json")
+            song_id = term.split()[-1]
+            songs = [_song(song_id)] if song_id in CATALOG else []
+            if term.startswith("no artist"):
+                del songs[0]["attributes"]["artistName"]
+            data = {"results": {"songs": {"data": songs}}}
+            return self._send(json.dumps(data).encode())
+        if len(parts) == 5:
+            self.requests["song"] += 1
+            data = [_song(parts[4])] if parts[4] in CATALOG else []
+        elif "filter[isrc]" in query:
+            self.requests["songs_by_isrc"] += 1
+            isrcs = set(query["filter[isrc]"][0].split(","))
+            data = [_song(i) for i, isrc in CATALOG.items() if isrc in isrcs]
+        else:
+            self.requests["songs"] += 1
+            ids = query["ids"][0].split(",")
+            data = [_song(i) for i in ids if i in CATALOG and i not in MISSING_FROM_BATCH]
+
+        self._send(json.dumps({"data": data}).encode())
+
+    def _send(self, body):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Token:
+    def get(self, refresh=False):
+        return "token"
+
+    def headers(self):
+        return {"Authorization": "Bearer token"}
+
+
+@pytest.fixture
+def api_root(tmp_path, monkeypatch):
+    cache = ResponseCache(cache_dir=str(tmp_path / "http_cache"))
+    monkeypatch.setattr(apple_music, "cache", cache)
+    monkeypatch.setattr(apple_music_async, "cache", cache)
+    Catalog.requests = Counter()
+    Catalog.reject_first_token = False
+    Catalog.rejected = set()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Catalog)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_metadata_is_batched(api_root):
+    song_ids = list(CATALOG)[:450]
+
+    async def fetch():
+        async with aiohttp.ClientSession() as session:
+            return await fetch_metadata_async(session, TokenBucket(1000, 1000), Token(), song_ids, api_root=api_root)
+
+    found = asyncio.run(fetch())
+
+    assert set(found) == set(song_ids)
+    assert all(found[i]["isrc"] == CATALOG[i] for i in song_ids)
+    # one request per IDS_PER_REQUEST ids, and one per song left out of its batch, instead of 450
+    assert Catalog.requests == {"songs": -(-450 // IDS_PER_REQUEST), "song": len(MISSING_FROM_BATCH)}
+
+
+def _private_key():
+    return ec.generate_private_key(ec.SECP256R1()).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    )
+
+
+def _resolve(rows, token, api_root, **kwargs):
+    results = {}
+
+    def on_result(key, result):
+        assert key not in results
+        results[key] = result
+
+    asyncio.run(resolve_songs_async(rows, token, on_result, api_root=api_root, rate=1000, burst=1000, **kwargs))
+    return results
+
+
+def test_isrcs_are_batched(api_root):
+    am = applemusicpy.AppleMusic(secret_key=_private_key(), key_id="key", team_id="team")
+    am.root = api_root + "/"
+
+    isrcs = [isrc.lower() for isrc in list(CATALOG.values())[:60]] + ["USXX0000000"]
+    found = fetch_by_isrc(am, isrcs)
+
+    # ISRCs are matched case-insensitively, and unknown ones are left out for the search
+    assert set(found) == {isrc.upper() for isrc in isrcs[:60]}
+    assert all(CATALOG[match["apple_song_id"]] == match["isrc"] == isrc for isrc, match in found.items())
+    assert Catalog.requests == {"songs_by_isrc": -(-61 // ISRCS_PER_REQUEST)}
+
+
+def test_resolve_batches_known_ids(api_root):
+    rows = [(i, f"song {i}", "artist", f"song {i} — artist", float(i)) for i in list(CATALOG)[:450]]
+
+    results = _resolve(rows, Token(), api_root)
+
+    assert set(results) == {row[0] for row in rows}
+    assert all(result["apple_song_id"] == key and result["isrc"] == CATALOG[key] for key, result in results.items())
+    # ids stream into full IDS_PER_REQUEST batches, no searches for rows that have an id
+    assert Catalog.requests == {"songs": -(-450 // IDS_PER_REQUEST), "song": len(MISSING_FROM_BATCH)}
+
+
+def test_resolve_survives_bad_rows(api_root):
+    rows = [
+        ("found", "song 1100", "artist", "song 1100 — found 1100", None),
+        ("not found", "song x", "artist", "song x — nobody", None),
+        # a search result without artistName, a body that isn't JSON, a durf_id without " — "
+        ("no artist", "song 1101", "artist", "song 1101 — no artist 1101", None),
+        ("garbage", "song 1102", "artist", "song 1102 — garbage", None),
+        ("bad durf_id", "song 1103", "artist", "song 1103", None),
+        ("known", "song 1104", "artist", "song 1104 — artist", "1104"),
+    ]
+
+    results = _resolve(rows, Token(), api_root, search_workers=2)
+
+    assert set(results) == {row[0] for row in rows}
+    assert results["found"]["apple_song_id"] == "1100"
+    assert results["known"]["isrc"] == CATALOG["1104"]
+    for key in ("not found", "no artist", "garbage", "bad durf_id"):
+        assert results[key] == {"apple_song_id": None, **apple_music.empty_metadata()}
+
+
+def test_token_is_reused_until_it_nearly_expires(monkeypatch):
+    token = DeveloperToken(_private_key(), "key", "team", hours=1, margin=600)
+    now = time.time()
+    monkeypatch.setattr(apple_music_async.time, "time", lambda: now)
+
+    first = token.get()
+    assert token.get() == first and token.headers() == {"Authorization": f"Bearer {first}"}
+
+    monkeypatch.setattr(apple_music_async.time, "time", lambda: now + 3600 - 601)
+    assert token.get() == first
+    assert token.generated == 1
+
+    # within margin seconds of expiring it's signed again
+    monkeypatch.setattr(apple_music_async.time, "time", lambda: now + 3600 - 599)
+    assert token.get() != first
+    assert token.generated == 2
+
+
+def test_rejected_token_is_resigned(api_root):
+    Catalog.reject_first_token = True
+    token = DeveloperToken(_private_key(), "key", "team")
+
+    async def fetch():
+        async with aiohttp.ClientSession() as session:
+            return await fetch_metadata_async(session, TokenBucket(1000, 1000), token, ["1100"], api_root=api_root)
+
+    found = asyncio.run(fetch())
+
+    assert found["1100"]["isrc"] == CATALOG["1100"]
+    assert token.generated == 2
+    assert Catalog.requests == {"rejected": 1, "songs": 1}
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from artists import artist_exceptions, build_artist_song_edges, compute_main_artist_from_artists, split_artists
+
+
+def test_exceptions_are_separate_entries():
+    assert "Richy Mitch And The Coal Miners" in artist_exceptions
+    assert "HUNTR/X" in artist_exceptions
+
+
+def test_split_keeps_exceptions_whole():
+    assert split_artists("Richy Mitch And The Coal Miners") == (("Richy Mitch And The Coal Miners", "lead"),)
+    assert split_artists("Morgan Wallen Featuring Richy Mitch And The Coal Miners") == (
+        ("Morgan Wallen", "lead"), ("Richy Mitch And The Coal Miners", "featured"),
+    )
+    assert split_artists("HUNTR/X: EJAE, Audrey Nuna & REI AMI") == (
+        ("HUNTR/X", "lead"), ("EJAE", "lead"), ("Audrey Nuna", "lead"), ("REI AMI", "lead"),
+    )
+
+
+def test_main_artist_of_exceptions():
+    assert compute_main_artist_from_artists("Richy Mitch And The Coal Miners") == "Richy Mitch And The Coal Miners"
+    assert compute_main_artist_from_artists("HUNTR/X: EJAE, Audrey Nuna & REI AMI") == "HUNTR/X"
+
+
+def test_edges_have_no_phantom_credits(tmp_path, monkeypatch):
+    # build_artist_song_edges interns keys under data/processed_data/keys
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({
+        "song_id": ["Dashboard — Richy Mitch And The Coal Miners", "Golden — HUNTR/X: EJAE, Audrey Nuna & REI AMI"],
+        "performers": ["Richy Mitch And The Coal Miners", "HUNTR/X: EJAE, Audrey Nuna & REI AMI"],
+    })
+    edges = build_artist_song_edges(df)
+    assert "The Coal Miners" not in set(edges["artist"])
+    assert "X: EJAE" not in set(edges["artist"])
+    assert edges.loc[edges["position"] == 0, "artist"].tolist() == ["Richy Mitch And The Coal Miners", "HUNTR/X"]
@@ -0,0 +1,36 @@
+import os
+
+from chart_events import record_chart_events
+from chart_store import ingest_charts
+from keys import load_lookup
+
+HEADER = "chart_week,current_week,title,performer,last_week,peak_pos,wks_on_chart\n"
+
+
+def _write_week(raw_dir, chart, week, entries):
+    path = os.path.join(raw_dir, chart, week[:4], f"{week}.csv")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(HEADER + "".join(f"{week},{i + 1},{title},{performer},-,{i + 1},1\n"
+                                 for i, (title, performer) in enumerate(entries)))
+
+
+def test_albums_get_their_own_keys(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for week in ("2024-01-06", "2024-01-13"):
+        _write_week("raw", "hot_100", week, [("Evermore", "Taylor Swift"), ("Willow", "Taylor Swift")])
+        # a title track: the album has the same title and performer as the song
+        _write_week("raw", "billboard_200", week, [("Evermore", "Taylor Swift"), ("Folklore", "Taylor Swift")])
+
+    events = {}
+    for chart in ("hot_100", "billboard_200"):
+        events[chart] = record_chart_events(chart, ingest_charts(chart, raw_dir="raw", store_dir="store"),
+                                            store_dir="store", events_dir="events")
+
+    songs, albums = load_lookup("song"), load_lookup("album")
+    assert sorted(songs["song_id"]) == ["Evermore — Taylor Swift", "Willow — Taylor Swift"]
+    assert sorted(albums["album_id"]) == ["Evermore — Taylor Swift", "Folklore — Taylor Swift"]
+
+    # every album event carries the album's key
+    album_keys = dict(zip(albums["album_id"], albums["album_key"]))
+    assert (events["billboard_200"]["song_key"] == events["billboard_200"]["song_id"].map(album_keys)).all()
@@ -0,0 +1,29 @@
+import os
+
+import pandas as pd
+
+from chart_store import load_charts, read_store
+
+
+def _write_week(raw_dir, week, entries):
+    path = os.path.join(raw_dir, "hot_100", week[:4], f"{week}.csv")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("chart_week,current_week,title,performer,last_week,peak_pos,wks_on_chart\n")
+        f.write("".join(f"{week},{i + 1},{title},{performer},-,{i + 1},1\n" for i, (title, performer) in enumerate(entries)))
+
+
+def test_first_load_matches_the_store(tmp_path):
+    raw_dir, store_dir = str(tmp_path / "raw"), str(tmp_path / "store")
+    for week in ("2023-12-30", "2024-01-06", "2024-01-13"):
+        _write_week(raw_dir, week, [("Evermore", "Taylor Swift"), ("Willow", "Taylor Swift")])
+
+    # a first build hands back the weeks it just parsed, later ones read the store
+    cold = load_charts("hot_100", raw_dir=raw_dir, store_dir=store_dir)
+    pd.testing.assert_frame_equal(cold, read_store("hot_100", store_dir=store_dir))
+    pd.testing.assert_frame_equal(cold, load_charts("hot_100", raw_dir=raw_dir, store_dir=store_dir))
+    pd.testing.assert_frame_equal(cold, load_charts("hot_100", raw_dir=raw_dir, store_dir=store_dir, use_store=False))
+
+    years = load_charts("hot_100", years=[2024], raw_dir=raw_dir, store_dir=store_dir)
+    assert list(years["chart_week"].dt.year.unique()) == [2024]
+    assert len(years) == 4
@@ -0,0 +1,58 @@
+import pandas as pd
+
+from daily_features import compute_daily_features, materialize_daily_features, read_daily_features
+from feature_store import FeatureStore
+from social_pipeline import PLATFORM_SPECS
+from social_store import query_social, write_platform
+
+
+def _gap_days(store_dir, artist, month="2024-05"):
+    rows = query_social("instagram", columns=["followers"], store_dir=store_dir)
+    rows = rows[(rows["artist_id"] == artist) & rows["date"].astype(str).str.startswith(month)]
+    return list(pd.to_datetime(rows.loc[rows["followers"].isna(), "date"]))
+
+
+def test_days_do_not_see_later_days(store_dir, tmp_path):
+    days = compute_daily_features("2024-05-01", "2024-05-31", store_dir=store_dir).set_index(["artist", "date"])
+
+    # each day again, from a store that ends on that day
+    for day in _gap_days(store_dir, "Artist 3")[:3]:
+        cut_dir = str(tmp_path / str(day.date()))
+        for platform in PLATFORM_SPECS:
+            write_platform(query_social(platform, end=day, store_dir=store_dir), platform, cut_dir)
+
+        alone = compute_daily_features(day, day, store_dir=cut_dir).set_index(["artist", "date"])
+        pd.testing.assert_frame_equal(days.loc[alone.index], alone, check_index_type=False)
+
+
+def test_gap_days_match_the_feature_store(store_dir, tmp_path):
+    gaps = _gap_days(store_dir, "Artist 3")
+    assert gaps
+
+    queries = pd.DataFrame({"artist": "Artist 3", "date": gaps})
+    served = FeatureStore(store_dir=store_dir, cache_dir=str(tmp_path / "cache")).features(queries)
+    days = compute_daily_features(min(gaps), max(gaps), store_dir=store_dir)
+    days = queries.merge(days, on=["artist", "date"], how="left")
+
+    pd.testing.assert_series_equal(days["ig_followers"], served["ig_followers_release_date"], check_names=False)
+    pd.testing.assert_series_equal(days["ig_followers_cgr_1w"], served["ig_followers_cgr_1w"], check_names=False)
+
+
+def test_update_matches_a_rebuild(store_dir, tmp_path):
+    grown_dir, updated, rebuilt = (str(tmp_path / d) for d in ("grown", "updated", "rebuilt"))
+    for platform in PLATFORM_SPECS:
+        write_platform(query_social(platform, end="2024-06-20", store_dir=store_dir), platform, grown_dir)
+    materialize_daily_features(store_dir=grown_dir, out_dir=updated)
+
+    # ten more days arrive, only the last REFRESH_DAYS and the new ones are computed again
+    for platform in PLATFORM_SPECS:
+        write_platform(query_social(platform, store_dir=store_dir), platform, grown_dir)
+    written = materialize_daily_features(store_dir=grown_dir, out_dir=updated)
+    assert written[0] == "2024-06-13" and written[-1] == "2024-06-30"
+
+    materialize_daily_features(store_dir=store_dir, out_dir=rebuilt)
+    pd.testing.assert_frame_equal(pd.read_parquet(f"{updated}/outages.parquet"),
+                                  pd.read_parquet(f"{rebuilt}/outages.parquet"), check_dtype=False)
+    for day in ("2024-06-01", "2024-06-14", "2024-06-30"):
+        pd.testing.assert_frame_equal(read_daily_features(day, out_dir=updated),
+                                      read_daily_features(day, out_dir=rebuilt))
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import feature_store
+from feature_store import FeatureStore
+from social_pipeline import outage_calendar
+from social_store import PLATFORM_SPECS, archive_path, build_social_store, query_social
+
+
+def test_features_do_not_depend_on_the_batch(store_dir, tmp_path):
+    queries = pd.DataFrame({
+        "artist": [f"Artist {a}" for a in range(40)],
+        "date": pd.to_datetime("2024-04-11") + pd.to_timedelta(np.arange(40) % 5, unit="D"),
+    })
+
+    batched = FeatureStore(store_dir=store_dir, cache_dir=str(tmp_path / "batched")).features(queries)
+
+    singles = pd.concat([
+        FeatureStore(store_dir=store_dir, cache_dir=str(tmp_path / f"single_{i}")).features(queries.iloc[[i]])
+        for i in range(len(queries))
+    ])
+    pd.testing.assert_frame_equal(singles, batched)
+
+
+def test_outage_is_blanked_for_a_single_artist(store_dir, tmp_path):
+    query = pd.DataFrame({"artist": ["Artist 7"], "date": [pd.Timestamp("2024-04-11")]})
+    features = FeatureStore(store_dir=store_dir, cache_dir=str(tmp_path / "cache")).features(query)
+
+    # media isn't cumulative, but a store-wide outage still gets interpolated over
+    assert features["ig_media_release_date"].iloc[0] > 0
+    assert features["ig_media_cgr_1w"].iloc[0] > -100
+
+
+def _built_store(store_dir, tmp_path, scale=1):
+    """The synthetic store as archive CSVs (followers times scale) built by build_social_store, like the real one."""
+
+    archive_dir, built_dir = str(tmp_path / "archives"), str(tmp_path / "built")
+    os.makedirs(archive_dir, exist_ok=True)
+    for platform, spec in PLATFORM_SPECS.items():
+        rows = query_social(platform, store_dir=store_dir)
+        rows[spec["metrics"][0]] *= scale
+        rows.to_csv(archive_path(platform, archive_dir), index=False)
+    build_social_store(archive_dir=archive_dir, store_dir=built_dir)
+    return built_dir
+
+
+def test_rebuilt_store_is_not_served_stale(store_dir, tmp_path):
+    query = pd.DataFrame({"artist": ["Artist 7"], "date": [pd.Timestamp("2024-05-20")]})
+    features = FeatureStore(store_dir=_built_store(store_dir, tmp_path), cache_dir=str(tmp_path / "cache"))
+    before = features.features(query)["ig_followers_release_date"].iloc[0]
+
+    # the archives change and the store is rebuilt while features is still around
+    _built_store(store_dir, tmp_path, scale=2)
+    after = features.features(query)["ig_followers_release_date"].iloc[0]
+
+    assert after == 2 * before
+    assert features.stats()["misses"] == 2
+    assert len([f for f in os.listdir(tmp_path / "cache") if f.startswith("features_")]) == 1
+
+
+def test_outage_calendar_is_cached(store_dir, tmp_path, monkeypatch):
+    calls = []
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return outage_calendar(*args, **kwargs)
+
+    monkeypatch.setattr(feature_store, "outage_calendar", counted)
+    built_dir = _built_store(store_dir, tmp_path)
+    for a in range(3):
+        query = pd.DataFrame({"artist": [f"Artist {a}"], "date": [pd.Timestamp("2024-05-20")]})
+        FeatureStore(store_dir=built_dir, cache_dir=str(tmp_path / "cache")).features(query)
+
+    assert len(calls) == 1
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from scripts import http_cache
+from scripts.http_cache import ResponseCache
+
+TTLS = {"socialblade": 100, "socialblade/youtube": 10}
+
+
+class Fetch:
+    """A fetch() that counts its calls and returns (or raises) whatever it's set to."""
+
+    def __init__(self, body):
+        self.body = body
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if isinstance(self.body, Exception):
+            raise self.body
+        return self.body
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(http_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_their_ttl(tmp_path, clock):
+    cache = ResponseCache(cache_dir=str(tmp_path), ttls=TTLS)
+    fetch = Fetch({"followers": 10})
+
+    assert cache.fetch("socialblade/instagram", {"query": "a"}, fetch) == {"followers": 10}
+    clock[0] += 99
+    assert cache.fetch("socialblade/instagram", {"query": "a"}, fetch) == {"followers": 10}
+    assert fetch.calls == 1
+
+    fetch.body = {"followers": 11}
+    clock[0] += 2
+    assert cache.fetch("socialblade/instagram", {"query": "a"}, fetch) == {"followers": 11}
+    assert fetch.calls == 2
+    assert cache.stats == {"hits": 1, "misses": 2, "stale": 0}
+
+    # the longest matching prefix sets the TTL
+    assert cache.ttl("socialblade/youtube") == 10
+    assert cache.ttl("apple_music/song") == http_cache.DEFAULT_TTL
+
+
+def test_bypass_refetches_and_refreshes_the_cache(tmp_path, clock):
+    ResponseCache(cache_dir=str(tmp_path), ttls=TTLS).put("socialblade/instagram", {"query": "a"}, {"followers": 10})
+
+    bypass = ResponseCache(cache_dir=str(tmp_path), ttls=TTLS, bypass=True)
+    fetch = Fetch({"followers": 11})
+    assert bypass.get("socialblade/instagram", {"query": "a"}) is None
+    assert bypass.fetch("socialblade/instagram", {"query": "a"}, fetch) == {"followers": 11}
+    assert bypass.fetch("socialblade/instagram", {"query": "a"}, fetch) == {"followers": 11}
+    assert fetch.calls == 2
+
+    # what it fetched is what a normal cache now reads
+    assert ResponseCache(cache_dir=str(tmp_path), ttls=TTLS).get("socialblade/instagram", {"query": "a"}) == {"followers": 11}
+
+
+def test_failed_fetch_falls_back_to_stale(tmp_path, clock):
+    cache = ResponseCache(cache_dir=str(tmp_path), ttls=TTLS)
+    cache.put("socialblade/instagram", {"query": "a"}, {"followers": 10})
+    clock[0] += 1000
+
+    # offline, or a request that came back empty
+    assert cache.fetch("socialblade/instagram", {"query": "a"}, Fetch(ConnectionError("offline"))) == {"followers": 10}
+    assert cache.fetch("socialblade/instagram", {"query": "a"}, Fetch(None)) == {"followers": 10}
+    assert cache.stats == {"hits": 0, "misses": 2, "stale": 2}
+
+    # with nothing stale to fall back on, the error goes through and None is returned as is
+    with pytest.raises(ConnectionError):
+        cache.fetch("socialblade/instagram", {"query": "b"}, Fetch(ConnectionError("offline")))
+    assert cache.fetch("socialblade/instagram", {"query": "b"}, Fetch(None)) is None
+    assert not os.path.exists(cache._path("requests", http_cache.request_key("socialblade/instagram", {"query": "b"})))
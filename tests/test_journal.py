@@ -0,0 +1,33 @@
+import json
+
+from scripts.journal import Journal
+
+
+def test_half_written_record_is_run_again(tmp_path):
+    journal = Journal("job", journal_dir=str(tmp_path))
+    journal.record("a", 1)
+    journal.record(("instagram", "b"), {"rows": 2})
+    journal.close()
+
+    # a crash halfway through writing "c"
+    line = json.dumps({"key": "c", "result": 3, "at": 0.0})
+    with open(journal.path, "a") as f:
+        f.write(line[:len(line) // 2])
+
+    journal = Journal("job", journal_dir=str(tmp_path))
+    assert journal.results() == {"a": 1, '["instagram", "b"]': {"rows": 2}}
+    assert journal.pending(["a", ("instagram", "b"), "c", "d"]) == ["c", "d"]
+
+    journal.record("c", 3)
+    journal.record("d", 4)
+    journal.close()
+
+    journal = Journal("job", journal_dir=str(tmp_path))
+    assert journal.results() == {"a": 1, '["instagram", "b"]': {"rows": 2}, "c": 3, "d": 4}
+    assert journal.result(("instagram", "b")) == {"rows": 2}
+    journal.close()
+
+    # "c" starts on a line of its own, and no broken line is left in the file
+    with open(journal.path) as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line)["key"] for line in lines] == ["a", '["instagram", "b"]', "c", "d"]
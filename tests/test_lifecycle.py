@@ -0,0 +1,50 @@
+import pandas as pd
+
+from lifecycle import build_lifecycles, load_lifecycles, save_lifecycles, update_lifecycles
+
+
+def _charts():
+    weeks = pd.date_range("2024-01-06", periods=6, freq="7D")
+    rows = []
+    for i, week in enumerate(weeks):
+        for k in range(4):
+            # song 1 drops off for two weeks, song 2 for the week before the last
+            if (k == 1 and i in (2, 3)) or (k == 2 and i == 4):
+                continue
+            rows.append((k, f"song {k}", week, k + 1 + i % 2, i + 1))
+    rows.append((7, "song 7", weeks[-1], 9, 1))
+
+    charts = pd.DataFrame(rows, columns=["song_key", "song_id", "chart_week", "current_week", "wks_on_chart"])
+    return charts.astype({"song_key": "int32", "current_week": "int16", "wks_on_chart": "int16"})
+
+
+def _types(lists):
+    return {type(x) for values in lists for x in values}
+
+
+def test_update_matches_build():
+    charts = _charts()
+    last = charts["chart_week"].max()
+
+    full = build_lifecycles(charts)
+    updated = update_lifecycles(build_lifecycles(charts[charts["chart_week"] < last]),
+                                charts[charts["chart_week"] == last])
+
+    assert updated["song_key"].dtype == "int32"
+    assert _types(updated["gaps"]) == _types(updated["positions"]) == {int}
+    pd.testing.assert_frame_equal(updated.sort_values("song_key", ignore_index=True), full)
+
+
+def test_update_after_reload(tmp_path):
+    charts = _charts()
+    last = charts["chart_week"].max()
+
+    path = str(tmp_path / "lifecycles.parquet")
+    save_lifecycles(build_lifecycles(charts[charts["chart_week"] < last]), path)
+    updated = update_lifecycles(load_lifecycles(path), charts[charts["chart_week"] == last])
+
+    assert updated["song_key"].dtype == "int32"
+    assert _types(updated["gaps"]) == _types(updated["positions"]) == {int}
+    # parquet reads the week columns back in ms
+    pd.testing.assert_frame_equal(updated.sort_values("song_key", ignore_index=True), build_lifecycles(charts),
+                                  check_dtype=False)
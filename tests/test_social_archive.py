@@ -0,0 +1,36 @@
+import pandas as pd
+
+from scripts.social_archive import load_state, open_state, refresh_platform, store_daily
+
+HANDLES = {"a": "handle_a", "b": "handle_b"}
+
+
+def _fetch(platform, handle, history):
+    return pd.DataFrame({"date": ["2024-05-01", "2024-05-02", "2024-05-03"], "followers": [10, 11, 12]})
+
+
+def _archive(tmp_path):
+    return pd.read_csv(tmp_path / "instagram_archive.csv")
+
+
+def test_rerun_after_crash_appends_nothing_twice(tmp_path):
+    state_path = str(tmp_path / "refresh_state.json")
+    revisions_path = str(tmp_path / "revisions.csv")
+
+    # a refresh that stores "a", then dies before it gets to save the state
+    state, journal = open_state(["instagram"], tmp_path, state_path)
+    store_daily(state, "instagram", "a", HANDLES["a"], _fetch("instagram", HANDLES["a"], "vault"),
+                tmp_path, revisions_path, journal)
+    journal.close()
+    assert "a" in load_state(state_path)["instagram"]
+
+    stats = refresh_platform(HANDLES, "instagram", _fetch, tmp_path, state_path, revisions_path)
+
+    assert stats["rows"] == 3
+    archive = _archive(tmp_path)
+    assert len(archive) == 6
+    assert not archive.duplicated(["artist_id", "date"]).any()
+
+    # and the journal is folded into the saved state
+    assert refresh_platform(HANDLES, "instagram", _fetch, tmp_path, state_path, revisions_path)["rows"] == 0
+    assert len(_archive(tmp_path)) == 6
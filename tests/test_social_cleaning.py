@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from social_cleaning import imputable
+
+
+def test_imputable_wide_and_long_agree():
+    status = pd.DataFrame({
+        "followers": ["observed", "zero_drop", "outage", "missing"],
+        "media": ["zero_drop", "outage", "observed", "zero_drop"],
+    }, dtype=pd.CategoricalDtype(["observed", "missing", "zero_drop", "outage"]))
+    wide = imputable(status)
+
+    long = status.melt(var_name="metric", value_name="value")
+    mask = imputable(long[["value"]], cumulative=long["metric"] == "followers")
+
+    np.testing.assert_array_equal(mask["value"].to_numpy(), wide.melt()["value"].to_numpy())
+    assert wide["followers"].tolist() == [False, True, True, False]
+    assert wide["media"].tolist() == [False, True, False, False]
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pandas as pd
+from aiohttp import web
+
+from scripts import social_collector
+from scripts.http_cache import ResponseCache
+from scripts.social_archive import load_state
+from scripts.social_collector import refresh_archives_async
+
+DAILY = [{"date": "2024-05-01", "followers": 10}, {"date": "2024-05-02", "followers": 11}]
+
+
+async def _serve(bodies):
+    """Stub SocialBlade on a free local port. Returns (runner, base_url, arrival times of the requests)."""
+
+    arrivals = []
+
+    async def statistics(request):
+        arrivals.append(time.monotonic())
+        return web.json_response(bodies[request.query["query"]])
+
+    app = web.Application()
+    app.router.add_get("/{platform}/statistics", statistics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", arrivals
+
+
+def _refresh(tmp_path, monkeypatch, bodies, **kwargs):
+    monkeypatch.setattr(social_collector, "cache", ResponseCache(cache_dir=str(tmp_path / "http_cache")))
+    handles = {"instagram": {f"artist {h}": h for h in bodies}}
+
+    async def run():
+        runner, base_url, arrivals = await _serve(bodies)
+        try:
+            stats = await refresh_archives_async(
+                handles, base_url=base_url, archive_dir=str(tmp_path), state_path=str(tmp_path / "state.json"),
+                revisions_path=str(tmp_path / "revisions.csv"), **kwargs,
+            )
+        finally:
+            await runner.cleanup()
+        return stats, arrivals
+
+    return asyncio.run(run())
+
+
+def test_requests_stay_within_rate(tmp_path, monkeypatch):
+    rate, burst = 20, 2
+    bodies = {f"h{i}": {"data": {"daily": DAILY}} for i in range(10)}
+
+    stats, arrivals = _refresh(tmp_path, monkeypatch, bodies, rate=rate, burst=burst)
+
+    assert len(arrivals) == 10
+    assert stats["instagram"]["rows"] == 20
+    # a burst goes out at once, then one request every 1 / rate seconds
+    start = min(arrivals)
+    for i, at in enumerate(sorted(arrivals)):
+        assert at - start >= (i - burst + 1) / rate - 0.01
+
+
+def test_malformed_response_fails_only_its_handle(tmp_path, monkeypatch):
+    bodies = {
+        "good": {"data": {"daily": DAILY}},
+        "no_daily": {"data": {}},
+        "error": {"status": {"success": False}},
+        # parses, but store_daily can't use it
+        "no_date": {"data": {"daily": [{"followers": 3}]}},
+    }
+
+    stats, _ = _refresh(tmp_path, monkeypatch, bodies)
+
+    assert sorted(stats["instagram"]["failed"]) == ["artist error", "artist no_daily", "artist no_date"]
+    assert stats["instagram"]["rows"] == 2
+
+    archive = pd.read_csv(tmp_path / "instagram_archive.csv")
+    assert set(archive["artist_id"]) == {"artist good"}
+    # failed handles keep no state, so the next refresh asks for their vault history again
+    state = load_state(str(tmp_path / "state.json"))
+    assert set(state["instagram"]) == {"artist good"}
@@ -0,0 +1,21 @@
+import pandas as pd
+
+import social_store
+from social_store import archive_path, build_social_store, query_social
+
+
+def test_new_spec_is_ingested(tmp_path, monkeypatch):
+    # adding a platform is one entry in PLATFORM_SPECS, the store picks it up from there
+    monkeypatch.setitem(social_store.PLATFORM_SPECS, "spotify", {"prefix": "sp", "metrics": ["followers"]})
+    archive_dir, store_dir = str(tmp_path / "archives"), str(tmp_path / "store")
+
+    archive = pd.DataFrame({
+        "artist_id": ["a", "a"], "platform": "spotify", "handle": "h",
+        "date": ["2024-01-01", "2024-01-02"], "followers": [10, 12], "snapshot_date": "2024-01-03",
+    })
+    (tmp_path / "archives").mkdir()
+    archive.to_csv(archive_path("spotify", archive_dir), index=False)
+
+    assert build_social_store(archive_dir=archive_dir, store_dir=store_dir) == ["spotify"]
+    assert query_social("spotify", store_dir=store_dir)["followers"].tolist() == [10, 12]
+    assert build_social_store(archive_dir=archive_dir, store_dir=store_dir) == []
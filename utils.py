@@ -1,5 +1,5 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
 def expand_to_full_window(
     df,
@@ -8,40 +8,44 @@ def expand_to_full_window(
     release_col="release_date",
     days_back=28,
 ):
+    """
+    Give every (artist, platform) group one row per day from days_back days before
+    its release date up to the release date, with was_inserted marking the days
+    that weren't in df.
+
+    The whole (group x day) grid is built at once and lined up with df in a single
+    merge, instead of a date_range + merge per group.
+    """
+    key_cols = list(key_cols)
     d = df.copy()
     d[date_col] = pd.to_datetime(d[date_col])
     d[release_col] = pd.to_datetime(d[release_col])
 
-    filled = []
-    for keys, g in d.groupby(list(key_cols), dropna=False):
-        rd = g[release_col].iloc[0]
-
-        # Taking date range from 38 days back to release date
-        window = pd.date_range(rd - pd.Timedelta(days=days_back), rd, freq="D")
-
-        base = pd.DataFrame({date_col: window})
-        # date
-        # 0 2022-07-17
-        # 1 2022-07-18
-        # 2 2022-07-19
-        # 3 2022-07-20
-        for k, v in zip(key_cols, keys):
-            base[k] = v
-        base[release_col] = rd
-
-        #         date    artist   platform release_date
-        # 0 2022-07-17     d4vd  instagram   2022-07-20
-        # 1 2022-07-18     d4vd  instagram   2022-07-20
-        # 2 2022-07-19     d4vd  instagram   2022-07-20
-        # 3 2022-07-20     d4vd  instagram   2022-07-20
-
-        merged = base.merge(g, on=[*key_cols, date_col, release_col], how="left", indicator=True)
-        # Above means keep every row from base, match rows from g when all columns match
-        merged["was_inserted"] = merged["_merge"].eq("left_only")
-        merged = merged.drop(columns="_merge")
-        filled.append(merged)
-
-    return pd.concat(filled, ignore_index=True)
+    # one release date per group: the group's first row, groups in sorted key order
+    # (release_col can be one of the keys, when an artist has several releases)
+    group_cols = key_cols + [release_col] * (release_col not in key_cols)
+    groups = (
+        d.drop_duplicates(key_cols)[group_cols]
+        .sort_values(key_cols, kind="stable")
+        .reset_index(drop=True)
+    )
+
+    # Taking date range from days_back days back to release date, for every group at once
+    n_days = days_back + 1
+    offsets = np.tile(np.arange(-days_back, 1), len(groups))
+    base = groups.loc[np.repeat(groups.index, n_days)].reset_index(drop=True)
+    base.insert(0, date_col, base[release_col] + pd.to_timedelta(offsets, unit="D"))
+
+    #         date    artist   platform release_date
+    # 0 2022-07-17     d4vd  instagram   2022-07-20
+    # 1 2022-07-18     d4vd  instagram   2022-07-20
+    # 2 2022-07-19     d4vd  instagram   2022-07-20
+    # 3 2022-07-20     d4vd  instagram   2022-07-20
+
+    merged = base.merge(d, on=[*group_cols, date_col], how="left", indicator=True)
+    # Above means keep every row from base, match rows from d when all columns match
+    merged["was_inserted"] = merged["_merge"].eq("left_only")
+    return merged.drop(columns="_merge")
 
 
 def plot_two_metrics(
@@ -61,6 +65,9 @@ def plot_two_metrics(
     """
     Plot two metrics over time for each (artist, platform) group.
     """
+    # imported here so the rest of utils (expand_to_full_window) works without matplotlib
+    import matplotlib.pyplot as plt
+
     # optional filter
     if artists is not None:
         df = df[df[artist_col].isin(artists)]